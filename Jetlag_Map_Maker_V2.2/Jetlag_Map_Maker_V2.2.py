@@ -2,6 +2,7 @@ import tkinter as tk
 
 from config import BG  # or set BG here if you haven't made config.py yet
 from image_loader import load_image
+from screens.shared import icon_atlas
 
 from screens.main_menu import main_menu
 from screens.bbox_screen import bbox_screen
@@ -16,17 +17,38 @@ root.configure(bg=BG)
 # Load logo once (cached)
 logo_photo = load_image("logo.png", size=(100, 100))
 
+# Resize every marker icon in the background, before any map needs them
+icon_atlas.start_prerender(root)
+
 current_screen = None
+screens = {}  # screen function -> its frame, built on the first visit and kept
 
 def show_screen(screen_func):
-    """Destroy current screen frame and show a new one."""
+    """
+    Hide the current screen frame and show screen_func's. Frames are reused,
+    so a screen keeps its inputs and plotted layers between visits; a frame
+    may set on_hide/on_show callables, run when it is left and re-entered.
+    """
     global current_screen
     if current_screen is not None:
-        current_screen.destroy()
-
-    # Every screen must accept: (root, show_screen, logo_photo)
-    current_screen = screen_func(root, show_screen, logo_photo)
+        on_hide = getattr(current_screen, "on_hide", None)
+        if on_hide is not None:
+            on_hide()
+        current_screen.pack_forget()
+
+    frame = screens.get(screen_func)
+    if frame is None:
+        # Every screen must accept: (root, show_screen, logo_photo)
+        frame = screen_func(root, show_screen, logo_photo)
+        screens[screen_func] = frame
+        on_show = None
+    else:
+        on_show = getattr(frame, "on_show", None)
+
+    current_screen = frame
     current_screen.pack(expand=True, fill="both")
+    if on_show is not None:
+        on_show()
 
 
 # Start app on main menu
@@ -38,6 +38,43 @@ overpass_mirrors = [
     "https://overpass.nchc.org.tw/api/interpreter",
 ]
 
+# Count probe: decides how a layer is fetched before downloading it
+COUNT_PROBE_TILE_ELEMENTS = 20_000      # above this, split the bbox into tiles
+COUNT_PROBE_MAX_TILE_SIDE = 6           # at most 6 x 6 tiles
+COUNT_PROBE_GEOMETRY_MAX_LINES = 8_000  # above this, line layers fall back to points
+COUNT_PROBE_WARN_ELEMENTS = 100_000     # above this, warn the user
+COUNT_PROBE_TIMEOUT_S = 5               # one mirror, this long; on failure the default strategy is used
+
+# Layer cache: fetched layers are reused for areas inside the fetched one
+LAYER_CACHE_TTL_S = 30 * 60
+
+# Point layers with at least this many rows are drawn as one image per
+# view instead of one canvas marker each (None = always markers)
+MARKER_RASTER_MIN_POINTS = 20_000
+
+# Snapshot date: pins every Overpass query to one point in OSM history.
+# None = live data. Pinned results are stored in SNAPSHOT_CACHE_DIR forever
+# (None = ~/.jetlag_map_maker/snapshots; point it at a shared folder to share).
+snapshot_date = None
+SNAPSHOT_CACHE_DIR = None
+
+# Map tiles: every tile the map loads is kept in TILE_CACHE_PATH (None =
+# ~/.jetlag_map_maker/tiles.db). Saving an area for offline use fetches
+# TILE_SEED_ZOOMS, dropping the deepest levels past TILE_SEED_MAX_TILES.
+# tiles_offline = True reads cached tiles only.
+# TILE_SERVER is the map's {z}/{x}/{y} URL (None = the public OpenStreetMap
+# tiles). OSM's tile usage policy forbids bulk downloads, so saving for
+# offline needs a server that allows them (your own, or a provider's key).
+TILE_CACHE_PATH = None
+TILE_SERVER = None
+TILE_SEED_ZOOMS = tuple(range(6, 15))
+TILE_SEED_MAX_TILES = 10_000
+TILE_SEED_COMMIT_EVERY = 200            # seeded tiles written per transaction
+tiles_offline = False
+
+# Resized marker icons are kept in ICON_CACHE_DIR (None = ~/.jetlag_map_maker/icons)
+ICON_CACHE_DIR = None
+
 # Shared runtime state (kept simple for now)
 bound_box = None
 
@@ -48,6 +85,14 @@ all_data = {
     "Bus": None
 }
 
+# Fetched transport frames before any dedup (all_data holds the deduplicated view)
+raw_data = {
+    "Train": None,
+    "Subway": None,
+    "Tram": None,
+    "Bus": None
+}
+
 dedup_valid = False
 last_export_path = None
 saved_bound_box = None
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Session cache for fetched layers (transport + POI).
+
+Every entry remembers the area it was fetched for. If a later area is
+inside a cached one (Glasgow inside Scotland), the cached rows are
+clipped to the new area locally instead of asking Overpass again.
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import Polygon, box
+
+import config
+import snapshot
+
+_lock = threading.Lock()
+
+# (kind, layer) -> list of {"filters", "date", "cover", "df", "stored_at"}
+_entries = {}
+
+
+def area_geometry_from_config(include_saved_bbox: bool = False):
+    """
+    Shapely geometry (lon/lat) for the current Overpass area:
+      - overpass_poly  (preferred, same ring the query uses)
+      - bound_box      (or saved_bound_box if include_saved_bbox)
+      - None           (no area known)
+    """
+    poly_str = getattr(config, "overpass_poly", None)
+    if poly_str:
+        parts = [p for p in str(poly_str).strip().split() if p]
+        coords = []
+        for i in range(0, len(parts) - 1, 2):
+            coords.append((float(parts[i + 1]), float(parts[i])))
+        if len(coords) >= 3:
+            g = Polygon(coords)
+            return g if g.is_valid else g.buffer(0)
+
+    bb = getattr(config, "bound_box", None)
+    if not bb and include_saved_bbox:
+        bb = getattr(config, "saved_bound_box", None)
+    if bb:
+        south, west, north, east = (float(v) for v in bb)
+        return box(west, south, east, north)
+
+    return None
+
+
+def _filters_key(osm_filter):
+    filters = osm_filter if isinstance(osm_filter, (list, tuple)) else [osm_filter]
+    return tuple(sorted(str(f) for f in filters))
+
+
+def _is_fresh(entry) -> bool:
+    # Snapshot-pinned data never changes, so it never goes stale
+    if entry["date"] is not None:
+        return True
+    ttl = getattr(config, "LAYER_CACHE_TTL_S", None)
+    if ttl is None:
+        return True
+    return (time.time() - entry["stored_at"]) <= ttl
+
+
+def clip_rows(df: pd.DataFrame, area) -> pd.DataFrame:
+    """
+    Keep rows that fall inside `area`:
+      - point rows (Latitude/Longitude) via vectorised point-in-polygon
+      - line rows (Geometry = [(lat, lon), ...]) if the line touches the area
+    """
+    if df is None or df.empty or area is None:
+        return df
+
+    keep = np.zeros(len(df), dtype=bool)
+
+    if "Latitude" in df.columns and "Longitude" in df.columns:
+        lat = pd.to_numeric(df["Latitude"], errors="coerce").to_numpy(dtype=float)
+        lon = pd.to_numeric(df["Longitude"], errors="coerce").to_numpy(dtype=float)
+        has_pt = ~(np.isnan(lat) | np.isnan(lon))
+        if has_pt.any():
+            keep[has_pt] = shapely.intersects_xy(area, lon[has_pt], lat[has_pt])
+
+    if "Geometry" in df.columns:
+        geoms = df["Geometry"].to_numpy(dtype=object)
+        line_idx = [i for i, g in enumerate(geoms) if isinstance(g, (list, tuple)) and len(g) >= 2]
+        if line_idx:
+            lengths = np.array([len(geoms[i]) for i in line_idx])
+            coords = np.array([(lon, lat) for i in line_idx for (lat, lon) in geoms[i]], dtype=float)
+            lines = shapely.linestrings(coords, indices=np.repeat(np.arange(len(line_idx)), lengths))
+            keep[np.asarray(line_idx)] = shapely.intersects(area, lines)
+
+    return df[keep].reset_index(drop=True)
+
+
+def lookup(kind: str, layer: str, osm_filter, area):
+    """
+    Rows for (kind, layer, filters) clipped to `area`, if a fresh cached
+    fetch covers it. Returns None on a miss (an empty frame is a hit).
+    """
+    if area is None:
+        return None
+
+    fkey = _filters_key(osm_filter)
+    date = snapshot.snapshot_date()
+    with _lock:
+        candidates = [
+            e for e in _entries.get((kind, layer), [])
+            if e["filters"] == fkey and e["date"] == date and _is_fresh(e)
+        ]
+
+    for entry in candidates:
+        if entry["cover"].covers(area):
+            return clip_rows(entry["df"], area)
+
+    return None
+
+
+def store(kind: str, layer: str, osm_filter, area, df):
+    """
+    Remember a fetch result for `area`. Entries whose cover sits inside
+    the new one are dropped, since the new entry answers for them too.
+    """
+    if area is None:
+        return
+
+    if df is None:
+        df = pd.DataFrame()
+
+    fkey = _filters_key(osm_filter)
+    date = snapshot.snapshot_date()
+    entry = {"filters": fkey, "date": date, "cover": area, "df": df, "stored_at": time.time()}
+
+    with _lock:
+        kept = [
+            e for e in _entries.get((kind, layer), [])
+            if _is_fresh(e) and not (e["filters"] == fkey and e["date"] == date and area.covers(e["cover"]))
+        ]
+        kept.append(entry)
+        _entries[(kind, layer)] = kept
+
+
+def clear(kind=None):
+    with _lock:
+        if kind is None:
+            _entries.clear()
+            return
+        for key in [k for k in _entries if k[0] == kind]:
+            del _entries[key]
@@ -1,6 +1,57 @@
+import io
 import tkinter as tk
 import config
 import tkintermapview 
+from PIL import Image, ImageTk, UnidentifiedImageError
+
+import tile_cache
+
+
+class CachedMapView(tkintermapview.TkinterMapView):
+    """
+    TkinterMapView whose tiles go through tile_cache: read from the local
+    database first, downloaded (and stored) only when missing and online.
+    """
+
+    def request_image(self, zoom: int, x: int, y: int, db_cursor=None):
+        data = tile_cache.load_tile(self.tile_server, zoom, x, y)
+        if data is None or not self.running:
+            # Not cached yet (offline or no connection): blank, retried next time
+            return self.empty_tile_image
+        try:
+            image_tk = ImageTk.PhotoImage(Image.open(io.BytesIO(data)))
+        except UnidentifiedImageError:
+            image_tk = self.empty_tile_image
+        except Exception:
+            return self.empty_tile_image
+        self.tile_image_cache[f"{zoom}{x}{y}"] = image_tk
+        return image_tk
+
+
+_shared_maps = {}
+
+
+def shared_map(parent: tk.Widget):
+    """
+    The window's one long-lived map widget (created on first use). It is a
+    child of the toplevel, so every screen can host it with attach_map()
+    and its tiles stay loaded across navigation.
+    """
+    top = parent.winfo_toplevel()
+    map_widget = _shared_maps.get(id(top))
+    if map_widget is None or not map_widget.winfo_exists():
+        map_widget = CachedMapView(top, corner_radius=0)
+        if getattr(config, "TILE_SERVER", None):
+            map_widget.set_tile_server(config.TILE_SERVER)
+        _shared_maps[id(top)] = map_widget
+    return map_widget
+
+
+def attach_map(map_widget, container: tk.Widget):
+    """Show the shared map inside container (a screen's map area)."""
+    map_widget.pack(in_=container, expand=True, fill="both")
+    map_widget.lift()  # screen frames are created after the map and would cover it
+
 
 def embed_map(parent: tk.Widget, center=None, zoom=None):
     if center is None:
@@ -8,8 +59,8 @@ def embed_map(parent: tk.Widget, center=None, zoom=None):
     if zoom is None:
         zoom = config.DEFAULT_MAP_ZOOM
 
-    map_widget = tkintermapview.TkinterMapView(parent, corner_radius=0)
-    map_widget.pack(expand=True, fill="both")
+    map_widget = shared_map(parent)
+    attach_map(map_widget, parent)
 
     map_widget.set_position(center[0], center[1])
     map_widget.set_zoom(zoom)
@@ -17,6 +68,17 @@ def embed_map(parent: tk.Widget, center=None, zoom=None):
     return map_widget
 
 
+def map_view(map_widget):
+    """(position, zoom) of the map, to put back with restore_map_view()."""
+    return map_widget.get_position(), map_widget.zoom
+
+
+def restore_map_view(map_widget, view):
+    (lat, lon), zoom = view
+    map_widget.set_position(lat, lon)
+    map_widget.set_zoom(round(zoom))
+
+
 def make_map_container(parent: tk.Widget):
     """
     Creates a padded container for the map that expands naturally.
@@ -3,11 +3,15 @@ import queue
 import random
 import time
 import socket
+import math
 
 import pandas as pd
+import requests
 import overpy
 from typing import Callable, Optional
 import config
+import layer_cache
+import snapshot
 
 def _is_timeout_error(e: Exception) -> bool:
     s = str(e).lower()
@@ -108,14 +112,23 @@ def _short_host(url: str) -> str:
     except Exception:
         return url
 
-def fetch_osm_data(osm_filter, type_name, progress_cb: Optional[Callable[[str], None]], point1_entry, point2_entry):
+
+def _filter_list(osm_filter):
+    return list(osm_filter) if isinstance(osm_filter, (list, tuple)) else [osm_filter]
+
+
+# ------------------------------------------------------------
+# Count probe (cheap "out count" before a heavy download)
+# ------------------------------------------------------------
+def count_osm_elements(osm_filter, area_clause=None, progress_cb: Optional[Callable[[str], None]] = None, timeout=None):
     """
-    Fetch OSM data using Overpass.
+    Ask Overpass how many elements match, without downloading them.
 
-    - Accepts osm_filter as string OR list/tuple of strings
-    - Uses nwr (nodes + ways + relations)
-    - Uses out center (so ways/relations get a point)
-    - Tk-safe via progress_cb
+    Returns {"nodes": n, "ways": n, "relations": n, "total": n}, or None when
+    no area is set or the probe failed; callers then keep the default fetch
+    strategy. Only one mirror is tried, with a short timeout, so a slow probe
+    never holds up the fetch itself. Goes through requests directly because
+    overpy drops the "count" element that `out count` returns.
     """
     def say(msg: str):
         if progress_cb:
@@ -124,47 +137,104 @@ def fetch_osm_data(osm_filter, type_name, progress_cb: Optional[Callable[[str],
             except Exception:
                 pass
 
-    # Ensure config stores exist
-    if not hasattr(config, "all_data") or config.all_data is None:
-        config.all_data = {"Train": None, "Subway": None, "Tram": None, "Bus": None}
-
-    # Area
-    area_clause = _area_clause_from_config()
     if area_clause is None:
-        if not _save_bounding_box(point1_entry, point2_entry):
-            say("No area set. Set a hiding zone or enter a bounding box.")
-            return None
         area_clause = _area_clause_from_config()
-
     if area_clause is None:
-        say("No area set (missing polygon/bounding box).")
         return None
 
-    # Filters (support list)
-    filters = osm_filter if isinstance(osm_filter, (list, tuple)) else [osm_filter]
-
-    # Build query
-    blocks = []
-    for f in filters:
-        blocks.append(f"nwr[{f}]{area_clause};")
+    if timeout is None:
+        timeout = config.COUNT_PROBE_TIMEOUT_S
 
+    blocks = "".join(f"nwr[{f}]{area_clause};" for f in _filter_list(osm_filter))
     query = f"""
-    [out:json][timeout:50];
+    {snapshot.query_settings(timeout)}
     (
-      {''.join(blocks)}
+      {blocks}
     );
-    out center;
+    out count;
     """
-    is_bus = _is_bus(type_name)
 
-    if is_bus:
-        print("\n================ BUS FETCH DEBUG ================")
-        print("Area clause:", area_clause)
-        print("Filters:", filters)
-        print("Overpass query:")
-        print(query)
-        print("=================================================\n")
+    mirrors = list(getattr(config, "overpass_mirrors", []))
+    if not mirrors:
+        return None
 
+    url = random.choice(mirrors)
+    host = _short_host(url)
+    try:
+        resp = requests.post(url, data={"data": query}, timeout=timeout + 2)
+        resp.raise_for_status()
+        for el in resp.json().get("elements", []):
+            if el.get("type") != "count":
+                continue
+            tags = el.get("tags") or {}
+            return {k: int(tags.get(k, 0) or 0) for k in ("nodes", "ways", "relations", "total")}
+    except Exception as e:
+        say(f"Count probe failed on {host}: {e}")
+
+    return None
+
+
+def choose_fetch_strategy(counts, *, wants_geometry=False):
+    """
+    Turn a count probe result into a fetch plan:
+      tile_side - split the bounding box into tile_side x tile_side queries
+      geometry  - whether line geometry is affordable (else points only)
+      warn      - message for the user, or None
+
+    counts=None (probe failed) keeps the old single-query behaviour.
+    """
+    plan = {"tile_side": 1, "geometry": wants_geometry, "warn": None}
+    if not counts:
+        return plan
+
+    total = int(counts.get("total", 0))
+    lines = int(counts.get("ways", 0)) + int(counts.get("relations", 0))
+
+    per_tile = max(1, int(config.COUNT_PROBE_TILE_ELEMENTS))
+    if total > per_tile:
+        side = math.ceil(math.sqrt(total / per_tile))
+        plan["tile_side"] = min(side, int(config.COUNT_PROBE_MAX_TILE_SIDE))
+
+    warnings = []
+    if wants_geometry and lines > int(config.COUNT_PROBE_GEOMETRY_MAX_LINES):
+        plan["geometry"] = False
+        warnings.append(f"{lines} lines in area - fetching points only.")
+
+    if total > int(config.COUNT_PROBE_WARN_ELEMENTS):
+        warnings.append(f"Large layer (~{total} elements) - this may take a while.")
+
+    if warnings:
+        plan["warn"] = " ".join(warnings)
+    return plan
+
+
+def _tile_clauses(area_clause: str, tile_side: int):
+    """
+    Chain a grid of bbox filters after the area clause, one per tile.
+    Overpass intersects stacked spatial filters, so poly + bbox works too.
+    """
+    bb = getattr(config, "bound_box", None)
+    if tile_side <= 1 or not bb:
+        return [area_clause]
+
+    south, west, north, east = (float(v) for v in bb)
+    dlat = (north - south) / tile_side
+    dlon = (east - west) / tile_side
+
+    clauses = []
+    for i in range(tile_side):
+        for j in range(tile_side):
+            s = south + i * dlat
+            w = west + j * dlon
+            clauses.append(f"{area_clause}({s},{w},{s + dlat},{w + dlon})")
+    return clauses
+
+
+def _query_mirrors(query, say, type_name, is_bus):
+    """
+    Run one Overpass query across the mirrors (two rounds, with backoff).
+    Returns the overpy result, or None if every mirror failed.
+    """
     mirrors = list(getattr(config, "overpass_mirrors", []))
     if not mirrors:
         say("No Overpass mirrors configured.")
@@ -195,51 +265,7 @@ def fetch_osm_data(osm_filter, type_name, progress_cb: Optional[Callable[[str],
                     print(f"[BUS DEBUG] Rels:  {len(getattr(result, 'relations', []))}")
                 # DEBUG counters (super helpful)
                 say(f"{host}: nodes={len(getattr(result,'nodes',[]))} ways={len(getattr(result,'ways',[]))} rels={len(getattr(result,'relations',[]))}")
-
-                rows = []
-
-                # Nodes
-                for n in getattr(result, "nodes", []):
-                    rows.append({
-                        "Name": n.tags.get("name", "Unnamed"),
-                        "Type": type_name,
-                        "Latitude": float(n.lat),
-                        "Longitude": float(n.lon),
-                    })
-
-                # Ways (center)
-                for w in getattr(result, "ways", []):
-                    lat = getattr(w, "center_lat", None)
-                    lon = getattr(w, "center_lon", None)
-                    if lat is None or lon is None:
-                        continue
-                    rows.append({
-                        "Name": w.tags.get("name", "Unnamed"),
-                        "Type": type_name,
-                        "Latitude": float(lat),
-                        "Longitude": float(lon),
-                    })
-
-                # Relations (center)
-                for r in getattr(result, "relations", []):
-                    lat = getattr(r, "center_lat", None)
-                    lon = getattr(r, "center_lon", None)
-                    if lat is None or lon is None:
-                        continue
-                    rows.append({
-                        "Name": r.tags.get("name", "Unnamed"),
-                        "Type": type_name,
-                        "Latitude": float(lat),
-                        "Longitude": float(lon),
-                    })
-
-                if not rows:
-                    say(f"No {type_name} found in area.")
-                    return None
-
-                df = pd.DataFrame(rows)
-                say(f"Fetched {len(df)} {type_name} points.")
-                return df
+                return result
 
             except Exception as e:
                 last_error = e
@@ -263,4 +289,149 @@ def fetch_osm_data(osm_filter, type_name, progress_cb: Optional[Callable[[str],
 
     say(f"Failed to fetch {type_name} (all servers). Last error: {last_error}")
     return None
-   
\ No newline at end of file
+
+
+def _rows_from_result(result, type_name, seen: set):
+    """
+    Flatten an overpy result into Name/Type/Latitude/Longitude/OsmId rows.
+    `seen` holds (kind, id) keys so elements shared by two tiles appear once.
+    """
+    rows = []
+
+    def add(kind, el, lat, lon):
+        key = (kind, getattr(el, "id", None))
+        if key in seen:
+            return
+        seen.add(key)
+        rows.append({
+            "Name": el.tags.get("name", "Unnamed"),
+            "Type": type_name,
+            "Latitude": float(lat),
+            "Longitude": float(lon),
+            "OsmId": f"{kind}/{key[1]}",
+        })
+
+    # Nodes
+    for n in getattr(result, "nodes", []):
+        add("node", n, n.lat, n.lon)
+
+    # Ways / relations (center)
+    for kind, elements in (("way", getattr(result, "ways", [])), ("relation", getattr(result, "relations", []))):
+        for el in elements:
+            lat = getattr(el, "center_lat", None)
+            lon = getattr(el, "center_lon", None)
+            if lat is None or lon is None:
+                continue
+            add(kind, el, lat, lon)
+
+    return rows
+
+
+def fetch_osm_data(osm_filter, type_name, progress_cb: Optional[Callable[[str], None]], point1_entry, point2_entry):
+    """
+    Fetch OSM data using Overpass.
+
+    - Accepts osm_filter as string OR list/tuple of strings
+    - Uses nwr (nodes + ways + relations)
+    - Uses out center (so ways/relations get a point)
+    - Probes the element count first; big layers are fetched in bbox tiles
+    - Tk-safe via progress_cb
+    """
+    def say(msg: str):
+        if progress_cb:
+            try:
+                progress_cb(msg)
+            except Exception:
+                pass
+
+    # Ensure config stores exist
+    if not hasattr(config, "all_data") or config.all_data is None:
+        config.all_data = {"Train": None, "Subway": None, "Tram": None, "Bus": None}
+
+    # Area
+    area_clause = _area_clause_from_config()
+    if area_clause is None:
+        if not _save_bounding_box(point1_entry, point2_entry):
+            say("No area set. Set a hiding zone or enter a bounding box.")
+            return None
+        area_clause = _area_clause_from_config()
+
+    if area_clause is None:
+        say("No area set (missing polygon/bounding box).")
+        return None
+
+    # Filters (support list)
+    filters = _filter_list(osm_filter)
+
+    # Already fetched for an area containing this one? Clip locally.
+    area_geom = layer_cache.area_geometry_from_config()
+    cached = layer_cache.lookup("transport", type_name, filters, area_geom)
+    if cached is not None:
+        if cached.empty:
+            say(f"No {type_name} found in area (cached).")
+            return None
+        say(f"Using cached {type_name}: {len(cached)} points in area.")
+        return cached
+
+    # Pinned snapshot date fetched before (by anyone sharing the cache dir)?
+    pinned_key = snapshot.result_key("transport", type_name, filters, area_clause)
+    pinned = snapshot.load_result(pinned_key)
+    if pinned is not None:
+        layer_cache.store("transport", type_name, filters, area_geom, pinned)
+        if pinned.empty:
+            say(f"No {type_name} found in area (snapshot {snapshot.snapshot_date()[:10]}).")
+            return None
+        say(f"Loaded {len(pinned)} {type_name} points from snapshot {snapshot.snapshot_date()[:10]}.")
+        return pinned
+
+    if not getattr(config, "overpass_mirrors", None):
+        say("No Overpass mirrors configured.")
+        return None
+
+    # Count first, then decide single query vs tiles
+    say(f"Counting {type_name} in area...")
+    counts = count_osm_elements(filters, area_clause, progress_cb)
+    plan = choose_fetch_strategy(counts)
+    if counts:
+        say(f"~{counts['total']} {type_name} elements in area.")
+    if plan["warn"]:
+        say(plan["warn"])
+
+    clauses = _tile_clauses(area_clause, plan["tile_side"])
+    is_bus = _is_bus(type_name)
+
+    rows = []
+    seen = set()
+    for tile_i, clause in enumerate(clauses, start=1):
+        # Build query
+        blocks = []
+        for f in filters:
+            blocks.append(f"nwr[{f}]{clause};")
+
+        query = f"""
+    {snapshot.query_settings(50)}
+    (
+      {''.join(blocks)}
+    );
+    out center;
+    """
+
+        if len(clauses) > 1:
+            say(f"Fetching {type_name} tile {tile_i}/{len(clauses)}...")
+
+        result = _query_mirrors(query, say, type_name, is_bus)
+        if result is None:
+            return None
+
+        rows.extend(_rows_from_result(result, type_name, seen))
+
+    df = pd.DataFrame(rows, columns=["Name", "Type", "Latitude", "Longitude", "OsmId"])
+    layer_cache.store("transport", type_name, filters, area_geom, df)
+    snapshot.store_result(pinned_key, df)
+
+    if df.empty:
+        say(f"No {type_name} found in area.")
+        return None
+
+    say(f"Fetched {len(df)} {type_name} points.")
+    return df
@@ -1,4 +1,5 @@
 import config
+from screens.shared.line_lod import LodPaths
 
 def draw_bbox(map_widget, bbox, width=3):
     south, west, north, east = bbox
@@ -35,7 +36,7 @@ def draw_poly(map_widget, poly_str, width=3):
     if not ring:
         return []
     if hasattr(map_widget, "set_path"):
-        return [map_widget.set_path(ring, width=width)]
+        return [LodPaths(map_widget, [ring], width=width)]
     if hasattr(map_widget, "set_polygon"):
         return [map_widget.set_polygon(ring, border_width=width)]
     return []
@@ -1,176 +1,158 @@
-import pandas as pd
-
-from .utils import norm_str, parse_int_tag, haversine_m
-
-
-def is_excluded_park(tags: dict, name: str) -> bool:
-    name_l = norm_str(name)
-
-    amenity = norm_str(tags.get("amenity"))
-    landuse = norm_str(tags.get("landuse"))
-    leisure = norm_str(tags.get("leisure"))
-    cemetery = norm_str(tags.get("cemetery"))
-    historic = norm_str(tags.get("historic"))
+import difflib
+import re
 
-    if amenity in ("grave_yard", "cemetery"):
-        return True
+import numpy as np
+import pandas as pd
 
-    if landuse in ("cemetery", "religious"):
-        if cemetery in ("churchyard", "graveyard") or "church" in name_l:
-            return True
-        if "cemetery" in name_l or "graveyard" in name_l or "churchyard" in name_l:
-            return True
+from spatial_index import radius_merge
+from .tag_rules import AnyOf, IntTagBetween, NameContains, NameIs, RuleSet, TagIn, TagSet
+
+
+# ------------------------------------------------------------
+# Declarative rules (evaluated in bulk by fetch_pois, see tag_rules)
+# ------------------------------------------------------------
+_CEMETERY_LANDUSE = TagIn("landuse", "cemetery", "religious")
+
+PARK_EXCLUDE = AnyOf(
+    TagIn("amenity", "grave_yard", "cemetery"),
+    _CEMETERY_LANDUSE & (TagIn("cemetery", "churchyard", "graveyard") | NameContains("church")),
+    TagIn("cemetery", "churchyard"),
+    TagIn("historic", "churchyard"),
+    NameContains("churchyard", "graveyard", "cemetery"),
+    TagIn("leisure", "garden"),
+    # also catches "... garden" at the end and " gardens"
+    NameContains(" garden"),
+)
+
+MUSEUM_REQUIRE = TagSet("building") | TagSet("building:part")
+
+MUSEUM_EXCLUDE = AnyOf(
+    TagIn("museum", "open_air"),
+    TagIn("tourism", "attraction") & NameContains("museum"),
+    TagIn("tourism", "archaeological_site"),
+    TagSet("heritage", ignore=("yes",)),
+    NameContains("open air", "open-air", "heritage site", "outdoor"),
+    TagIn("amenity", "museum") & TagIn("building", "no", "roof", "tent"),
+)
+
+_SMALL_COURSE = ("pitch_and_putt", "par3", "par_3")
+
+GOLF_EXCLUDE = AnyOf(
+    # Explicit non-courses / practice / mini golf / pitch & putt
+    TagIn(
+        "golf",
+        "driving_range", "practice",
+        "miniature", "miniature_golf", "minigolf",
+        "pitch_and_putt", "pitch_putt", "par3", "par_3", "par3_course", "par_3_course",
+    ),
+    TagIn("leisure", "miniature_golf"),
+    TagIn("course", *_SMALL_COURSE),
+    TagIn("course:type", *_SMALL_COURSE),
+    # Small courses by holes
+    IntTagBetween(("holes", "golf:holes"), lo=0, hi=18),
+    NameContains("pitch and putt", "pitch & putt", "par 3", "par-3", "mini golf", "minigolf"),
+)
 
-    if cemetery == "churchyard":
-        return True
-    if historic == "churchyard":
-        return True
-    if "churchyard" in name_l or "graveyard" in name_l or "cemetery" in name_l:
-        return True
+HOSPITAL_PRIVATE = AnyOf(
+    TagIn("operator:type", "private"),
+    TagIn("ownership", "private"),
+    TagIn("access", "private"),
+)
 
-    if leisure == "garden":
-        return True
-    if " garden" in name_l or name_l.endswith(" garden") or " gardens" in name_l:
-        return True
+_REHAB = ("rehabilitation", "physiotherapy", "occupational_therapy")
 
-    return False
+HOSPITAL_EXCLUDE = AnyOf(
+    # Hospices
+    TagIn("amenity", "hospice"),
+    TagIn("healthcare", "hospice"),
+    TagIn("hospice", "yes", "true", "1"),
+    NameContains("hospice"),
+    # Research centres
+    TagIn("amenity", "research_institute"),
+    NameContains("research centre", "research center", "research institute"),
+    # Resource centres / rehab-type units
+    NameContains("resource centre", "resource center", "resource unit"),
+    TagIn("amenity", "social_facility", "community_centre"),
+    TagIn("healthcare", *_REHAB),
+    TagIn("healthcare:speciality", *_REHAB),
+    # Day hospitals / outpatient units
+    NameContains("day hospital", "day unit", "outpatient", "out-patient"),
+    TagIn("healthcare", "day_care", "outpatient", "clinic"),
+)
+
+MISSION_EXCLUDE = AnyOf(
+    NameContains("residence of", "ambassador's residence"),
+    NameContains(
+        "consular section",
+        "consular department",
+        "consulate general",
+        "consulate of",
+        "visa office",
+        "passport",
+        "trade",
+        "commercial",
+        "defence",
+        "defense",
+        "military",
+        "attache",
+        "education section",
+        "cultural",
+        "medical office",
+        "student department",
+        "science & technology",
+        "naval",
+        "delegation of",
+    ),
+)
+
+MISSION_REQUIRE = NameContains(
+    "embassy of",
+    "high commission of",
+    "royal embassy",
+    "delegation of the european union",
+)
+
+# Gameplay name blacklist (all types)
+NAME_BLACKLIST = AnyOf(
+    NameContains("house of ") & ~NameIs("house of commons", "house of lords"),
+    NameContains("official residence of"),
+)
+
+_TYPE_RULES = {
+    "park": RuleSet(exclude=[PARK_EXCLUDE]),
+    "golf course": RuleSet(exclude=[GOLF_EXCLUDE]),
+    "museum": RuleSet(require=[MUSEUM_REQUIRE], exclude=[MUSEUM_EXCLUDE]),
+    "hospital": RuleSet(exclude=[HOSPITAL_PRIVATE, HOSPITAL_EXCLUDE]),
+    "foreign mission": RuleSet(require=[MISSION_REQUIRE], exclude=[MISSION_EXCLUDE]),
+}
+
+
+def rules_for(type_key: str) -> RuleSet:
+    """Rules applied to a POI type: its own, plus the global name blacklist."""
+    return _TYPE_RULES.get(type_key, RuleSet()) + RuleSet(exclude=[NAME_BLACKLIST])
+
+
+# ------------------------------------------------------------
+# Single-element checks (same rules, one row at a time)
+# ------------------------------------------------------------
+def is_excluded_park(tags: dict, name: str) -> bool:
+    return PARK_EXCLUDE.matches(tags, name)
 
 
 def is_non_building_museum(tags: dict, name: str) -> bool:
-    amenity = norm_str(tags.get("amenity"))
-    tourism = norm_str(tags.get("tourism"))
-    building = norm_str(tags.get("building"))
-    museum = norm_str(tags.get("museum"))
-    heritage = norm_str(tags.get("heritage"))
-    name_l = norm_str(name)
-
-    if museum == "open_air":
-        return True
-    if tourism == "attraction" and "museum" in name_l:
-        return True
-
-    if tourism == "archaeological_site":
-        return True
-    if heritage and heritage != "yes":
-        return True
-
-    if "open air" in name_l or "open-air" in name_l:
-        return True
-    if "heritage site" in name_l:
-        return True
-    if "outdoor" in name_l:
-        return True
-
-    if amenity == "museum" and building in ("no", "roof", "tent"):
-        return True
-
-    return False
+    return MUSEUM_EXCLUDE.matches(tags, name)
 
 
 def is_excluded_golf_course(tags: dict, name: str) -> bool:
-    name_l = norm_str(name)
-
-    golf = norm_str(tags.get("golf"))
-    leisure = norm_str(tags.get("leisure"))
-
-    # Explicit non-courses / practice
-    if golf in ("driving_range", "practice"):
-        return True
-
-    # Mini golf
-    if leisure == "miniature_golf":
-        return True
-    if golf in ("miniature", "miniature_golf", "minigolf"):
-        return True
-
-    # Pitch & putt / par-3 (tag-based)
-    if golf in ("pitch_and_putt", "pitch_putt", "par3", "par_3", "par3_course", "par_3_course"):
-        return True
-
-    course = norm_str(tags.get("course"))
-    course_type = norm_str(tags.get("course:type"))
-    if course in ("pitch_and_putt", "par3", "par_3") or course_type in ("pitch_and_putt", "par3", "par_3"):
-        return True
-
-    # Small courses by holes
-    holes = parse_int_tag(tags, "holes") or parse_int_tag(tags, "golf:holes")
-    if holes > 0 and holes < 18:
-        return True
-
-    # Name-based fallback
-    if "pitch and putt" in name_l:
-        return True
-    if "pitch & putt" in name_l:
-        return True
-    if "par 3" in name_l or "par-3" in name_l:
-        return True
-    if "mini golf" in name_l or "minigolf" in name_l:
-        return True
-
-    return False
+    return GOLF_EXCLUDE.matches(tags, name)
 
 
 def is_private_hospital(tags: dict) -> bool:
-    op_type = norm_str(tags.get("operator:type"))
-    ownership = norm_str(tags.get("ownership"))
-    access = norm_str(tags.get("access"))
-
-    if op_type == "private":
-        return True
-    if ownership == "private":
-        return True
-    if access == "private":
-        return True
-
-    return False
+    return HOSPITAL_PRIVATE.matches(tags)
 
 
 def is_excluded_hospital(tags: dict, name: str) -> bool:
-    amenity = norm_str(tags.get("amenity"))
-    healthcare = norm_str(tags.get("healthcare"))
-    speciality = norm_str(tags.get("healthcare:speciality"))
-    hospice_flag = norm_str(tags.get("hospice"))
-    name_l = norm_str(name)
-
-    # Hospices
-    if amenity == "hospice" or healthcare == "hospice":
-        return True
-    if hospice_flag in ("yes", "true", "1"):
-        return True
-    if "hospice" in name_l:
-        return True
-
-    # Research centres
-    if amenity == "research_institute":
-        return True
-    if "research centre" in name_l or "research center" in name_l:
-        return True
-    if "research institute" in name_l:
-        return True
-
-    # Resource centres / rehab-type units
-    if "resource centre" in name_l or "resource center" in name_l:
-        return True
-    if "resource unit" in name_l:
-        return True
-    if amenity in ("social_facility", "community_centre"):
-        return True
-    if healthcare in ("rehabilitation", "physiotherapy", "occupational_therapy"):
-        return True
-    if speciality in ("rehabilitation", "physiotherapy", "occupational_therapy"):
-        return True
-
-    # Day hospitals / outpatient units
-    if "day hospital" in name_l:
-        return True
-    if "day unit" in name_l:
-        return True
-    if "outpatient" in name_l or "out-patient" in name_l:
-        return True
-    if healthcare in ("day_care", "outpatient", "clinic"):
-        return True
-
-    return False
+    return HOSPITAL_EXCLUDE.matches(tags, name)
 
 
 def merge_nearby_hospitals(df: pd.DataFrame, radius_m: float = 500.0) -> pd.DataFrame:
@@ -186,27 +168,87 @@ def merge_nearby_hospitals(df: pd.DataFrame, radius_m: float = 500.0) -> pd.Data
         work["Beds"] = 0
 
     work["Beds"] = pd.to_numeric(work["Beds"], errors="coerce").fillna(0).astype(int)
-    work = work.sort_values(by=["Beds", "Name"], ascending=[False, True]).reset_index(drop=True)
+    return radius_merge(work, radius_m, rank_col="Beds", tie_col="Name")
 
-    kept_rows = []
-    removed = [False] * len(work)
 
-    for i in range(len(work)):
-        if removed[i]:
-            continue
+# ------------------------------------------------------------
+# One feature, several OSM elements (node + way + relation)
+# ------------------------------------------------------------
+# A node and an area with the same name within this many metres are one
+# feature. Only centres are fetched, and big areas sit far from their node.
+_ELEMENT_MERGE_RADIUS_M = {
+    "commercial airport": 2000.0,
+    "park": 1000.0,
+    "golf course": 1000.0,
+    "amusement park": 800.0,
+    "zoo": 600.0,
+}
+_DEFAULT_ELEMENT_MERGE_RADIUS_M = 300.0
 
-        anchor = work.iloc[i]
-        kept_rows.append(anchor)
+# A name found whole inside another only counts as the same name when it is
+# specific enough: two words or more, or most of the longer name. "Museum"
+# is not "Riverside Museum", "Kelvingrove Art Gallery" is.
+_CONTAINED_NAME_MIN_TOKENS = 2
+_CONTAINED_NAME_MIN_SHARE = 0.6
 
-        a_lat = float(anchor["Latitude"])
-        a_lon = float(anchor["Longitude"])
+# Best representative first: the relation/way carries the whole feature
+_ELEMENT_RANK = {"relation": 0, "way": 1, "node": 2}
 
-        for j in range(i + 1, len(work)):
-            if removed[j]:
-                continue
-            cand = work.iloc[j]
-            d = haversine_m(a_lat, a_lon, float(cand["Latitude"]), float(cand["Longitude"]))
-            if d <= radius_m:
-                removed[j] = True
 
-    return pd.DataFrame(kept_rows).reset_index(drop=True)
+def _name_keys(names: pd.Series) -> np.ndarray:
+    s = names.astype(str).str.lower().str.replace("&", " and ", regex=False)
+    s = s.str.replace(r"[^\w]+", " ", regex=True).str.strip()
+    s = s.str.replace(r"^the ", "", regex=True)
+    return s.to_numpy(dtype=object)
+
+
+def _similar_names(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    if not a or not b:
+        return False
+    short, long_ = (a, b) if len(a) <= len(b) else (b, a)
+    specific = (len(short.split()) >= _CONTAINED_NAME_MIN_TOKENS
+                or len(short) >= _CONTAINED_NAME_MIN_SHARE * len(long_))
+    if specific and re.search(rf"(^| ){re.escape(short)}( |$)", long_):
+        return True
+    return difflib.SequenceMatcher(None, a, b).ratio() >= 0.9
+
+
+def merge_element_duplicates(df: pd.DataFrame, type_key: str, radius_m: float = None) -> pd.DataFrame:
+    """
+    Collapse a feature mapped as more than one element (museum node + building
+    way, park way + multipolygon relation) into one row. Pairs must be of
+    different element types, with similar names, within the type's radius.
+    Keeps relation > way > node.
+    """
+    if df is None or df.empty:
+        return df
+    if "OsmId" not in df.columns:
+        # Rows cached or pinned before element ids were kept
+        print(f"[ELEMENT MERGE] {type_key}: no OsmId column, duplicates not merged")
+        return df
+    missing = int(df["OsmId"].isna().sum())
+    if missing:
+        print(f"[ELEMENT MERGE] {type_key}: {missing} rows without OsmId, kept as the lowest-ranked element")
+
+    if radius_m is None:
+        radius_m = _ELEMENT_MERGE_RADIUS_M.get(type_key, _DEFAULT_ELEMENT_MERGE_RADIUS_M)
+
+    work = df.copy()
+    kinds = work["OsmId"].astype(str).str.split("/").str[0]
+    work["_rank"] = kinds.map(_ELEMENT_RANK).fillna(len(_ELEMENT_RANK)).astype(int)
+
+    def same_feature(ranked, i, j):
+        rank = ranked["_rank"].to_numpy()
+        names = _name_keys(ranked["Name"])
+        kind = rank[i] != rank[j]
+        same = names[i] == names[j]
+        # Only pairs with different spellings need the slower comparison
+        for n in np.flatnonzero(kind & ~same):
+            same[n] = _similar_names(names[i[n]], names[j[n]])
+        return kind & same
+
+    out = radius_merge(work, radius_m, rank_col="_rank", ascending=True, tie_col="Name",
+                       pair_filter=same_feature)
+    return out.drop(columns=["_rank"])
@@ -1,21 +1,19 @@
 ﻿import threading
 import queue
 import random
+import numpy as np
 import pandas as pd
 import overpy
 import time
 import socket
 import config
+import layer_cache
+import snapshot
+from osm_fetcher import count_osm_elements, choose_fetch_strategy
 
-from .utils import clean_name, norm_str, parse_int_tag
-from .filters import (
-    is_excluded_park,
-    is_excluded_golf_course,
-    is_non_building_museum,
-    is_private_hospital,
-    is_excluded_hospital,
-    merge_nearby_hospitals,
-)
+from .utils import clean_name, norm_str
+from .filters import merge_element_duplicates, merge_nearby_hospitals, rules_for
+from .tag_rules import build_tag_table, parse_int_column
 
 # ============================================================
 # Timeout helper
@@ -88,6 +86,104 @@ def area_clause_from_config():
     return None
 
 
+# ============================================================
+# Post-processing shared by fresh and cached generic POIs
+# ============================================================
+_CINEMA_NAME_FALLBACK = ("brand", "operator", "short_name", "name:en", "ref")
+
+# Types whose display name can come from a tag other than name=
+_NAME_FALLBACK_TYPES = ("cinema",)
+
+
+def _clean_names(values) -> pd.Series:
+    """Vectorised clean_name."""
+    s = pd.Series(values, dtype=object)
+    s = s.where(s.notna(), "").astype(str).str.strip()
+    return s.mask(s.str.lower() == "unnamed", "")
+
+
+def _rows_from_elements(result, type_key: str, type_name: str, rules=None) -> pd.DataFrame:
+    """
+    Named, rule-filtered rows for an `out center` result. Tags are turned
+    into one table and the type's rules run over all of it at once.
+    `rules` defaults to rules_for(type_key); pass the residual of a
+    pushed-down query to skip checks Overpass already made.
+    """
+    elements = list(result.nodes)
+    lats = [n.lat for n in result.nodes]
+    lons = [n.lon for n in result.nodes]
+    ids = [f"node/{n.id}" for n in result.nodes]
+    for kind, items in (("way", result.ways), ("relation", result.relations)):
+        for e in items:
+            lat = getattr(e, "center_lat", None)
+            lon = getattr(e, "center_lon", None)
+            if lat is None or lon is None:
+                continue
+            elements.append(e)
+            lats.append(lat)
+            lons.append(lon)
+            ids.append(f"{kind}/{e.id}")
+
+    columns = ["Name", "Type", "Latitude", "Longitude"] + (["Beds"] if type_key == "hospital" else []) + ["OsmId"]
+    if not elements:
+        return pd.DataFrame(columns=columns)
+
+    tags = [e.tags for e in elements]
+    names = _clean_names([t.get("name") for t in tags])
+
+    # Cinema fallback: OSM often lacks name= for cinemas
+    if type_key == "cinema":
+        unnamed = names == ""
+        if unnamed.any():
+            fallback = []
+            for t in (tags[i] for i in np.flatnonzero(unnamed.to_numpy())):
+                fallback.append(next((t.get(k) for k in _CINEMA_NAME_FALLBACK if t.get(k)), None))
+            fallback = _clean_names(fallback).replace("", "Cinema (unnamed)")
+            names[unnamed] = fallback.to_numpy()
+
+    # For other types, keep strict: must be named
+    if rules is None:
+        rules = rules_for(type_key)
+    keys = rules.keys() | ({"beds", "capacity"} if type_key == "hospital" else set())
+    table = build_tag_table(tags, names.tolist(), keys)
+    keep = (names != "").to_numpy() & rules.keep_mask(table)
+
+    df = pd.DataFrame({
+        "Name": names.to_numpy()[keep],
+        "Type": type_name,
+        "Latitude": np.asarray(lats, dtype=float)[keep],
+        "Longitude": np.asarray(lons, dtype=float)[keep],
+        "OsmId": np.asarray(ids, dtype=object)[keep],
+    })
+    if type_key == "hospital":
+        beds = parse_int_column(table["beds"])
+        capacity = parse_int_column(table["capacity"])
+        df["Beds"] = np.where(beds != 0, beds, capacity)[keep]
+    return df[columns]
+
+
+def _finish_generic(df, type_key: str, type_name: str, status_label):
+    # Hospitals skip this: the 500 m merge below already covers it and ranks by Beds
+    if type_key != "hospital":
+        before = len(df)
+        df = merge_element_duplicates(df, type_key)
+        if before > len(df):
+            print(f"[FETCH_POIS] {type_name}: merged {before - len(df)} node/way/relation duplicates")
+
+    if type_key == "hospital":
+        before = len(df)
+        df = merge_nearby_hospitals(df, radius_m=500.0)
+        merged = before - len(df)
+        if merged > 0:
+            status_label.config(text=f"Fetched {len(df)} hospitals (merged {merged} nearby).")
+
+    if "Name" in df.columns and not df.empty:
+        df = df[df["Name"].astype(str).str.strip().ne("")]
+        df = df[df["Name"].astype(str).str.lower().ne("unnamed")]
+
+    return df
+
+
 # ============================================================
 # Main fetch
 # ============================================================
@@ -114,6 +210,36 @@ def fetch_pois(osm_filter, type_name: str, status_label):
 
     type_key = " ".join(str(type_name).split()).lower()
 
+    # ------------------------------------------------------------
+    # Layer cache: a sub-area of an earlier fetch is clipped locally
+    # ------------------------------------------------------------
+    area_geom = layer_cache.area_geometry_from_config(include_saved_bbox=True)
+    cached = layer_cache.lookup("poi", type_key, filters, area_geom)
+    if cached is not None:
+        if cached.empty:
+            status_label.config(text=f"No named {type_name} found (cached).")
+            return None
+        df = cached
+        if "Geometry" not in df.columns and "Kind" not in df.columns:
+            df = _finish_generic(df, type_key, type_name, status_label)
+        status_label.config(text=f"Using cached {type_name}: {len(df)} in area.")
+        print(f"[FETCH_POIS CACHED] {type_name} -> rows = {len(df)}")
+        return df
+
+    # Pinned snapshot date: results are immutable, so a stored copy is final
+    pinned_key = snapshot.result_key("poi", type_key, filters, area_clause)
+    pinned = snapshot.load_result(pinned_key)
+    if pinned is not None:
+        layer_cache.store("poi", type_key, filters, area_geom, pinned)
+        if pinned.empty:
+            status_label.config(text=f"No named {type_name} found (snapshot).")
+            return None
+        df = pinned
+        if "Geometry" not in df.columns and "Kind" not in df.columns:
+            df = _finish_generic(df, type_key, type_name, status_label)
+        status_label.config(text=f"Loaded {len(df)} {type_name} from snapshot {snapshot.snapshot_date()[:10]}.")
+        return df
+
     # ------------------------------------------------------------
     # Special case: Body of water
     #   - points first (lakes/ponds/reservoir/etc)
@@ -126,8 +252,12 @@ def fetch_pois(osm_filter, type_name: str, status_label):
             is_water = True
 
     if is_water:
-        df = fetch_body_of_water(area_clause, status_label, mirrors, short_host)
+        df, complete = fetch_body_of_water(area_clause, status_label, mirrors, short_host)
         if df is not None:
+            # A partial answer (a failed stage, the points-only plan) is not cached
+            if complete:
+                layer_cache.store("poi", type_key, filters, area_geom, df)
+                snapshot.store_result(pinned_key, df)
             print(f"[FETCH_POIS RETURN] {type_name} -> columns = {list(df.columns)} rows = {len(df)}")
         return df
 
@@ -136,21 +266,28 @@ def fetch_pois(osm_filter, type_name: str, status_label):
     # ------------------------------------------------------------
 
     if type_key == "coastline":
-        df = fetch_coastline_lines(area_clause, status_label, mirrors, short_host)
+        df, complete = fetch_coastline_lines(area_clause, status_label, mirrors, short_host)
         if df is not None:
+            if complete:
+                layer_cache.store("poi", type_key, filters, area_geom, df)
+                snapshot.store_result(pinned_key, df)
             print(f"[FETCH_POIS RETURN] {type_name} -> columns = {list(df.columns)} rows = {len(df)}")
         return df    
     # ------------------------------------------------------------
     # Generic POI query (points only using center for ways/relations)
     # ------------------------------------------------------------
+    # Rules Overpass can evaluate go into the query; the rest run on the rows
+    alternatives, residual = rules_for(type_key).pushdown(names=type_key not in _NAME_FALLBACK_TYPES)
+
     blocks = []
     for f in filters:
-        blocks.append(f'node[{f}]{area_clause};')
-        blocks.append(f'way[{f}]{area_clause};')
-        blocks.append(f'relation[{f}]{area_clause};')
+        for alt in alternatives:
+            blocks.append(f'node[{f}]{alt}{area_clause};')
+            blocks.append(f'way[{f}]{alt}{area_clause};')
+            blocks.append(f'relation[{f}]{alt}{area_clause};')
 
     query = f"""
-    [out:json][timeout:50];
+    {snapshot.query_settings(50)}
     (
       {"".join(blocks)}
     );
@@ -165,143 +302,16 @@ def fetch_pois(osm_filter, type_name: str, status_label):
             api = overpy.Overpass(url=url)
             result = run_with_timeout(lambda: api.query(query), timeout=12)
 
-            rows = []
-
-            def maybe_add(name, tags, lat, lon):
-                name = clean_name(name)
-
-                # Cinema fallback: OSM often lacks name= for cinemas
-                if not name and type_key == "cinema":
-                    name = clean_name(
-                        tags.get("brand")
-                        or tags.get("operator")
-                        or tags.get("short_name")
-                        or tags.get("name:en")
-                        or tags.get("ref")
-                    )
-                    if not name:
-                        name = "Cinema (unnamed)"
-
-                # For other types, keep strict: must be named
-                if not name:
-                    return
-
-                name_l = norm_str(name)
-
-                # Foreign mission cleanup (ONLY for missions)
-                if type_key == "foreign mission":
-                    if "residence of" in name_l or "ambassador's residence" in name_l:
-                        return
-
-                    BAD_KEYWORDS = (
-                        "consular section",
-                        "consular department",
-                        "consulate general",
-                        "consulate of",
-                        "visa office",
-                        "passport",
-                        "trade",
-                        "commercial",
-                        "defence",
-                        "defense",
-                        "military",
-                        "attache",
-                        "education section",
-                        "cultural",
-                        "medical office",
-                        "student department",
-                        "science & technology",
-                        "naval",
-                        "delegation of",
-                    )
-                    if any(k in name_l for k in BAD_KEYWORDS):
-                        return
-
-                    ALLOWED_KEYWORDS = (
-                        "embassy of",
-                        "high commission of",
-                        "royal embassy",
-                        "delegation of the european union",
-                    )
-                    if not any(k in name_l for k in ALLOWED_KEYWORDS):
-                        return
-
-                # Gameplay name blacklist (all types)
-                if "house of " in name_l and name_l not in ("house of commons", "house of lords"):
-                    return
-
-                if "official residence of" in name_l:
-                    return
-
-                # Type-specific filters
-                if type_key == "park" and is_excluded_park(tags, name):
-                    return
-
-                if type_key == "golf course" and is_excluded_golf_course(tags, name):
-                    return
-
-                if type_key == "museum":
-                    if not norm_str(tags.get("building")) and not norm_str(tags.get("building:part")):
-                        return
-                    if is_non_building_museum(tags, name):
-                        return
-
-                if type_key == "hospital":
-                    if is_private_hospital(tags):
-                        return
-                    if is_excluded_hospital(tags, name):
-                        return
-
-                    beds = parse_int_tag(tags, "beds") or parse_int_tag(tags, "capacity")
-                    rows.append({
-                        "Name": name,
-                        "Type": type_name,
-                        "Latitude": float(lat),
-                        "Longitude": float(lon),
-                        "Beds": beds,
-                    })
-                    return
-
-                rows.append({
-                    "Name": name,
-                    "Type": type_name,
-                    "Latitude": float(lat),
-                    "Longitude": float(lon),
-                })
-
-            for n in result.nodes:
-                maybe_add(n.tags.get("name"), n.tags, n.lat, n.lon)
-
-            for w in result.ways:
-                lat = getattr(w, "center_lat", None)
-                lon = getattr(w, "center_lon", None)
-                if lat is None or lon is None:
-                    continue
-                maybe_add(w.tags.get("name"), w.tags, lat, lon)
-
-            for r in result.relations:
-                lat = getattr(r, "center_lat", None)
-                lon = getattr(r, "center_lon", None)
-                if lat is None or lon is None:
-                    continue
-                maybe_add(r.tags.get("name"), r.tags, lat, lon)
+            raw_df = _rows_from_elements(result, type_key, type_name, residual)
+            # Cache the rows before merging, so a sub-area merges its own set
+            layer_cache.store("poi", type_key, filters, area_geom, raw_df)
+            snapshot.store_result(pinned_key, raw_df)
 
-            if not rows:
+            if raw_df.empty:
                 status_label.config(text=f"No named {type_name} found.")
                 return None
 
-            df = pd.DataFrame(rows)
-
-            if type_key == "hospital":
-                before = len(df)
-                df = merge_nearby_hospitals(df, radius_m=500.0)
-                merged = before - len(df)
-                if merged > 0:
-                    status_label.config(text=f"Fetched {len(df)} hospitals (merged {merged} nearby).")
-
-            if "Name" in df.columns and not df.empty:
-                df = df[df["Name"].astype(str).str.strip().ne("")]
-                df = df[df["Name"].astype(str).str.lower().ne("unnamed")]
+            df = _finish_generic(raw_df, type_key, type_name, status_label)
 
             status_label.config(text=f"Fetched {len(df)} named {type_name}.")
             print(f"[FETCH_POIS RETURN] {type_name} -> columns = {list(df.columns)} rows = {len(df)}")
@@ -327,27 +337,32 @@ def fetch_body_of_water(area_clause, status_label, mirrors, short_host):
       1) named still-water points (lakes/ponds/reservoir/etc)
       2) named moving-water lines (rivers/streams/canals) as WAYS with geom
     If stage (2) fails, return stage (1) results.
+
+    Returns (df, complete); complete is False when any stage failed or the
+    lines came back as points only, so the result must not be cached.
     """
     df_points = fetch_water_points(area_clause, status_label, mirrors, short_host)
+    points_ok = df_points is not None
     if df_points is None:
         df_points = pd.DataFrame()
 
-    df_lines = fetch_water_lines(area_clause, status_label, mirrors, short_host)
+    df_lines, lines_ok = fetch_water_lines(area_clause, status_label, mirrors, short_host)
+    complete = points_ok and lines_ok
     if df_lines is None:
         # If lines fail, still return points if we have any
-        return df_points if not df_points.empty else None
+        return (df_points if not df_points.empty else None), False
 
     if df_points.empty:
-        return df_lines
+        return df_lines, complete
 
-    return pd.concat([df_points, df_lines], ignore_index=True)
+    return pd.concat([df_points, df_lines], ignore_index=True), complete
 
 
 def fetch_water_points(area_clause, status_label, mirrors, short_host):
     df = None  # <-- key fix
 
     q_points = f"""
-    [out:json][timeout:80][maxsize:1073741824];
+    {snapshot.query_settings(80, maxsize=1073741824)}
     (
       node[natural=water][name]{area_clause};
       way[natural=water][name]{area_clause};
@@ -417,7 +432,7 @@ def fetch_water_points(area_clause, status_label, mirrors, short_host):
 
             if not rows:
                 status_label.config(text="No named water points found.")
-                return None
+                return pd.DataFrame()
 
             df = pd.DataFrame(rows)
             status_label.config(text=f"Fetched {len(df)} water points.")
@@ -440,9 +455,21 @@ def fetch_water_lines(area_clause, status_label, mirrors, short_host):
       Stage 2: named streams (WAYS only)               ✅ optional, only if stage 1 worked
 
     Geometry is rebuilt from returned nodes: (._;>;); out body;
+    A count probe runs first; if there are too many ways for geometry,
+    each way comes back as a single centre point instead.
+
+    Returns (df, complete): complete only when both stages succeeded with
+    geometry.
     """
     df = None
 
+    counts = count_osm_elements('waterway~"^(river|canal|stream)$"][name', area_clause)
+    plan = choose_fetch_strategy(counts, wants_geometry=True)
+    with_geometry = plan["geometry"]
+    if plan["warn"]:
+        status_label.config(text=f"Water lines: {plan['warn']}")
+        status_label.update_idletasks()
+
     def _fetch_lines_for_kinds(kinds, stage_label, timeout_s):
         """
         kinds: iterable like ("river","canal")
@@ -452,13 +479,17 @@ def fetch_water_lines(area_clause, status_label, mirrors, short_host):
         kinds_re = "|".join(kinds)
 
         # WAYS ONLY + [name] keeps it sane.
+        if with_geometry:
+            out_stmt = "(._;>;);\n        out body;"
+        else:
+            out_stmt = "out center;"
+
         q = f"""
-        [out:json][timeout:80][maxsize:1073741824];
+        {snapshot.query_settings(80, maxsize=1073741824)}
         (
           way[waterway~"^({kinds_re})$"][name]{area_clause};
         );
-        (._;>;);
-        out body;
+        {out_stmt}
         """
 
         overload_backoffs = [1.5, 3.0, 5.0]
@@ -506,13 +537,29 @@ def fetch_water_lines(area_clause, status_label, mirrors, short_host):
                         if ww not in kinds:
                             continue
                         total += 1
+                        name = clean_name(w.tags.get("name") or w.tags.get("name:en")) or ""
+
+                        # Points-only plan: one marker per way at its centre
+                        if not with_geometry:
+                            lat = getattr(w, "center_lat", None)
+                            lon = getattr(w, "center_lon", None)
+                            if lat is None or lon is None:
+                                continue
+                            ok += 1
+                            rows.append({
+                                "Name": name,
+                                "Type": "Body of water",
+                                "Kind": ww,
+                                "Latitude": float(lat),
+                                "Longitude": float(lon),
+                            })
+                            continue
 
                         geom = way_to_geom(w)
                         if not geom:
                             continue
                         ok += 1
 
-                        name = clean_name(w.tags.get("name") or w.tags.get("name:en")) or ""
                         rows.append({
                             "Name": name,              # named by query constraint, but keep safe
                             "Type": "Body of water",
@@ -572,11 +619,11 @@ def fetch_water_lines(area_clause, status_label, mirrors, short_host):
     # -------------------------
     stage1 = _fetch_lines_for_kinds(("river", "canal"), stage_label="water lines (rivers+canals)", timeout_s=25)
     if stage1 is None:
-        return None  # mirrors fully failed for stage 1
+        return None, False  # mirrors fully failed for stage 1
     if not stage1:
         status_label.config(text="No usable river/canal lines produced.")
         print("[WATER LINES] ❌ Stage 1 produced no usable geometry.")
-        return None
+        return None, False
 
     status_label.config(text=f"Fetched {len(stage1)} river/canal line segments. Fetching streams…")
     status_label.update_idletasks()
@@ -590,12 +637,12 @@ def fetch_water_lines(area_clause, status_label, mirrors, short_host):
         print("[WATER LINES] ⚠ Stage 2 (streams) failed; returning rivers/canals only.")
         df = pd.DataFrame(stage1)
         status_label.config(text=f"Fetched {len(df)} water line segments (streams unavailable).")
-        return df
+        return df, False
 
     # Merge stage 1 + stage 2
     rows = stage1 + stage2
     if not rows:
-        return None
+        return None, False
 
     df = pd.DataFrame(rows)
     if "Name" in df.columns:
@@ -603,17 +650,26 @@ def fetch_water_lines(area_clause, status_label, mirrors, short_host):
 
     status_label.config(text=f"Fetched {len(df)} water line segments (rivers/canals + streams).")
     print(f"[WATER LINES] ✅ Returning {len(df)} line segments (stage1={len(stage1)}, stage2={len(stage2)})")
-    return df
+    return df, with_geometry
 def fetch_coastline_lines(area_clause, status_label, mirrors, short_host):
     """
     Coastline as LINES.
     Rebuild geometry from nodes (same approach as water lines).
     Coastlines are usually unnamed, so we do NOT require name.
+
+    Returns (df, complete) like fetch_water_lines; a single stage, so any
+    returned frame is complete.
     """
     df = None
 
+    # Coastline is only useful as lines, so the probe can only warn here
+    plan = choose_fetch_strategy(count_osm_elements("natural=coastline", area_clause))
+    if plan["warn"]:
+        status_label.config(text=f"Coastline: {plan['warn']}")
+        status_label.update_idletasks()
+
     q = f"""
-    [out:json][timeout:80][maxsize:1073741824];
+    {snapshot.query_settings(80, maxsize=1073741824)}
     (
       way[natural=coastline]{area_clause};
       relation[natural=coastline]{area_clause};
@@ -680,12 +736,12 @@ def fetch_coastline_lines(area_clause, status_label, mirrors, short_host):
             if not rows:
                 status_label.config(text="No usable coastline lines produced.")
                 print("[COASTLINE] ❌ No usable coastline geometry produced.")
-                return None
+                return None, False
 
             df = pd.DataFrame(rows)
             status_label.config(text=f"Fetched {len(df)} coastline segments.")
             print(f"[COASTLINE] ✅ Returning {len(df)} coastline segments")
-            return df
+            return df, True
 
         except TimeoutError:
             print(f"[COASTLINE] ⏱ Timeout on {short_host(url)}")
@@ -698,4 +754,4 @@ def fetch_coastline_lines(area_clause, status_label, mirrors, short_host):
             status_label.update_idletasks()
 
     print("[COASTLINE] ❌ All mirrors failed")
-    return df
\ No newline at end of file
+    return df, False
\ No newline at end of file
@@ -0,0 +1,432 @@
+"""
+Declarative POI tag rules, evaluated over a whole tag table at once.
+
+A rule is built from small atoms (tag in values, name contains, ...) and
+combined with |, & and ~. Evaluating a rule returns a boolean mask for
+every row of a tag table, using pandas string ops and one precompiled
+regex per atom, so filtering a large Overpass response needs no
+per-element Python loop.
+
+Tag table: one row per element, one column per tag key, values already
+normalised (str, stripped, lower case, "" when missing). The display name
+lives in the NAME column.
+
+Rules that Overpass can evaluate exactly are also turned into query
+filters (RuleSet.pushdown), so those elements are never downloaded.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from .utils import norm_str, parse_int_tag
+
+NAME = "__name__"
+
+
+def _norm_column(values) -> pd.Series:
+    # Tag columns repeat a handful of values, so normalise the uniques only
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    norm = np.array([norm_str(u) for u in uniques] + [""], dtype=object)
+    return pd.Series(norm[codes], dtype=object)
+
+
+def build_tag_table(tag_dicts, names, keys) -> pd.DataFrame:
+    """
+    tag_dicts: list of OSM tag dicts, names: display names (same length),
+    keys: tag keys the rules need. Only those columns are built.
+    """
+    data = {k: _norm_column([t.get(k) for t in tag_dicts]) for k in sorted(keys)}
+    data[NAME] = _norm_column(names)
+    return pd.DataFrame(data, index=pd.RangeIndex(len(names)))
+
+
+def parse_int_column(s: pd.Series) -> np.ndarray:
+    """parse_int_tag for a whole column (parsed once per distinct value)."""
+    if s is None or len(s) == 0:
+        return np.zeros(0, dtype=int)
+    codes, uniques = pd.factorize(s)
+    parsed = np.array([parse_int_tag({"v": u}, "v") for u in uniques] + [0], dtype=int)
+    return parsed[codes]
+
+
+# ------------------------------------------------------------
+# Overpass QL helpers
+# ------------------------------------------------------------
+_SPACE = "[[:space:]]*"
+
+
+def _ql_regex(parts, whole=False) -> str:
+    """Quoted, case-insensitive-ready Overpass regex matching any of parts."""
+    alt = "|".join(re.sub(r"([.^$*+?()\[\]{}|\\])", r"\\\1", p) for p in parts)
+    rx = f"^{_SPACE}({alt}){_SPACE}$" if whole else f"({alt})"
+    return '"' + rx.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _ql_key(key: str) -> str:
+    return '"' + key.replace('"', '\\"') + '"'
+
+
+def _column(table: pd.DataFrame, key: str) -> pd.Series:
+    if key in table.columns:
+        return table[key]
+    return pd.Series([""] * len(table), index=table.index, dtype=object)
+
+
+# ------------------------------------------------------------
+# Rules
+# ------------------------------------------------------------
+class Rule:
+    def mask(self, table: pd.DataFrame) -> np.ndarray:
+        raise NotImplementedError
+
+    def test(self, get) -> bool:
+        """Scalar form of mask(); get(key) returns the normalised value."""
+        raise NotImplementedError
+
+    def keys(self) -> set:
+        """Tag keys this rule reads (NAME excluded)."""
+        return set()
+
+    # Overpass pushdown. `names` is False when the display name may come
+    # from a tag other than name= (then name rules stay client side).
+    def overpass_match(self, names=True):
+        """Filters that keep exactly the elements this rule matches, or None."""
+        return None
+
+    def overpass_not(self, names=True):
+        """Filters that drop exactly the elements this rule matches, or None."""
+        return None
+
+    def overpass_hint(self):
+        """Looser filter that only drops matching elements; the rule still runs client side."""
+        return None
+
+    def matches(self, tags: dict, name: str = "") -> bool:
+        """Scalar check for one element, same answer as the vectorised mask."""
+        tags = tags or {}
+        name_l = norm_str(name)
+        return self.test(lambda k: name_l if k == NAME else norm_str(tags.get(k)))
+
+    def __or__(self, other):
+        return AnyOf(self, other)
+
+    def __and__(self, other):
+        return AllOf(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+
+class TagIn(Rule):
+    """tags[key] is one of values."""
+
+    def __init__(self, key: str, *values):
+        self.key = key
+        self.values = tuple(str(v).strip().lower() for v in values)
+
+    def mask(self, table):
+        return _column(table, self.key).isin(self.values).to_numpy()
+
+    def test(self, get):
+        return get(self.key) in self.values
+
+    def keys(self):
+        return {self.key}
+
+    def overpass_match(self, names=True):
+        return [f"[{_ql_key(self.key)}~{_ql_regex(self.values, whole=True)},i]"]
+
+    def overpass_not(self, names=True):
+        return [f"[{_ql_key(self.key)}!~{_ql_regex(self.values, whole=True)},i]"]
+
+
+class TagSet(Rule):
+    """tags[key] is present and not one of the ignored values."""
+
+    def __init__(self, key: str, ignore=()):
+        self.key = key
+        self.ignore = tuple(str(v).strip().lower() for v in ignore)
+
+    def mask(self, table):
+        col = _column(table, self.key)
+        return ((col != "") & ~col.isin(self.ignore)).to_numpy()
+
+    def test(self, get):
+        v = get(self.key)
+        return v != "" and v not in self.ignore
+
+    def keys(self):
+        return {self.key}
+
+    def overpass_match(self, names=True):
+        out = [f'[{_ql_key(self.key)}~"[^[:space:]]"]']
+        if self.ignore:
+            out.append(f"[{_ql_key(self.key)}!~{_ql_regex(self.ignore, whole=True)},i]")
+        return out
+
+    def overpass_not(self, names=True):
+        if self.ignore:
+            return None
+        return [f'[{_ql_key(self.key)}!~"[^[:space:]]"]']
+
+
+class NameContains(Rule):
+    """Display name contains any of the substrings."""
+
+    def __init__(self, *parts):
+        self.parts = tuple(str(p).lower() for p in parts)
+        self.pattern = re.compile("|".join(re.escape(p) for p in self.parts))
+
+    def mask(self, table):
+        return _column(table, NAME).str.contains(self.pattern, regex=True).to_numpy(dtype=bool)
+
+    def test(self, get):
+        return self.pattern.search(get(NAME)) is not None
+
+    def _pushable(self, names):
+        # The name is stripped client side, so edge spaces can't be matched remotely
+        return names and all(p == p.strip() for p in self.parts)
+
+    def overpass_match(self, names=True):
+        if not self._pushable(names):
+            return None
+        return [f'["name"~{_ql_regex(self.parts)},i]']
+
+    def overpass_not(self, names=True):
+        if not self._pushable(names):
+            return None
+        return [f'["name"!~{_ql_regex(self.parts)},i]']
+
+
+class NameIs(Rule):
+    """Display name equals one of the values."""
+
+    def __init__(self, *values):
+        self.values = tuple(str(v).strip().lower() for v in values)
+
+    def mask(self, table):
+        return _column(table, NAME).isin(self.values).to_numpy()
+
+    def test(self, get):
+        return get(NAME) in self.values
+
+    def overpass_match(self, names=True):
+        if not names:
+            return None
+        return [f'["name"~{_ql_regex(self.values, whole=True)},i]']
+
+    def overpass_not(self, names=True):
+        if not names:
+            return None
+        return [f'["name"!~{_ql_regex(self.values, whole=True)},i]']
+
+
+class IntTagBetween(Rule):
+    """
+    lo < int(tag) < hi, reading the first key that parses to a non-zero
+    number (like `parse_int_tag(a) or parse_int_tag(b)`).
+    """
+
+    def __init__(self, keys, lo=None, hi=None):
+        self.tag_keys = tuple(keys) if isinstance(keys, (list, tuple)) else (keys,)
+        self.lo = lo
+        self.hi = hi
+
+    def values(self, table) -> np.ndarray:
+        out = np.zeros(len(table), dtype=int)
+        for k in self.tag_keys:
+            missing = out == 0
+            if not missing.any():
+                break
+            out[missing] = parse_int_column(_column(table, k))[missing]
+        return out
+
+    def mask(self, table):
+        v = self.values(table)
+        m = np.ones(len(table), dtype=bool)
+        if self.lo is not None:
+            m &= v > self.lo
+        if self.hi is not None:
+            m &= v < self.hi
+        return m
+
+    def test(self, get):
+        v = 0
+        for k in self.tag_keys:
+            v = v or parse_int_tag({k: get(k)}, k)
+        return (self.lo is None or v > self.lo) and (self.hi is None or v < self.hi)
+
+    def keys(self):
+        return set(self.tag_keys)
+
+    def overpass_hint(self):
+        # Only the first key, and only values that are plain numbers; "9;18"
+        # or a golf:holes fallback is left to the client-side check
+        if self.lo is None and self.hi is None:
+            return None
+        t = f"t[{_ql_key(self.tag_keys[0])}]"
+        cond = [f"is_number({t})"]
+        if self.lo is not None:
+            cond.append(f"number({t}) >= {int(self.lo) + 1}")
+        if self.hi is not None:
+            cond.append(f"number({t}) < {self.hi}")
+        return f"(if: !({' && '.join(cond)}))"
+
+
+class AnyOf(Rule):
+    def __init__(self, *rules):
+        # Flatten nested AnyOf and fold every NameContains into one regex,
+        # so the name column is scanned once per AnyOf
+        flat = []
+        for r in rules:
+            flat.extend(r.rules if isinstance(r, AnyOf) else (r,))
+        parts = [p for r in flat if isinstance(r, NameContains) for p in r.parts]
+        others = [r for r in flat if not isinstance(r, NameContains)]
+        # Parts with edge spaces go in their own atom (they can't be pushed down)
+        trimmed = [p for p in parts if p == p.strip()]
+        spaced = [p for p in parts if p != p.strip()]
+        self.rules = tuple(others) + tuple(NameContains(*ps) for ps in (trimmed, spaced) if ps)
+
+    def mask(self, table):
+        m = np.zeros(len(table), dtype=bool)
+        for r in self.rules:
+            todo = ~m
+            if not todo.any():
+                break
+            m[todo] = r.mask(table[todo])
+        return m
+
+    def test(self, get):
+        return any(r.test(get) for r in self.rules)
+
+    def keys(self):
+        return set().union(*(r.keys() for r in self.rules))
+
+    def overpass_not(self, names=True):
+        out = []
+        for r in self.rules:
+            neg = r.overpass_not(names)
+            if neg is None:
+                return None
+            out += neg
+        return out
+
+
+class AllOf(Rule):
+    def __init__(self, *rules):
+        self.rules = tuple(rules)
+
+    def mask(self, table):
+        m = np.ones(len(table), dtype=bool)
+        for r in self.rules:
+            if not m.any():
+                break
+            m[m] = r.mask(table[m])
+        return m
+
+    def test(self, get):
+        return all(r.test(get) for r in self.rules)
+
+    def keys(self):
+        return set().union(*(r.keys() for r in self.rules))
+
+    def overpass_match(self, names=True):
+        out = []
+        for r in self.rules:
+            match = r.overpass_match(names)
+            if match is None:
+                return None
+            out += match
+        return out
+
+
+class Not(Rule):
+    def __init__(self, rule: Rule):
+        self.rule = rule
+
+    def mask(self, table):
+        return ~self.rule.mask(table)
+
+    def test(self, get):
+        return not self.rule.test(get)
+
+    def overpass_match(self, names=True):
+        return self.rule.overpass_not(names)
+
+    def overpass_not(self, names=True):
+        return self.rule.overpass_match(names)
+
+    def keys(self):
+        return self.rule.keys()
+
+
+class RuleSet:
+    """
+    Keep rows that match every `require` rule and no `exclude` rule.
+    """
+
+    def __init__(self, exclude=(), require=()):
+        self.exclude = tuple(exclude)
+        self.require = tuple(require)
+
+    def __add__(self, other):
+        return RuleSet(self.exclude + other.exclude, self.require + other.require)
+
+    def keys(self) -> set:
+        return set().union(set(), *(r.keys() for r in self.exclude + self.require))
+
+    def keep_mask(self, table: pd.DataFrame) -> np.ndarray:
+        # Each rule only looks at rows that are still kept
+        keep = np.ones(len(table), dtype=bool)
+        for r in self.require:
+            if keep.any():
+                keep[keep] = r.mask(table[keep])
+        for r in self.exclude:
+            if keep.any():
+                keep[keep] = ~r.mask(table[keep])
+        return keep
+
+    def pushdown(self, names=True):
+        """
+        Split into Overpass filters and the rules left for Python.
+
+        Returns (alternatives, residual): one query statement is sent per
+        alternative (a filter string appended after the POI filter), and
+        only `residual` needs to run on the downloaded rows. A required
+        AnyOf becomes several alternatives; an excluded AnyOf is pushed
+        child by child.
+        """
+        common = []
+        alternatives = [""]
+        require = []
+        for r in self.require:
+            match = r.overpass_match(names)
+            if match is not None:
+                common += match
+                continue
+            if isinstance(r, AnyOf) and alternatives == [""]:
+                alts = [c.overpass_match(names) for c in r.rules]
+                if all(a is not None for a in alts):
+                    alternatives = ["".join(a) for a in alts]
+                    continue
+            require.append(r)
+
+        hints = []
+        exclude = []
+        for r in self.exclude:
+            left = []
+            for c in (r.rules if isinstance(r, AnyOf) else (r,)):
+                neg = c.overpass_not(names)
+                if neg is not None:
+                    common += neg
+                    continue
+                left.append(c)
+                hint = c.overpass_hint()
+                if hint:
+                    hints.append(hint)
+            if left:
+                exclude.append(left[0] if len(left) == 1 else AnyOf(*left))
+
+        suffix = "".join(common + hints)
+        return [a + suffix for a in alternatives], RuleSet(exclude=exclude, require=require)
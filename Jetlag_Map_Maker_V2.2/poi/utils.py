@@ -1,5 +1,3 @@
-import math
-
 def norm_str(v) -> str:
     return str(v).strip().lower() if v is not None else ""
 
@@ -27,12 +25,3 @@ def parse_int_tag(tags: dict, key: str) -> int:
         except Exception:
             continue
     return 0
-
-def haversine_m(lat1, lon1, lat2, lon2) -> float:
-    r = 6371000.0
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dl = math.radians(lon2 - lon1)
-    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dl / 2) ** 2
-    return 2 * r * math.atan2(math.sqrt(a), math.sqrt(1 - a))
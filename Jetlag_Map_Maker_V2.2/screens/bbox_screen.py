@@ -1,11 +1,12 @@
 ﻿import tkinter as tk
 import config
-from image_loader import load_image
+from screens.shared import icon_atlas
 from ui_layout import build_header, build_body
-from map_utils import embed_map, make_map_container
+from map_utils import embed_map, make_map_container, attach_map
 import tkinter.messagebox as messagebox
 
 from screens.shared.game_area_section import build_game_area_section  # ✅ NEW
+from screens.shared.visibility import set_objects_visible, apply_group_visibility
 
 
 def bbox_screen(root, show_screen, photo):
@@ -30,16 +31,10 @@ def bbox_screen(root, show_screen, photo):
     map_container = make_map_container(right)
     map_widget = embed_map(map_container)
 
-    ICON_SIZE = (28, 28)
-    icons = {
-        "Train": load_image("train.png", size=ICON_SIZE),
-        "Tram": load_image("tram.png", size=ICON_SIZE),
-        "Bus": load_image("bus.png", size=ICON_SIZE),
-        "Subway": load_image("subway.png", size=ICON_SIZE),
-    }
-    TRANSPARENT_ICON = tk.PhotoImage(master=root, width=1, height=1)
+    icons = icon_atlas.transport_icons()
+    TRANSPARENT_ICON = icon_atlas.transparent_icon(root)
 
-    bbox_shape = {"obj": None}
+    bbox_shape = {"obj": None, "visible": True}
 
     def parse_lat_lon(text: str):
         s = text.strip().replace(",", " ")
@@ -129,9 +124,13 @@ def bbox_screen(root, show_screen, photo):
             bbox_shape["obj"] = map_widget.set_path(corners, width=2)
         elif hasattr(map_widget, "set_polygon"):
             bbox_shape["obj"] = map_widget.set_polygon(corners, border_width=2)
+        apply_group_visibility(map_widget, bbox_shape, [bbox_shape["obj"]])
 
         set_bbox_btn.config(state="disabled", text="Bounding Box Set")
 
+        # Show how big each transport layer is before anything is fetched
+        section["probe_counts"]()
+
     set_bbox_btn = tk.Button(
         bbox_frame,
         text="Set Bounding Box",
@@ -142,12 +141,20 @@ def bbox_screen(root, show_screen, photo):
     )
     set_bbox_btn.grid(row=3, column=0, columnspan=4, pady=(10, 5))
 
+    def unlock_bounding_box():
+        # Another screen has set the game area since; let this one choose again
+        for ent in (point1_entry, point2_entry):
+            ent.config(state="normal", relief="sunken")
+        _delete_shape(bbox_shape["obj"])
+        bbox_shape["obj"] = None
+        set_bbox_btn.config(state="normal", text="Set Bounding Box")
+
     # ✅ EVERYTHING AFTER THIS LINE IS NOW REUSED
     def go_next():
         from screens.points_of_interest import points_of_interest
         show_screen(points_of_interest)
 
-    build_game_area_section(
+    section = build_game_area_section(
         left=left,
         root=root,
         map_widget=map_widget,
@@ -156,6 +163,20 @@ def bbox_screen(root, show_screen, photo):
         point1_entry=point1_entry,
         point2_entry=point2_entry,
         go_next_callback=go_next,
+        on_area_changed=unlock_bounding_box,
     )
 
+    def set_bbox_visible(visible):
+        bbox_shape["visible"] = bool(visible)
+        set_objects_visible(map_widget, [bbox_shape["obj"]], visible)
+
+    section["legend"].add("area", "Bounding box", toggle=set_bbox_visible, color="#3E69CB")
+
+    def on_show():
+        attach_map(map_widget, map_container)
+        section["on_show"]()
+
+    frame.on_show = on_show
+    frame.on_hide = section["on_hide"]
+
     return frame
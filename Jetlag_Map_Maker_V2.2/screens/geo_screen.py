@@ -2,7 +2,7 @@
 
 import config
 from ui_layout import build_header, build_body
-from map_utils import embed_map, make_map_container
+from map_utils import embed_map, make_map_container, attach_map
 
 from screens.shared.game_area_section import build_game_area_section
 from screens.shared.geo_area_helpers import (
@@ -12,6 +12,7 @@ from screens.shared.geo_area_helpers import (
     make_geom_helpers,
     make_search_handlers,
 )
+from screens.shared.visibility import set_group_visible
 
 
 def geo_screen(root, show_screen, photo):
@@ -72,11 +73,19 @@ def geo_screen(root, show_screen, photo):
     ui["search_btn"].config(command=handlers["do_search"])
     ui["query_entry"].bind("<Return>", lambda _e: handlers["do_search"]())
 
+    def unlock_hiding_zone():
+        # Another screen has set the game area since; let this one choose again
+        state["hiding_zone_locked"]["locked"] = False
+        ui["query_entry"].config(state="normal")
+        ui["search_btn"].config(state="normal")
+        handlers["update_selected_summary"]()
+        set_status("The game area was changed on another screen. Search unlocked.")
+
     def go_next():
         from screens.points_of_interest import points_of_interest
         show_screen(points_of_interest)
 
-    build_game_area_section(
+    section = build_game_area_section(
         left=left,
         root=root,
         map_widget=map_widget,
@@ -85,8 +94,20 @@ def geo_screen(root, show_screen, photo):
         point1_entry=None,
         point2_entry=None,
         go_next_callback=go_next,
+        on_area_changed=unlock_hiding_zone,
         start_row=6,
     )
+    section["legend"].add(
+        "area", "Game area", color="#3E69CB",
+        toggle=lambda v: set_group_visible(map_widget, state["combined_shapes"], v),
+    )
+
+    def on_show():
+        attach_map(map_widget, map_container)
+        section["on_show"]()
+
+    frame.on_show = on_show
+    frame.on_hide = section["on_hide"]
 
     handlers["update_selected_summary"]()
     set_status("Search for a city, county, country, or region (e.g. “Scotland”, “Edinburgh”).")
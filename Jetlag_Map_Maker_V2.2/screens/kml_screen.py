@@ -4,13 +4,15 @@ import tkinter.messagebox as messagebox
 
 import config
 from ui_layout import build_header, build_body
-from map_utils import embed_map, make_map_container
+from map_utils import embed_map, make_map_container, attach_map
 
 from shapely.geometry import Polygon, MultiPolygon, GeometryCollection
 from shapely.ops import unary_union
 
 from screens.shared.game_area_section import build_game_area_section
-from image_loader import load_image
+from screens.shared.line_lod import LodPaths
+from screens.shared import icon_atlas
+from screens.shared.visibility import set_objects_visible
 
 import xml.etree.ElementTree as ET
 
@@ -40,14 +42,8 @@ def kml_screen(root, show_screen, photo):
     # ------------------------------
     # Shared icons (same as bbox screen)
     # ------------------------------
-    ICON_SIZE = (28, 28)
-    icons = {
-        "Train": load_image("train.png", size=ICON_SIZE),
-        "Tram": load_image("tram.png", size=ICON_SIZE),
-        "Bus": load_image("bus.png", size=ICON_SIZE),
-        "Subway": load_image("subway.png", size=ICON_SIZE),
-    }
-    TRANSPARENT_ICON = tk.PhotoImage(master=root, width=1, height=1)
+    icons = icon_atlas.transport_icons()
+    TRANSPARENT_ICON = icon_atlas.transparent_icon(root)
 
     # ------------------------------
     # State
@@ -55,6 +51,7 @@ def kml_screen(root, show_screen, photo):
     kml_state = {
         "geom": None,          # shapely geometry
         "shape_objs": [],      # map draw objects
+        "shapes_visible": True,
         "locked": False,
     }
 
@@ -131,14 +128,16 @@ def kml_screen(root, show_screen, photo):
                     for p in part.geoms:
                         add_polygon(p)
 
-        for ring in rings:
-            if ring and ring[0] != ring[-1]:
-                ring = ring + [ring[0]]
+        rings = [ring + [ring[0]] if ring and ring[0] != ring[-1] else ring for ring in rings]
 
-            if hasattr(map_widget, "set_path"):
-                kml_state["shape_objs"].append(map_widget.set_path(ring, width=3))
-            elif hasattr(map_widget, "set_polygon"):
+        if hasattr(map_widget, "set_path"):
+            # Simplified per zoom, so big KML areas stay cheap to pan
+            kml_state["shape_objs"].append(LodPaths(map_widget, rings, width=3))
+        elif hasattr(map_widget, "set_polygon"):
+            for ring in rings:
                 kml_state["shape_objs"].append(map_widget.set_polygon(ring, border_width=3))
+        if not kml_state["shapes_visible"]:
+            set_objects_visible(map_widget, kml_state["shape_objs"], False)
 
     def _fit_to_geom(g):
         if g is None or g.is_empty:
@@ -303,11 +302,19 @@ def kml_screen(root, show_screen, photo):
     # ------------------------------
     # Shared tools section below
     # ------------------------------
+    def unlock_hiding_zone():
+        # Another screen has set the game area since; let this one choose again
+        kml_state["locked"] = False
+        load_btn.config(state="normal")
+        if kml_state["geom"] is not None:
+            set_hiding_btn.config(state="normal")
+        _set_status("The game area was changed on another screen. KML loading unlocked.")
+
     def go_next():
         from screens.points_of_interest import points_of_interest
         show_screen(points_of_interest)
 
-    build_game_area_section(
+    section = build_game_area_section(
         left=left,
         root=root,
         map_widget=map_widget,
@@ -316,9 +323,23 @@ def kml_screen(root, show_screen, photo):
         point1_entry=None,
         point2_entry=None,
         go_next_callback=go_next,
+        on_area_changed=unlock_hiding_zone,
         start_row=4,  # directly below "Set Hiding Zone"
     )
 
+    def set_area_visible(visible):
+        kml_state["shapes_visible"] = bool(visible)
+        set_objects_visible(map_widget, kml_state["shape_objs"], visible)
+
+    section["legend"].add("area", "KML area", toggle=set_area_visible, color="#3E69CB")
+
+    def on_show():
+        attach_map(map_widget, map_container)
+        section["on_show"]()
+
+    frame.on_show = on_show
+    frame.on_hide = section["on_hide"]
+
     left.grid_columnconfigure(0, weight=1)
     left.grid_columnconfigure(1, weight=1)
 
@@ -1,5 +1,6 @@
 import tkinter as tk
 import config
+from snapshot import parse_snapshot_date
 
 
 def main_menu(root, show_screen, photo):
@@ -58,4 +59,38 @@ def main_menu(root, show_screen, photo):
         command=lambda: show_screen(kml_screen)
     ).pack(pady=5)
 
+    # Optional snapshot date: pins all Overpass queries to one day of OSM history
+    snap_frame = tk.Frame(frame, bg=config.BG)
+    snap_frame.pack(pady=(20, 0))
+
+    tk.Label(
+        snap_frame,
+        text="Data snapshot date (optional):",
+        bg=config.BG,
+        fg=config.FG,
+        font=config.BODY_FONT
+    ).pack(side="left")
+
+    snap_entry = tk.Entry(snap_frame, width=12)
+    snap_entry.insert(0, (getattr(config, "snapshot_date", None) or "")[:10])
+    snap_entry.pack(side="left", padx=(6, 0))
+
+    snap_status = tk.Label(frame, text="", bg=config.BG, fg=config.FG, font=config.BODY_FONT)
+    snap_status.pack(pady=(4, 0))
+
+    def apply_snapshot_date(_event=None):
+        try:
+            config.snapshot_date = parse_snapshot_date(snap_entry.get())
+        except ValueError as e:
+            snap_status.config(text=str(e))
+            return
+        if config.snapshot_date:
+            snap_status.config(text=f"Pinned to {config.snapshot_date[:10]} (cached, reproducible)")
+        else:
+            snap_status.config(text="Using live OSM data")
+
+    snap_entry.bind("<Return>", apply_snapshot_date)
+    snap_entry.bind("<FocusOut>", apply_snapshot_date)
+    apply_snapshot_date()
+
     return frame
@@ -2,19 +2,47 @@
 import threading
 import pandas as pd
 import config
-from PIL import Image, ImageTk
 import os
 from tkinter import filedialog, messagebox
 
 from poi.kml_merge import merge_pois_into_existing_kml
 from ui_layout import build_header, build_body
-from map_utils import embed_map, make_map_container
+from map_utils import embed_map, make_map_container, attach_map, map_view, restore_map_view
 from poi.overpass_fetch import fetch_pois
+from layer_cache import area_geometry_from_config
+from single_flight import fetches, fetch_key
 from poi.boundary_draw import draw_bbox, draw_poly, fit_to_area
+from screens.shared.raster_layer import make_point_layer, point_layer_class
+from screens.shared.map_markers import row_ids
+from screens.shared.line_lod import LodPaths
+from screens.shared import icon_atlas
+from screens.shared.legend import MapLegend
+from screens.shared.visibility import set_objects_visible, set_group_visible, apply_group_visibility
 
 from shapely.geometry import LineString, Polygon, MultiLineString, box
 
 
+class _FetchStatus:
+    """A fetch's handle on its status label; goes quiet once the fetch is stale."""
+
+    def __init__(self, label, current):
+        self.label = label
+        self.current = current
+
+    def config(self, **kw):
+        if self.current():
+            self.label.config(**kw)
+
+    configure = config
+
+    def cget(self, key):
+        return self.label.cget(key)
+
+    def update_idletasks(self):
+        if self.current():
+            self.label.update_idletasks()
+
+
 def points_of_interest(root, show_screen, photo):
     frame = tk.Frame(root, bg=config.BG)
 
@@ -34,53 +62,15 @@ def points_of_interest(root, show_screen, photo):
     map_widget = embed_map(map_container, center=config.DEFAULT_MAP_CENTER, zoom=config.DEFAULT_MAP_ZOOM)
 
     # ---------------------------
-    # POI icon loading (CUSTOM ICONS)
+    # POI icons (shared atlas, resized once at startup)
     # ---------------------------
-    PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    POI_ICON_DIR = os.path.join(PROJECT_ROOT, "assets", "poi icons")
-
-    ICON_FILE_BY_TYPE = {
-        "Commercial airport": "Airport.png",
-        "Mountain": "Mountain.png",
-        "Park": "Park.png",
-        "Amusement park": "Theme Park.png",
-        "Aquarium": "Aquarium.png",
-        "Golf course": "icon_042.png",
-        "Museum": "Museum.png",
-        "Hospital": "Hospital.png",
-        "Library": "Library.png",
-        "Foreign mission": "icon_042.png",
-        "Cinema": "Cinema.png",
-        "Body of water": "Body of Water.png",
-        "Coastline": "Coastline.png",
-        "Zoo": "Zoo.png",
-    }
-
-    poi_icons = {}
-
     def get_poi_icon(type_name: str):
-        if type_name in poi_icons:
-            return poi_icons[type_name]
-
-        fname = ICON_FILE_BY_TYPE.get(type_name, f"{type_name}.png")
-        path = os.path.join(POI_ICON_DIR, fname)
-
-        if not os.path.exists(path):
-            print(f"[POI ICON] Missing for '{type_name}': {path}")
-            poi_icons[type_name] = None
-            return None
-
-        img = Image.open(path).convert("RGBA")
-        img = img.resize((28, 28), Image.LANCZOS)
-        icon = ImageTk.PhotoImage(img)
-
-        poi_icons[type_name] = icon
-        return icon
+        return icon_atlas.poi_icon(type_name)
 
     # ---------------------------
     # Boundary drawing
     # ---------------------------
-    boundary_objs = []
+    boundary = {"objs": [], "visible": True}
 
     def _get_boundary_polygon():
         poly_str = getattr(config, "overpass_poly", None)
@@ -172,22 +162,22 @@ def points_of_interest(root, show_screen, photo):
     status_lbl.pack(fill="x", padx=10, pady=(0, 10))
 
     def redraw_boundary():
-        nonlocal boundary_objs
-        for o in boundary_objs:
+        for o in boundary["objs"]:
             _delete_obj(o)
-        boundary_objs = []
+        boundary["objs"] = []
 
         poly = getattr(config, "overpass_poly", None)
         bb = getattr(config, "bound_box", None) or getattr(config, "saved_bound_box", None)
 
         if poly:
-            boundary_objs = draw_poly(map_widget, poly, width=3)
+            boundary["objs"] = draw_poly(map_widget, poly, width=3)
             status_top.config(text="Boundary: polygon")
         elif bb:
-            boundary_objs = draw_bbox(map_widget, bb, width=3)
+            boundary["objs"] = draw_bbox(map_widget, bb, width=3)
             status_top.config(text="Boundary: bounding box")
         else:
             status_top.config(text="Boundary: (none set)")
+        apply_group_visibility(map_widget, boundary, boundary["objs"])
 
         fit_to_area(map_widget)
 
@@ -196,99 +186,207 @@ def points_of_interest(root, show_screen, photo):
     # ---------------------------
     markers_by_type = {}
 
-    marker_label_text = {}   # marker_obj -> "Name"
-    marker_label_on = set()  # markers currently showing text
+    # Point POIs live in viewport-culled layers; labels are tracked per row
+    # id, since a row's marker is recreated whenever it scrolls back into
+    # view and rows move when a type is refetched
+    layers_by_type = {}  # type -> MarkerLayer
+    label_names = {}     # type -> [name per row]
+    label_pos = {}       # type -> (lats, lons)
+    label_ids = {}       # type -> [row id per row]
+    labels_on = {}       # type -> row ids currently showing their name
+    raster_label = {"obj": None, "key": None}
+
+    def hide_raster_label():
+        if raster_label["obj"] is not None:
+            try:
+                raster_label["obj"].delete()
+            except Exception:
+                pass
+            raster_label["obj"] = None
+        raster_label["key"] = None
+
+    def show_raster_label(type_name, i):
+        # Raster layers have no marker per row: one floating label at a time
+        key = (type_name, label_ids[type_name][i])
+        same = raster_label["key"] == key
+        hide_raster_label()
+        if same:
+            return
+        lats, lons = label_pos[type_name]
+        raster_label["obj"] = map_widget.set_marker(
+            float(lats[i]), float(lons[i]), text=label_names[type_name][i], icon=get_poi_icon(type_name)
+        )
+        raster_label["key"] = key
 
-    def toggle_marker_label(marker):
+    def toggle_marker_label(type_name, i, marker):
+        if marker is None:
+            show_raster_label(type_name, i)
+            return
+        on = labels_on.setdefault(type_name, set())
+        key = label_ids[type_name][i]
         try:
-            if marker in marker_label_on:
+            if key in on:
                 marker.set_text("")
-                marker_label_on.remove(marker)
+                on.discard(key)
             else:
-                marker.set_text(marker_label_text.get(marker, ""))
-                marker_label_on.add(marker)
+                marker.set_text(label_names[type_name][i])
+                on.add(key)
         except Exception:
             pass
 
-    def clear_markers(type_name=None):
-        if type_name is None:
-            for t in list(markers_by_type.keys()):
-                clear_markers(t)
-            return
-
+    def plot_point_layer(type_name, lats, lons, names, ids, on_progress=None):
+        # A live layer of the same kind is updated in place: only changed rows are redrawn
+        layer = layers_by_type.get(type_name)
+        if layer is None or type(layer) is not point_layer_class(len(names)):
+            drop_point_layer(type_name)
+            layer = make_point_layer(
+                len(names),
+                root=root,
+                map_widget=map_widget,
+                icon=get_poi_icon(type_name),
+                on_click=lambda i, mk, t=type_name: toggle_marker_label(t, i, mk),
+                text=lambda i, t=type_name: label_names[t][i] if label_ids[t][i] in labels_on[t] else "",  # hidden by default
+                on_progress=on_progress,
+            )
+            layers_by_type[type_name] = layer
+        label_names[type_name] = names
+        label_pos[type_name] = (lats, lons)
+        label_ids[type_name] = ids
+        labels_on.setdefault(type_name, set())
+        if raster_label["key"] is not None and raster_label["key"][0] == type_name:
+            hide_raster_label()
+        layer.set_points(lats, lons, ids)
+
+    def drop_point_layer(type_name):
+        layer = layers_by_type.pop(type_name, None)
+        if layer is not None:
+            layer.clear()
+        label_names.pop(type_name, None)
+        label_pos.pop(type_name, None)
+        label_ids.pop(type_name, None)
+        labels_on.pop(type_name, None)
+        if raster_label["key"] is not None and raster_label["key"][0] == type_name:
+            hide_raster_label()
+
+    def clear_lines(type_name):
         for m in markers_by_type.get(type_name, []):
             try:
-                marker_label_text.pop(m, None)
-                marker_label_on.discard(m)
                 m.delete()
             except Exception:
                 pass
         markers_by_type[type_name] = []
 
-    def plot_df(type_name, df: pd.DataFrame):
-        clear_markers(type_name)
+    def clear_markers(type_name=None):
+        if type_name is None:
+            for t in set(markers_by_type) | set(layers_by_type):
+                clear_markers(t)
+            return
+        clear_lines(type_name)
+        drop_point_layer(type_name)
+        legend.remove(type_name)
+
+    # ---------------------------
+    # Legend: per-type and boundary visibility
+    # ---------------------------
+    legend = MapLegend(map_widget)
+    legend.add("boundary", "Boundary", color="#3E69CB",
+               toggle=lambda v: set_group_visible(map_widget, boundary, v))
+
+    def set_poi_visible(type_name, visible):
+        layer = layers_by_type.get(type_name)
+        if layer is not None:
+            layer.set_visible(visible)
+        set_objects_visible(map_widget, markers_by_type.get(type_name, []), visible)
+        if not visible and raster_label["key"] is not None and raster_label["key"][0] == type_name:
+            hide_raster_label()
+
+    def plot_df(type_name, df: pd.DataFrame, on_progress=None):
+        draw_df(type_name, df, on_progress)
+        if type_name in layers_by_type or markers_by_type.get(type_name):
+            # An unchecked type stays hidden across refetches
+            legend.add(type_name, f"{type_name} ({len(df)})", icon=get_poi_icon(type_name),
+                       toggle=lambda v, t=type_name: set_poi_visible(t, v))
+        else:
+            legend.remove(type_name)
+
+    def plot_progress(status_for_btn):
+        # Shows "Plotting done/total" under the type's button, then puts its text back
+        state = {"text": None}
+
+        def update(done, total):
+            if state["text"] is None:
+                state["text"] = status_for_btn.cget("text")
+            if done >= total:
+                status_for_btn.config(text=state["text"])
+            else:
+                status_for_btn.config(text=f"Plotting {done}/{total}…")
+        return update
+
+    def draw_df(type_name, df: pd.DataFrame, on_progress=None):
         if df is None or df.empty:
+            clear_markers(type_name)
             return
+        clear_lines(type_name)
 
         # Coastline: draw line geometry only (no markers)
         if str(type_name).strip().lower() == "coastline" and "Geometry" in df.columns:
-            objs = []
+            segments = []
             boundary_poly = _get_boundary_polygon()
 
             for _, row in df.iterrows():
                 geom = row.get("Geometry", None)
                 if not isinstance(geom, (list, tuple)) or len(geom) < 2:
                     continue
+                segments.extend(_clip_latlon_path_to_boundary(geom, boundary_poly))
 
-                clipped_segments = _clip_latlon_path_to_boundary(geom, boundary_poly)
-                for seg in clipped_segments:
-                    if hasattr(map_widget, "set_path"):
-                        objs.append(map_widget.set_path(seg, width=3, color="#66ccff"))
-
+            # One zoom-simplified set of paths instead of a full-resolution path per segment
+            objs = []
+            if segments and hasattr(map_widget, "set_path"):
+                objs.append(LodPaths(map_widget, segments, root=root, width=3, color="#66ccff"))
             markers_by_type[type_name] = objs
+            drop_point_layer(type_name)
             return
 
         # Body of water: lines for rivers/streams/canals; markers for lakes/ponds/etc
         if "Kind" in df.columns:
             objs = []
+            line_segments = []
             has_geom = "Geometry" in df.columns
             has_latlon = ("Latitude" in df.columns and "Longitude" in df.columns)
             boundary_poly = _get_boundary_polygon()
-            icon = get_poi_icon(type_name)
+            pt_rows, pt_names = [], []
 
-            for _, row in df.iterrows():
+            for n, (_, row) in enumerate(df.iterrows()):
                 kind = str(row.get("Kind", "")).strip().lower()
                 name = str(row.get("Name", "")).strip()
 
                 # Lines (rivers/streams/canals)
                 if has_geom and kind in ("river", "stream", "canal"):
                     geom = row.get("Geometry", None)
-                    if isinstance(geom, (list, tuple)) and len(geom) >= 2 and hasattr(map_widget, "set_path"):
-                        clipped_segments = _clip_latlon_path_to_boundary(geom, boundary_poly)
-                        for seg in clipped_segments:
-                            objs.append(map_widget.set_path(seg, width=3, color="#66ccff"))
+                    if isinstance(geom, (list, tuple)) and len(geom) >= 2:
+                        line_segments.extend(_clip_latlon_path_to_boundary(geom, boundary_poly))
                     continue
 
-                # Points (lakes/ponds/etc)
+                # Points (lakes/ponds/etc, or river centres from a points-only fetch)
                 if has_latlon and pd.notna(row.get("Latitude")) and pd.notna(row.get("Longitude")):
-                    if kind in ("river", "stream", "canal"):
-                        continue
-
-                    lat = float(row["Latitude"])
-                    lon = float(row["Longitude"])
-
-                    if hasattr(map_widget, "set_marker"):
-                        mk = map_widget.set_marker(
-                            lat,
-                            lon,
-                            text="",  # hidden by default
-                            icon=icon,
-                            command=toggle_marker_label
-                        )
-                        marker_label_text[mk] = name
-                        objs.append(mk)
+                    pt_rows.append(n)
+                    pt_names.append(name)
 
+            if line_segments and hasattr(map_widget, "set_path"):
+                objs.append(LodPaths(map_widget, line_segments, root=root, width=3, color="#66ccff"))
             markers_by_type[type_name] = objs
+            if pt_rows:
+                pts = df.iloc[pt_rows]
+                plot_point_layer(
+                    type_name,
+                    pts["Latitude"].to_numpy(dtype=float),
+                    pts["Longitude"].to_numpy(dtype=float),
+                    pt_names,
+                    row_ids(pts),
+                    on_progress=on_progress,
+                )
+            else:
+                drop_point_layer(type_name)
             return
 
         # Normal POIs (markers)
@@ -297,28 +395,20 @@ def points_of_interest(root, show_screen, photo):
             df = df[name_s.ne("")]
             df = df[~name_s.str.lower().isin({"unnamed", "water (unnamed)", "river/canal (unnamed)"})]
 
-        objs = []
-        icon = get_poi_icon(type_name)
-
-        for _, row in df.iterrows():
-            name = str(row.get("Name", "")).strip()
-            if not name:
-                continue
-            lat = float(row["Latitude"])
-            lon = float(row["Longitude"])
-
-            if hasattr(map_widget, "set_marker"):
-                mk = map_widget.set_marker(
-                    lat,
-                    lon,
-                    text="",  # hidden by default
-                    icon=icon,
-                    command=toggle_marker_label
-                )
-                marker_label_text[mk] = name
-                objs.append(mk)
+        names = df["Name"].astype(str).str.strip() if "Name" in df.columns else pd.Series("", index=df.index)
+        df = df[names.ne("")]
+        if df.empty:
+            drop_point_layer(type_name)
+            return
 
-        markers_by_type[type_name] = objs
+        plot_point_layer(
+            type_name,
+            df["Latitude"].to_numpy(dtype=float),
+            df["Longitude"].to_numpy(dtype=float),
+            names[names.ne("")].tolist(),
+            row_ids(df),
+            on_progress=on_progress,
+        )
 
     # ---------------------------
     # POI types
@@ -386,17 +476,37 @@ def points_of_interest(root, show_screen, photo):
 
     status_by_type = {}
 
-    def fetch_one(osm_filter, tname, status_for_btn):
+    # Bumped when the game area changes; fetches started before then are
+    # stale, so their results and progress are dropped
+    fetch_gen = {"gen": 0}
+
+    def fetch_guard():
+        gen = fetch_gen["gen"]
+        return lambda: fetch_gen["gen"] == gen
+
+    def fetch_coalesced(osm_filter, tname, status_for_btn):
+        # Same type + area already downloading (button + FETCH ALL)? Wait for it.
+        key = fetch_key("poi", tname, osm_filter, area_geometry_from_config(include_saved_bbox=True))
+        return fetches.do(
+            key,
+            lambda: fetch_pois(osm_filter, tname, status_for_btn),
+            on_join=lambda: root.after(0, lambda: status_for_btn.config(text="Already fetching… waiting")),
+        )
+
+    def fetch_one(osm_filter, tname, status_label):
+        current = fetch_guard()
+        status_for_btn = _FetchStatus(status_label, current)
+
         def worker():
             try:
-                df = fetch_pois(osm_filter, tname, status_for_btn)
-                if df is None or df.empty:
+                df = fetch_coalesced(osm_filter, tname, status_for_btn)
+                if df is None or df.empty or not current():
                     return
 
                 config.poi_data = getattr(config, "poi_data", {}) or {}
                 config.poi_data[tname] = df
 
-                root.after(0, lambda tt=tname, d=df: plot_df(tt, d))
+                root.after(0, lambda tt=tname, d=df: current() and plot_df(tt, d, plot_progress(status_for_btn)))
             except Exception as e:
                 root.after(0, lambda err=e: status_for_btn.config(text=f"Error: {err}"))
 
@@ -405,26 +515,30 @@ def points_of_interest(root, show_screen, photo):
     def fetch_all():
         fetch_all_btn.config(state="disabled")
         status_lbl.config(text="Fetching all POIs…")
+        current = fetch_guard()
 
         def worker():
             try:
                 for label, osm_filter, tname in POIS:
+                    if not current():
+                        return
                     st = status_by_type.get(tname)
                     if not st:
                         continue
+                    st = _FetchStatus(st, current)
 
                     root.after(0, lambda s=st, l=label: s.config(text=f"Queueing {l}…"))
 
-                    df = fetch_pois(osm_filter, tname, st)
-                    if df is None or df.empty:
+                    df = fetch_coalesced(osm_filter, tname, st)
+                    if df is None or df.empty or not current():
                         continue
 
                     config.poi_data = getattr(config, "poi_data", {}) or {}
                     config.poi_data[tname] = df
 
-                    root.after(0, lambda tt=tname, d=df: plot_df(tt, d))
+                    root.after(0, lambda tt=tname, d=df, s=st: current() and plot_df(tt, d, plot_progress(s)))
 
-                root.after(0, lambda: status_lbl.config(text="Fetch all complete ✅"))
+                root.after(0, lambda: current() and status_lbl.config(text="Fetch all complete ✅"))
             finally:
                 root.after(0, lambda: fetch_all_btn.config(state="normal"))
 
@@ -514,8 +628,8 @@ def points_of_interest(root, show_screen, photo):
                     existing_kml_path=existing,
                     out_kml_path=out,
                     poi_data=poi_data,
-                    icon_file_by_type=ICON_FILE_BY_TYPE,
-                    poi_icon_dir=POI_ICON_DIR,
+                    icon_file_by_type=icon_atlas.POI_ICON_FILES,
+                    poi_icon_dir=str(icon_atlas.POI_ICON_DIR),
                 )
                 root.after(0, lambda: status_lbl.config(text="Export complete ✅"))
             except Exception as e:
@@ -528,5 +642,39 @@ def points_of_interest(root, show_screen, photo):
 
     export_kml_btn.config(command=export_to_regions_kml)
 
+    # ---------------------------
+    # Leaving / re-entering the screen (the map widget is shared)
+    # ---------------------------
+    def area_key():
+        bb = getattr(config, "bound_box", None) or getattr(config, "saved_bound_box", None)
+        return getattr(config, "overpass_poly", None), repr(bb)
+
+    shown = {"area": area_key(), "view": None}
+
+    def on_hide():
+        shown["view"] = map_view(map_widget)
+        hide_raster_label()
+        legend.suspend()
+
+    def on_show():
+        attach_map(map_widget, map_container)
+        if area_key() != shown["area"]:
+            # POIs fetched for the previous game area no longer apply
+            shown["area"] = area_key()
+            fetch_gen["gen"] += 1
+            config.poi_data = {}
+            for st in status_by_type.values():
+                st.config(text="")
+            status_lbl.config(text="")
+            clear_markers()
+            legend.resume()
+            redraw_boundary()
+        else:
+            legend.resume()
+            restore_map_view(map_widget, shown["view"])
+
+    frame.on_show = on_show
+    frame.on_hide = on_hide
+
     redraw_boundary()
     return frame
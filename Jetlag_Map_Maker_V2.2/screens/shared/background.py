@@ -0,0 +1,40 @@
+# screens/shared/background.py
+# Run work on a thread and hand the result back on the Tk thread.
+import tkinter.messagebox as messagebox
+import threading
+import queue
+import traceback
+
+
+def run_in_background(root, work_fn, on_success=None, on_error=None, on_finally=None, poll_ms=60):
+    q = queue.Queue()
+
+    def worker():
+        try:
+            q.put(("ok", work_fn()))
+        except Exception as e:
+            q.put(("err", (e, traceback.format_exc())))
+
+    threading.Thread(target=worker, daemon=True).start()
+
+    def poll():
+        try:
+            status, payload = q.get_nowait()
+        except queue.Empty:
+            root.after(poll_ms, poll)
+            return
+
+        if status == "ok":
+            if on_success:
+                on_success(payload)
+        else:
+            err, tb = payload
+            if on_error:
+                on_error(err, tb)
+            else:
+                messagebox.showerror("Fetch failed", f"{err}\n\n{tb}")
+
+        if on_finally:
+            on_finally()
+
+    root.after(poll_ms, poll)
@@ -1,79 +1,155 @@
 import math
-import pandas as pd
 
-def haversine_m(lat1, lon1, lat2, lon2):
-    R = 6371000.0
-    p1 = math.radians(lat1)
-    p2 = math.radians(lat2)
-    dp = math.radians(lat2 - lat1)
-    dl = math.radians(lon2 - lon1)
-    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+import numpy as np
 
+from spatial_index import GridIndex
 
-def deduplicate_all_by_priority(all_data: dict, threshold_m: int):
-    if threshold_m <= 0:
-        return {"Train": 0, "Subway": 0, "Tram": 0, "Bus": 0}, 0
+PRIORITY_KEEP_ORDER = ["Train", "Subway", "Tram", "Bus"]
 
-    priority_keep_order = ["Train", "Subway", "Tram", "Bus"]
+# Thresholds the dedup slider can land on (its resolution is 100 m)
+DEDUP_STEPS_M = tuple(range(100, 1001, 100))
 
-    dfs = [all_data.get(t) for t in priority_keep_order]
-    dfs = [d for d in dfs if d is not None and not d.empty]
-    if not dfs:
-        return {"Train": 0, "Subway": 0, "Tram": 0, "Bus": 0}, 0
 
-    all_concat = pd.concat(dfs, ignore_index=True)
-    mean_lat = float(all_concat["Latitude"].mean())
+def _priority_frames(all_data: dict):
+    """[(type, frame)] in priority order, non-empty frames only, plus lat/lon arrays."""
+    frames = []
+    for t in PRIORITY_KEEP_ORDER:
+        df = all_data.get(t)
+        if df is not None and not df.empty:
+            frames.append((t, df.reset_index(drop=True)))
+    if not frames:
+        return frames, np.zeros(0), np.zeros(0)
 
+    lat = np.concatenate([f["Latitude"].to_numpy(dtype=float) for _, f in frames])
+    lon = np.concatenate([f["Longitude"].to_numpy(dtype=float) for _, f in frames])
+    return frames, lat, lon
+
+
+def _keep_mask(lat: np.ndarray, lon: np.ndarray, threshold_m: float) -> np.ndarray:
+    """Which stops (in priority order) survive dedup at threshold_m."""
+    if threshold_m <= 0 or len(lat) == 0:
+        return np.ones(len(lat), dtype=bool)
+
+    mean_lat = float(np.mean(lat))
     m_per_deg_lat = 111_320.0
     m_per_deg_lon = 111_320.0 * math.cos(math.radians(mean_lat))
     cell_size_m = float(threshold_m)
 
+    # Cells are sized at the mean latitude and only the 3x3 block around a
+    # stop is searched; which stops survive depends on this exact grid
     def cell_key(lat, lon):
         x = lon * m_per_deg_lon
         y = lat * m_per_deg_lat
-        return (int(x // cell_size_m), int(y // cell_size_m))
-
-    kept_points = []
-    grid = {}
-
-    def too_close_to_kept(lat, lon):
-        cx, cy = cell_key(lat, lon)
-        for nx in (cx - 1, cx, cx + 1):
-            for ny in (cy - 1, cy, cy + 1):
-                for kp_i in grid.get((nx, ny), []):
-                    klat, klon = kept_points[kp_i]
-                    if haversine_m(lat, lon, klat, klon) <= threshold_m:
-                        return True
-        return False
-
-    def add_kept(lat, lon):
-        cx, cy = cell_key(lat, lon)
-        kept_points.append((lat, lon))
-        idx = len(kept_points) - 1
-        grid.setdefault((cx, cy), []).append(idx)
+        return np.floor_divide(y, cell_size_m), np.floor_divide(x, cell_size_m)
+
+    i, j, _ = GridIndex(lat, lon, threshold_m, cell_fn=cell_key).pairs()
+    return _greedy_keep(len(lat), i, j)
 
+
+def _split_by_type(frames, keep):
+    out = {}
     removed_counts = {"Train": 0, "Subway": 0, "Tram": 0, "Bus": 0}
+    start = 0
+    for t, df2 in frames:
+        k = keep[start:start + len(df2)]
+        start += len(df2)
+        removed_counts[t] = int((~k).sum())
+        out[t] = df2[k].reset_index(drop=True)
+    return out, removed_counts
 
-    for t in priority_keep_order:
-        df = all_data.get(t)
-        if df is None or df.empty:
-            continue
 
-        keep_rows = []
-        df2 = df.reset_index(drop=True)
+def deduplicate_all_by_priority(all_data: dict, threshold_m: int):
+    if threshold_m <= 0:
+        return {"Train": 0, "Subway": 0, "Tram": 0, "Bus": 0}, 0
 
-        for i, row in df2.iterrows():
-            lat = float(row["Latitude"])
-            lon = float(row["Longitude"])
-            if too_close_to_kept(lat, lon):
-                removed_counts[t] += 1
-                continue
-            keep_rows.append(i)
-            add_kept(lat, lon)
+    frames, lat, lon = _priority_frames(all_data)
+    if not frames:
+        return {"Train": 0, "Subway": 0, "Tram": 0, "Bus": 0}, 0
 
-        all_data[t] = df2.iloc[keep_rows].reset_index(drop=True)
+    kept, removed_counts = _split_by_type(frames, _keep_mask(lat, lon, threshold_m))
+    all_data.update(kept)
 
     total_removed = sum(removed_counts.values())
     return removed_counts, total_removed
+
+
+# ------------------------------------------------------------
+# Precomputed curve: every slider step at once
+# ------------------------------------------------------------
+def build_dedup_curve(raw_data: dict, steps=DEDUP_STEPS_M) -> dict:
+    """
+    Keep masks for every threshold in `steps`, computed once from the
+    undeduplicated frames. The greedy pass is not monotone (a stop removed
+    at 200 m can survive at 300 m once its remover is itself removed), so a
+    mask is stored per step rather than a single cut-off per stop.
+    """
+    frames, lat, lon = _priority_frames(raw_data)
+    steps = tuple(int(s) for s in steps)
+
+    keep = np.ones((len(steps), len(lat)), dtype=bool)
+    for k, step in enumerate(steps):
+        keep[k] = _keep_mask(lat, lon, step)
+
+    return {
+        "steps": steps,
+        "frames": frames,
+        "keep": keep,
+        # The frames themselves, not their ids: a freed frame's id can be
+        # handed to the next fetch's frame
+        "source": {t: raw_data.get(t) for t in PRIORITY_KEEP_ORDER},
+    }
+
+
+def curve_matches(curve, raw_data: dict) -> bool:
+    """True if curve was built from exactly these frames."""
+    return bool(curve) and all(curve["source"][t] is raw_data.get(t) for t in PRIORITY_KEEP_ORDER)
+
+
+def apply_dedup_curve(curve: dict, threshold_m: int):
+    """
+    (frames_by_type, removed_counts, total_removed) for a threshold on the
+    curve, or None if the threshold isn't one of its steps. 0 = no dedup.
+    """
+    threshold_m = int(threshold_m)
+    if threshold_m <= 0:
+        keep = np.ones(curve["keep"].shape[1], dtype=bool)
+    elif threshold_m in curve["steps"]:
+        keep = curve["keep"][curve["steps"].index(threshold_m)]
+    else:
+        return None
+
+    kept, removed_counts = _split_by_type(curve["frames"], keep)
+    return kept, removed_counts, sum(removed_counts.values())
+
+
+def _greedy_keep(n: int, i: np.ndarray, j: np.ndarray, max_rounds: int = 64) -> np.ndarray:
+    """
+    Walk points 0..n-1 in order, keeping a point unless an earlier kept
+    point is a neighbour (pairs i < j). Resolved in vectorised rounds:
+    a point is removed once a neighbour before it is kept, and kept once
+    every neighbour before it is removed. Long chains left after
+    max_rounds are finished point by point.
+    """
+    UNKNOWN, KEPT, REMOVED = 0, 1, 2
+    state = np.full(n, UNKNOWN, dtype=np.int8)
+
+    for _ in range(max_rounds):
+        open_ = state == UNKNOWN
+        if not open_.any():
+            return state == KEPT
+        si = state[i]
+        live = open_[j]
+        kept_before = np.bincount(j[live & (si == KEPT)], minlength=n) > 0
+        open_before = np.bincount(j[live & (si == UNKNOWN)], minlength=n) > 0
+        state[open_ & kept_before] = REMOVED
+        state[open_ & ~kept_before & ~open_before] = KEPT
+
+    # Sequential finish for whatever is still undecided
+    order = np.argsort(j, kind="stable")
+    i, j = i[order], j[order]
+    starts = np.searchsorted(j, np.arange(n), side="left")
+    ends = np.searchsorted(j, np.arange(n), side="right")
+    for p in np.flatnonzero(state == UNKNOWN):
+        before = i[starts[p]:ends[p]]
+        state[p] = REMOVED if (state[before] == KEPT).any() else KEPT
+    return state == KEPT
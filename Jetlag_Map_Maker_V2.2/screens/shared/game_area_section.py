@@ -3,16 +3,25 @@
 import tkinter as tk
 import tkinter.filedialog as filedialog
 import tkinter.messagebox as messagebox  # ✅ FIX: you used messagebox but didn't import it
-import threading
-import queue
-import traceback
 
 import config
-from osm_fetcher import fetch_osm_data
+from osm_fetcher import fetch_osm_data, count_osm_elements
+from layer_cache import area_geometry_from_config
+from single_flight import fetches, fetch_key
 from screens.shared.map_markers import MapMarkers
-from screens.shared.dedup import deduplicate_all_by_priority
+from screens.shared.dedup import (
+    deduplicate_all_by_priority,
+    build_dedup_curve,
+    curve_matches,
+    apply_dedup_curve,
+)
 from screens.shared.hiding_zones import build_hiding_zones_ui
 from screens.shared.kml_export import export_game_area_kml
+from screens.shared.zone_coverage import coverage_summary
+from screens.shared.background import run_in_background
+from screens.shared.legend import MapLegend
+from map_utils import map_view, restore_map_view
+import tile_cache
 
 
 class _EntryProxy:
@@ -29,40 +38,6 @@ class _EntryProxy:
         return f"{north}, {east}"
 
 
-def _run_in_background(root, work_fn, on_success=None, on_error=None, on_finally=None, poll_ms=60):
-    q = queue.Queue()
-
-    def worker():
-        try:
-            q.put(("ok", work_fn()))
-        except Exception as e:
-            q.put(("err", (e, traceback.format_exc())))
-
-    threading.Thread(target=worker, daemon=True).start()
-
-    def poll():
-        try:
-            status, payload = q.get_nowait()
-        except queue.Empty:
-            root.after(poll_ms, poll)
-            return
-
-        if status == "ok":
-            if on_success:
-                on_success(payload)
-        else:
-            err, tb = payload
-            if on_error:
-                on_error(err, tb)
-            else:
-                messagebox.showerror("Fetch failed", f"{err}\n\n{tb}")
-
-        if on_finally:
-            on_finally()
-
-    root.after(poll_ms, poll)
-
-
 def build_game_area_section(
     *,
     left: tk.Frame,
@@ -73,8 +48,11 @@ def build_game_area_section(
     point1_entry=None,
     point2_entry=None,
     go_next_callback=None,
+    on_area_changed=None,
     start_row: int = 4,
 ):
+    # on_area_changed() runs when the screen is re-entered after another
+    # screen set a different game area, so the host can unlock its inputs
     if point1_entry is None:
         point1_entry = _EntryProxy(1)
     if point2_entry is None:
@@ -83,6 +61,14 @@ def build_game_area_section(
     base = start_row
 
     markers = MapMarkers(root=root, map_widget=map_widget, icons=icons, transparent_icon=transparent_icon)
+    legend = MapLegend(map_widget)
+
+    def show_in_legend(type_name, df):
+        if df is None or df.empty:
+            legend.remove(type_name)
+            return
+        legend.add(type_name, f"{type_name} ({len(df)})",
+                   toggle=lambda v, t=type_name: markers.set_visible(t, v), icon=icons.get(type_name))
 
     # ---- Fetch Buttons ----
     fetch_frame = tk.Frame(left, bg=config.BG)
@@ -99,11 +85,15 @@ def build_game_area_section(
         ("Fetch Subway", 'station=subway', "Subway"),
     ]
 
+    status_by_type = {}
+
     def fetch_and_plot_async(osm_filter, type_name, status_label, btn: tk.Button):
         # UI updates (main thread)
         btn.config(state="disabled")
         status_label.config(text="Fetching...")
 
+        key = fetch_key("transport", type_name, osm_filter, area_geometry_from_config())
+
         def work():
             # Background thread: DO NOT touch Tk or map_widget here
 
@@ -111,19 +101,30 @@ def build_game_area_section(
             def progress(msg: str):
                 root.after(0, lambda m=msg: status_label.config(text=m))
 
-            df = fetch_osm_data(osm_filter, type_name, progress, point1_entry, point2_entry)
-            return df
+            # Identical fetch already running (double click)? Attach to it.
+            return fetches.do(
+                key,
+                lambda: fetch_osm_data(osm_filter, type_name, progress, point1_entry, point2_entry),
+                on_join=lambda: progress("Already fetching... waiting"),
+            )
 
         def success(df):
             # Back on main thread: safe to touch Tk + map
+            _raw_data()[type_name] = df
             if df is not None and not df.empty:
                 config.all_data[type_name] = df
-                markers.plot_points(type_name, df)
+                markers.plot_points(type_name, df, on_progress=lambda done, total, n=len(df): status_label.config(
+                    text=f"{n} found" if done >= total else f"{n} found, plotting {done}/{total}"))
                 status_label.config(text=f"{len(df)} found")
             else:
                 config.all_data[type_name] = df
                 markers.clear_markers(type_name)
                 status_label.config(text="0 found")
+            show_in_legend(type_name, df)
+
+            # Keep the chosen dedup distance applied to the new layer
+            if int(dedup_slider.get()) > 0:
+                run_dedup()
 
         def error(err, tb):
             status_label.config(text="Fetch failed")
@@ -132,7 +133,7 @@ def build_game_area_section(
         def finally_():
             btn.config(state="normal")
 
-        _run_in_background(root, work_fn=work, on_success=success, on_error=error, on_finally=finally_)
+        run_in_background(root, work_fn=work, on_success=success, on_error=error, on_finally=finally_)
 
     for i, (text, osm_filter, type_name) in enumerate(buttons):
         r = (i // 2) * 2
@@ -159,21 +160,104 @@ def build_game_area_section(
         btn.grid(row=r, column=c, padx=6, pady=4)
 
         status.grid(row=r + 1, column=c, padx=6, pady=(0, 10), sticky="w")
+        status_by_type[type_name] = status
 
     fetch_frame.grid_columnconfigure(0, weight=1)
     fetch_frame.grid_columnconfigure(1, weight=1)
 
+    # ---- Live counts (cheap count probe, nothing downloaded) ----
+    def probe_counts():
+        pending = [(osm_filter, type_name) for (_text, osm_filter, type_name) in buttons]
+        for _f, type_name in pending:
+            status_by_type[type_name].config(text="Counting...")
+
+        def show_count(type_name, counts):
+            if counts is None:
+                status_by_type[type_name].config(text="Count unavailable")
+            else:
+                status_by_type[type_name].config(text=f"~{counts['total']} in area")
+
+        def work():
+            # Background thread: labels are updated through root.after
+            for osm_filter, type_name in pending:
+                counts = count_osm_elements(osm_filter)
+                root.after(0, lambda t=type_name, c=counts: show_count(t, c))
+
+        run_in_background(root, work_fn=work, on_error=lambda err, tb: print(f"[COUNT PROBE] {err}"))
+
     # ---- Dedup UI ----
-    def run_dedup():
-        threshold = int(dedup_slider.get())
-        removed_by_type, total_removed = deduplicate_all_by_priority(config.all_data, threshold)
+    # The fetched frames stay in config.raw_data; every slider step's result
+    # is precomputed once, so moving the slider just picks a mask.
+    dedup_state = {"curve": None, "building": False, "after_id": None, "on_ready": None}
+
+    def _raw_data():
+        if getattr(config, "raw_data", None) is None:
+            config.raw_data = {"Train": None, "Subway": None, "Tram": None, "Bus": None}
+        return config.raw_data
+
+    def _dedup_source():
+        # Frames fetched before raw_data existed count as raw
+        raw = _raw_data()
+        return {
+            t: (raw.get(t) if raw.get(t) is not None else config.all_data.get(t))
+            for t in ("Train", "Subway", "Tram", "Bus")
+        }
+
+    def ensure_curve(on_ready):
+        source = _dedup_source()
+        if curve_matches(dedup_state["curve"], source):
+            on_ready()
+            return
+
+        dedup_state["on_ready"] = on_ready
+        if dedup_state["building"]:
+            return
+        dedup_state["building"] = True
+        dedup_removed_label.config(text="Preparing dedup...")
+
+        def done(curve):
+            dedup_state["curve"] = curve
+            cb = dedup_state["on_ready"]
+            dedup_state["on_ready"] = None
+            if cb:
+                cb()
+
+        def finally_():
+            dedup_state["building"] = False
+            # Data changed while building? Build again for the latest frames.
+            if dedup_state["on_ready"] is not None:
+                ensure_curve(dedup_state["on_ready"])
+
+        run_in_background(
+            root,
+            work_fn=lambda: build_dedup_curve(source),
+            on_success=done,
+            on_error=lambda err, tb: dedup_removed_label.config(text=f"Dedup failed: {err}"),
+            on_finally=finally_,
+        )
+
+    def show_dedup(threshold):
+        curve = dedup_state["curve"]
+        applied = apply_dedup_curve(curve, threshold)
+        source = _dedup_source()
+        if applied is None:
+            # Off the precomputed steps: run the pass on copies of the raw frames
+            kept = dict(source)
+            removed_by_type, total_removed = deduplicate_all_by_priority(kept, threshold)
+        else:
+            kept, removed_by_type, total_removed = applied
 
         for t in ("Train", "Subway", "Tram", "Bus"):
-            df = config.all_data.get(t)
+            df = kept.get(t, source.get(t))
+            before = config.all_data.get(t)
+            config.all_data[t] = df
+            if before is not None and df is not None and before.equals(df):
+                continue  # same rows as already plotted
             if df is not None and not df.empty:
                 markers.plot_points(t, df)
             else:
                 markers.clear_markers(t)
+            show_in_legend(t, df)
 
         dedup_value_label.config(text=f"{threshold} m")
         if total_removed > 0:
@@ -184,6 +268,21 @@ def build_game_area_section(
         else:
             dedup_removed_label.config(text="Removed 0")
 
+    def run_dedup():
+        threshold = int(dedup_slider.get())
+        ensure_curve(lambda: show_dedup(int(dedup_slider.get())))
+        dedup_value_label.config(text=f"{threshold} m")
+
+    def on_slider(val):
+        dedup_value_label.config(text=f"{int(float(val))} m")
+        # Debounce: replot once the slider settles
+        if dedup_state["after_id"] is not None:
+            try:
+                root.after_cancel(dedup_state["after_id"])
+            except Exception:
+                pass
+        dedup_state["after_id"] = root.after(150, run_dedup)
+
     dedup_frame = tk.Frame(left, bg=config.BG)
     dedup_frame.grid(row=base + 1, column=0, columnspan=2, sticky="ew", padx=10, pady=(5, 8))
     dedup_frame.grid_columnconfigure(0, weight=1)
@@ -195,7 +294,7 @@ def build_game_area_section(
         dedup_frame, from_=0, to=1000, resolution=100, orient="horizontal",
         length=170, showvalue=False, bg=config.BG, fg=config.FG,
         highlightthickness=0, troughcolor="#2A3B57",
-        command=lambda val: dedup_value_label.config(text=f"{int(float(val))} m")
+        command=on_slider
     )
     dedup_slider.grid(row=1, column=0, sticky="ew")
 
@@ -213,6 +312,7 @@ def build_game_area_section(
 
     # ---- Hiding zones ----
     zones = build_hiding_zones_ui(left=left, root=root, map_widget=map_widget, config=config, row=base + 2)
+    legend.add("zones", "Hiding zones", toggle=zones["set_visible"], color="#3E69CB")
 
     # ---- Export + Next ----
     def save_to_kml(next_btn):
@@ -224,11 +324,18 @@ def build_game_area_section(
         if not path:
             return
 
+        # Coverage of the zones being exported (reused if already checked)
+        coverage = zones["coverage"]()
+        zone_union, export_single_zones = zones["zones_for_export"]()
+
         export_game_area_kml(
             path=path,
             config=config,
             hide_zone_data=zones["hide_zone_data"],
             circle_points=zones["circle_points"],
+            zone_rings=zones["zone_rings"],
+            zone_union=zone_union,
+            export_single_zones=export_single_zones,
         )
 
         config.last_export_path = path
@@ -240,10 +347,10 @@ def build_game_area_section(
             if config.all_data.get(t) is not None
         )
 
-        messagebox.showinfo(
-            "Export complete",
-            f"Saved:\n{path}\n\nStops: {stops_count}\nZones: {len(zones['hide_zone_data'])}"
-        )
+        summary = f"Saved:\n{path}\n\nStops: {stops_count}\nZones: {len(zones['hide_zone_data'])}"
+        if coverage is not None:
+            summary += "\n" + coverage_summary(coverage)
+        messagebox.showinfo("Export complete", summary)
 
     save_btn = tk.Button(
         left,
@@ -267,4 +374,152 @@ def build_game_area_section(
 
     save_btn.config(command=lambda: save_to_kml(next_btn))
 
-    return {"next_btn": next_btn, "save_btn": save_btn, "zones": zones, "markers": markers}
+    # ---- Offline map tiles ----
+    tiles_frame = tk.Frame(left, bg=config.BG)
+    tiles_frame.grid(row=base + 4, column=0, columnspan=2, sticky="ew", padx=10, pady=(0, 15))
+    tiles_frame.grid_columnconfigure(1, weight=1)
+
+    tiles_state = {"running": False, "cancel": False}
+    offline_var = tk.BooleanVar(master=root, value=bool(getattr(config, "tiles_offline", False)))
+
+    def seed_map_tiles():
+        if tiles_state["running"]:
+            tiles_state["cancel"] = True
+            return
+
+        area = area_geometry_from_config(include_saved_bbox=True)
+        if area is None:
+            tiles_status.config(text="Choose a game area first")
+            return
+        west, south, east, north = area.bounds
+        bounds = (south, west, north, east)
+        server = getattr(map_widget, "tile_server", None) or tile_cache.tile_server()
+        if not tile_cache.seeding_allowed(server):
+            messagebox.showwarning(
+                "Save map for offline",
+                "The public OpenStreetMap tile servers do not allow bulk downloads "
+                "(see their tile usage policy).\n\nSet TILE_SERVER in config.py to a "
+                "tile server that allows it to save areas for offline use.",
+            )
+            return
+
+        tiles_state["running"] = True
+        tiles_state["cancel"] = False
+        seed_btn.config(text="Cancel")
+        tiles_status.config(text="Saving map tiles...")
+
+        def progress(done, total):
+            root.after(0, lambda: tiles_status.config(text=f"Map tiles {done}/{total}"))
+
+        def done(stats):
+            zooms = stats["zooms"]
+            text = f"{stats['cached'] + stats['downloaded']}/{stats['total']} tiles saved"
+            if zooms:
+                text += f" (zoom {zooms[0]}-{zooms[-1]})"
+            if stats["failed"]:
+                text += f", {stats['failed']} failed"
+            tiles_status.config(text=text)
+
+        def finished():
+            tiles_state["running"] = False
+            seed_btn.config(text="Save map for offline")
+
+        run_in_background(
+            root,
+            work_fn=lambda: tile_cache.seed_tiles(
+                bounds, config.TILE_SEED_ZOOMS, server=server,
+                progress=progress, cancelled=lambda: tiles_state["cancel"],
+            ),
+            on_success=done,
+            on_error=lambda err, tb: tiles_status.config(text=f"Tile download failed: {err}"),
+            on_finally=finished,
+        )
+
+    def toggle_offline():
+        config.tiles_offline = bool(offline_var.get())
+
+    seed_btn = tk.Button(tiles_frame, text="Save map for offline", bg=config.BTN, fg=config.FG, command=seed_map_tiles)
+    seed_btn.grid(row=0, column=0, sticky="w")
+
+    tk.Checkbutton(
+        tiles_frame,
+        text="Offline map",
+        variable=offline_var,
+        command=toggle_offline,
+        bg=config.BG,
+        fg=config.FG,
+        font=config.BODY_FONT,
+        selectcolor=config.BG,
+        activebackground=config.BG,
+        activeforeground=config.FG,
+    ).grid(row=0, column=1, sticky="e")
+
+    tiles_status = tk.Label(tiles_frame, text="", bg=config.BG, fg=config.FG, anchor="w")
+    tiles_status.grid(row=1, column=0, columnspan=2, sticky="w", pady=(4, 0))
+
+    # ---- Leaving / re-entering the screen (the map widget is shared) ----
+    # Other screens share config, so they may set a new game area or refetch
+    # stops meanwhile; the area and frames are compared on the way back.
+    saved_view = {"view": None, "area": None, "frames": None}
+
+    def _area():
+        return repr(getattr(config, "bound_box", None)), getattr(config, "overpass_poly", None)
+
+    def _frames():
+        all_data = getattr(config, "all_data", None) or {}
+        raw = getattr(config, "raw_data", None) or {}
+        return [d.get(t) for d in (all_data, raw) for t in ("Train", "Subway", "Tram", "Bus")]
+
+    def replot_from_config():
+        zones["clear_hiding_zones"]()
+        dedup_removed_label.config(text="")
+        for t in ("Train", "Subway", "Tram", "Bus"):
+            df = config.all_data.get(t)
+            if df is not None and not df.empty:
+                markers.plot_points(t, df)
+                status_by_type[t].config(text=f"{len(df)} found")
+            else:
+                markers.clear_markers(t)
+                status_by_type[t].config(text="")
+            show_in_legend(t, df)
+        if int(dedup_slider.get()) > 0:
+            run_dedup()
+
+    def on_hide():
+        saved_view["view"] = map_view(map_widget)
+        saved_view["area"] = _area()
+        saved_view["frames"] = _frames()
+        markers.schedule_clear_label()
+        legend.suspend()
+
+    def on_show():
+        markers.bind_click()
+        legend.resume()
+        area_changed = saved_view["area"] is not None and _area() != saved_view["area"]
+        frames = saved_view["frames"]
+        data_changed = frames is not None and any(a is not b for a, b in zip(frames, _frames()))
+
+        if area_changed and not data_changed:
+            # The stops were fetched for the previous area
+            for t in ("Train", "Subway", "Tram", "Bus"):
+                config.all_data[t] = None
+                _raw_data()[t] = None
+        if area_changed or data_changed:
+            replot_from_config()
+        if area_changed:
+            next_btn.config(state="disabled")  # the export was for the previous area
+            if on_area_changed is not None:
+                on_area_changed()
+        elif saved_view["view"] is not None:
+            restore_map_view(map_widget, saved_view["view"])
+
+    return {
+        "next_btn": next_btn,
+        "save_btn": save_btn,
+        "zones": zones,
+        "markers": markers,
+        "legend": legend,
+        "probe_counts": probe_counts,
+        "on_hide": on_hide,
+        "on_show": on_show,
+    }
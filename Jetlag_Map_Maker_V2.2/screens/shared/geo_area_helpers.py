@@ -6,22 +6,16 @@ import config
 from shapely.geometry import shape, Polygon, MultiPolygon, GeometryCollection
 
 from screens.shared.osm_regions import search_osm_regions
-from image_loader import load_image
+from screens.shared.line_lod import LodPaths
+from screens.shared import icon_atlas
+from screens.shared.visibility import apply_group_visibility
 
 
 # ------------------------------
 # Setup helpers
 # ------------------------------
 def build_icons(root):
-    ICON_SIZE = (28, 28)
-    icons = {
-        "Train": load_image("train.png", size=ICON_SIZE),
-        "Tram": load_image("tram.png", size=ICON_SIZE),
-        "Bus": load_image("bus.png", size=ICON_SIZE),
-        "Subway": load_image("subway.png", size=ICON_SIZE),
-    }
-    transparent = tk.PhotoImage(master=root, width=1, height=1)
-    return icons, transparent
+    return icon_atlas.transport_icons(), icon_atlas.transparent_icon(root)
 
 
 def init_geo_state():
@@ -34,7 +28,7 @@ def init_geo_state():
     return {
         "region_geoms": {},                 # osm_key -> shapely geometry
         "combined_geom": {"geom": None},    # shapely
-        "combined_shapes": {"objs": []},    # map draw objects
+        "combined_shapes": {"objs": [], "visible": True},  # map draw objects
         "hiding_zone_locked": {"locked": False},
     }
 
@@ -109,14 +103,15 @@ def make_geom_helpers(map_widget, state, set_status):
             set_status("Game Area has no drawable boundary.")
             return
 
-        for ring in rings:
-            if ring and ring[0] != ring[-1]:
-                ring = ring + [ring[0]]
+        rings = [ring + [ring[0]] if ring and ring[0] != ring[-1] else ring for ring in rings]
 
-            if hasattr(map_widget, "set_path"):
-                combined_shapes["objs"].append(map_widget.set_path(ring, width=3))
-            elif hasattr(map_widget, "set_polygon"):
+        if hasattr(map_widget, "set_path"):
+            # Simplified per zoom, so region-sized boundaries stay cheap to pan
+            combined_shapes["objs"].append(LodPaths(map_widget, rings, width=3))
+        elif hasattr(map_widget, "set_polygon"):
+            for ring in rings:
                 combined_shapes["objs"].append(map_widget.set_polygon(ring, border_width=3))
+        apply_group_visibility(map_widget, combined_shapes, combined_shapes["objs"])
 
     def zoom_to_bbox(bb):
         south = float(bb[0])
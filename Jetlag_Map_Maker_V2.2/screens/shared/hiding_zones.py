@@ -1,7 +1,17 @@
 ﻿import tkinter as tk
-import math
+import functools
 import tkinter.messagebox as messagebox
 
+import numpy as np
+
+from geodesy import M_PER_DEG_LAT, pairwise_m
+from layer_cache import area_geometry_from_config
+from screens.shared.background import run_in_background
+from screens.shared.zone_union import union_zone_rings, polygons_of, latlon_rings
+from screens.shared.zone_layer import ZoneLayer
+from screens.shared.zone_coverage import coverage_report, coverage_summary
+from screens.shared.visibility import set_objects_visible, apply_group_visibility
+
 def parse_lat_lon(text: str):
     s = text.strip().replace(",", " ")
     parts = [p for p in s.split() if p]
@@ -9,45 +19,46 @@ def parse_lat_lon(text: str):
         raise ValueError("Expected: lat lon")
     return float(parts[0]), float(parts[1])
 
-def haversine_m(lat1, lon1, lat2, lon2):
-    R = 6371000.0
-    p1 = math.radians(lat1)
-    p2 = math.radians(lat2)
-    dp = math.radians(lat2 - lat1)
-    dl = math.radians(lon2 - lon1)
-    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+@functools.lru_cache(maxsize=16)
+def _unit_circle(segments: int):
+    a = 2 * np.pi * np.arange(segments + 1) / segments
+    return np.sin(a), np.cos(a)
+
+def circle_rings(lats, lons, radii_m, segments=36) -> np.ndarray:
+    """
+    Closed rings for many circles at once: shape (n, segments + 1, 2) of
+    (lat, lon). A unit-circle template is scaled by each centre's metres
+    per degree. Zones with radius <= 0 (or at a pole) come back as NaN.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    radii = np.asarray(radii_m, dtype=float)
+
+    m_per_deg_lon = M_PER_DEG_LAT * np.cos(np.radians(lats))
+    ok = (radii > 0) & (m_per_deg_lon != 0)
+    dlat = np.where(ok, radii / M_PER_DEG_LAT, np.nan)
+    dlon = np.where(ok, radii / np.where(ok, m_per_deg_lon, 1.0), np.nan)
+
+    sin_t, cos_t = _unit_circle(int(segments))
+    rings = np.empty((len(lats), len(sin_t), 2))
+    rings[:, :, 0] = lats[:, None] + dlat[:, None] * sin_t[None, :]
+    rings[:, :, 1] = lons[:, None] + dlon[:, None] * cos_t[None, :]
+    return rings
 
 def circle_points(lat, lon, radius_m, segments=36):
-    if radius_m <= 0:
+    ring = circle_rings([lat], [lon], [radius_m], segments)[0]
+    if np.isnan(ring).any():
         return []
-    lat = float(lat)
-    lon = float(lon)
-
-    m_per_deg_lat = 111_320.0
-    m_per_deg_lon = 111_320.0 * math.cos(math.radians(lat))
-    if m_per_deg_lon == 0:
-        return []
-
-    dlat = radius_m / m_per_deg_lat
-    dlon = radius_m / m_per_deg_lon
+    return [tuple(p) for p in ring.tolist()]
 
-    pts = []
-    for i in range(segments + 1):
-        a = 2 * math.pi * i / segments
-        pts.append((lat + dlat * math.sin(a), lon + dlon * math.cos(a)))
-    return pts
+def zone_segments(radii_m) -> np.ndarray:
+    """On-map segment count per zone: 18 up to 200 m, 24 up to 600 m, else 32."""
+    r = np.asarray(radii_m, dtype=float)
+    return np.where(r <= 200, 18, np.where(r <= 600, 24, 32))
 
-def draw_hiding_zone(map_widget, lat, lon, radius_m):
-    if radius_m <= 200:
-        seg = 18
-    elif radius_m <= 600:
-        seg = 24
-    else:
-        seg = 32
-
-    pts = circle_points(lat, lon, radius_m, segments=seg)
+def draw_hiding_zone(map_widget, lat, lon, radius_m, pts=None):
+    if pts is None:
+        pts = circle_points(lat, lon, radius_m, segments=int(zone_segments([radius_m])[0]))
     if not pts:
         return None
 
@@ -61,7 +72,34 @@ def build_hiding_zones_ui(*, left, root, map_widget, config, row=6):
     hide_zone_shapes = []
     hide_zone_data = []
 
+    # segments -> rings for hide_zone_data, shared by the map and KML export
+    ring_cache = {}
+
+    def zone_rings(segments=36) -> np.ndarray:
+        rings = ring_cache.get(segments)
+        if rings is None or len(rings) != len(hide_zone_data):
+            if hide_zone_data:
+                lats, lons, radii = (np.asarray(c, dtype=float) for c in zip(*hide_zone_data))
+            else:
+                lats = lons = radii = np.zeros(0)
+            rings = circle_rings(lats, lons, radii, segments)
+            ring_cache[segments] = rings
+        return rings
+
+    # Merged mode: union of all disks, clipped to the game area
+    union_state = {"geom": None, "job": 0}
+
+    # Coverage analytics for the current zones, and the gap outlines on the map
+    coverage_state = {"report": None, "job": 0, "shapes": []}
+
+    # Legend toggle: zones (single or merged) and coverage gaps together
+    zones_view = {"visible": True}
+
     def clear_hiding_zones():
+        union_state["geom"] = None
+        union_state["job"] += 1  # results of a running union are now stale
+        zone_layer.clear()
+        clear_coverage()
         for obj in hide_zone_shapes:
             try:
                 obj.delete()
@@ -69,8 +107,11 @@ def build_hiding_zones_ui(*, left, root, map_widget, config, row=6):
                 pass
         hide_zone_shapes.clear()
         hide_zone_data.clear()
+        ring_cache.clear()
 
     use_smaller_zones_var = tk.BooleanVar(master=root, value=False)
+    merge_zones_var = tk.BooleanVar(master=root, value=False)
+    export_single_zones_var = tk.BooleanVar(master=root, value=False)
     large_zone_radius_var = tk.IntVar(master=root, value=500)
     small_zone_radius_var = tk.IntVar(master=root, value=200)
     distance_from_city_km_var = tk.IntVar(master=root, value=3)
@@ -192,34 +233,175 @@ def build_hiding_zones_ui(*, left, root, map_widget, config, row=6):
                     )
                     return
 
-        for t in ("Train", "Subway", "Tram", "Bus"):
-            df = config.all_data.get(t)
-            if df is None or df.empty:
-                continue
+        frames = [config.all_data.get(t) for t in ("Train", "Subway", "Tram", "Bus")]
+        frames = [df for df in frames if df is not None and not df.empty]
+        if not frames:
+            return
+
+        lats = np.concatenate([df["Latitude"].to_numpy(dtype=float) for df in frames])
+        lons = np.concatenate([df["Longitude"].to_numpy(dtype=float) for df in frames])
 
-            for row in df.itertuples(index=False):
-                lat = float(row.Latitude)
-                lon = float(row.Longitude)
+        # Stops x city points distance matrix -> small radius near any city
+        radii = np.full(len(lats), large_r)
+        if use_small and city_points and small_r > 0 and dist_limit_m > 0:
+            clats, clons = zip(*city_points)
+            near_city = (pairwise_m(lats, lons, clats, clons) <= dist_limit_m).any(axis=1)
+            radii[near_city] = small_r
 
-                radius = large_r
-                if use_small and city_points and small_r > 0 and dist_limit_m > 0:
-                    for clat, clon in city_points:
-                        if haversine_m(lat, lon, clat, clon) <= dist_limit_m:
-                            radius = small_r
-                            break
+        hide_zone_data.extend(zip(lats.tolist(), lons.tolist(), radii.tolist()))
 
-                obj = draw_hiding_zone(map_widget, lat, lon, radius)
-                if obj is not None:
-                    hide_zone_shapes.append(obj)
-                    hide_zone_data.append((lat, lon, radius))
+        if merge_zones_var.get():
+            draw_merged_zones()
+            return
+
+        # Only zones near the viewport are drawn; pan/zoom updates them
+        zone_layer.set_zones(lats, lons, radii)
+
+    def draw_merged_zones():
+        job = union_state["job"]
+        rings = zone_rings(36)  # same rings the per-zone export uses
+        area = area_geometry_from_config()
+        zones_status.config(text=f"Merging {len(rings)} zones...")
+
+        def done(geom):
+            if job != union_state["job"]:
+                return
+            union_state["geom"] = geom
+            polys = polygons_of(geom)
+            drawn = []
+            for poly in polys:
+                outer, holes = latlon_rings(poly)
+                for ring in [outer] + holes:
+                    obj = draw_zone_ring(ring)
+                    if obj is not None:
+                        drawn.append(obj)
+            hide_zone_shapes.extend(drawn)
+            apply_group_visibility(map_widget, zones_view, drawn)
+            holes_n = sum(len(p.interiors) for p in polys)
+            zones_status.config(text=f"{len(hide_zone_data)} zones -> {len(polys)} areas, {holes_n} holes")
+
+        def failed(err, tb):
+            if job == union_state["job"]:
+                zones_status.config(text=f"Merge failed: {err}")
+
+        run_in_background(root, work_fn=lambda: union_zone_rings(rings, area), on_success=done, on_error=failed)
+
+    def zones_for_export():
+        """
+        (zone_union, export_single_zones) for the KML. With merging on but no
+        union yet (still running, failed, or ticked after generating), the
+        union is built here; if that fails the single zones go out instead,
+        so the file never ends up without zones.
+        """
+        if not merge_zones_var.get() or not hide_zone_data:
+            return None, True
+        geom = union_state["geom"]
+        if geom is None:
+            zones_status.config(text=f"Merging {len(hide_zone_data)} zones for export...")
+            zones_status.update_idletasks()
+            try:
+                geom = union_zone_rings(zone_rings(36), area_geometry_from_config())
+            except Exception as e:
+                print(f"[ZONES] Merge for export failed: {e}")
+                zones_status.config(text=f"Merge failed ({e}); exporting single zones")
+                return None, True
+        return geom, bool(export_single_zones_var.get())
+
+    def draw_zone_ring(pts):
+        if hasattr(map_widget, "set_path"):
+            return map_widget.set_path(pts, width=1)
+        elif hasattr(map_widget, "set_polygon"):
+            return map_widget.set_polygon(pts, border_width=1)
+        return None
+
+    # ---------------------------
+    # Coverage
+    # ---------------------------
+    def clear_coverage():
+        coverage_state["report"] = None
+        coverage_state["job"] += 1
+        for obj in coverage_state["shapes"]:
+            try:
+                obj.delete()
+            except Exception:
+                pass
+        coverage_state["shapes"].clear()
+
+    def show_coverage(report):
+        coverage_state["report"] = report
+        for gap in report["gaps"]:
+            outer, _holes = latlon_rings(gap)
+            if hasattr(map_widget, "set_path"):
+                coverage_state["shapes"].append(map_widget.set_path(outer, width=2, color="#d9534f"))
+        apply_group_visibility(map_widget, zones_view, coverage_state["shapes"])
+        zones_status.config(text=coverage_summary(report))
+
+    def check_coverage():
+        if not hide_zone_data:
+            zones_status.config(text="Generate zones first")
+            return
+        clear_coverage()
+        job = coverage_state["job"]
+        data = list(hide_zone_data)
+        area = area_geometry_from_config()
+        zones_status.config(text=f"Checking coverage of {len(data)} zones...")
+
+        def done(report):
+            if job == coverage_state["job"]:
+                show_coverage(report)
+
+        def failed(err, tb):
+            if job == coverage_state["job"]:
+                zones_status.config(text=f"Coverage failed: {err}")
+
+        run_in_background(root, work_fn=lambda: coverage_report(data, area), on_success=done, on_error=failed)
+
+    def current_coverage():
+        """Report for the current zones, computed now if Check coverage was not run."""
+        if coverage_state["report"] is None and hide_zone_data:
+            coverage_state["report"] = coverage_report(list(hide_zone_data), area_geometry_from_config())
+        return coverage_state["report"]
+
+    zone_layer = ZoneLayer(root=root, map_widget=map_widget, rings_for=zone_rings, draw_ring=draw_zone_ring)
+
+    def set_zones_visible(visible):
+        zones_view["visible"] = bool(visible)
+        zone_layer.set_visible(visible)
+        set_objects_visible(map_widget, hide_zone_shapes + coverage_state["shapes"], visible)
 
     tk.Button(zones_frame, text="Generate zones", bg=config.BTN, fg=config.FG, width=18, command=create_hiding_zones)\
         .grid(row=4, column=0, columnspan=2, sticky="ew", pady=(8, 0))
 
+    def _check(text, var, row):
+        tk.Checkbutton(
+            zones_frame,
+            text=text,
+            variable=var,
+            bg=config.BG,
+            fg=config.FG,
+            font=config.BODY_FONT,
+            selectcolor=config.BG,
+            activebackground=config.BG,
+            activeforeground=config.FG,
+        ).grid(row=row, column=0, columnspan=2, sticky="w", pady=(6, 0))
+
+    _check("Merge overlapping zones", merge_zones_var, 5)
+    _check("Also export single zones", export_single_zones_var, 6)
+
+    zones_status = tk.Label(zones_frame, text="", bg=config.BG, fg=config.FG, anchor="w", justify="left")
+    zones_status.grid(row=7, column=0, columnspan=2, sticky="w")
+
+    tk.Button(zones_frame, text="Check coverage", bg=config.BTN, fg=config.FG, width=18, command=check_coverage)\
+        .grid(row=8, column=0, columnspan=2, sticky="ew", pady=(6, 0))
+
     toggle_smaller_ui()
 
     return {
         "hide_zone_data": hide_zone_data,
         "clear_hiding_zones": clear_hiding_zones,
         "circle_points": circle_points,  # exported for KML
+        "zone_rings": zone_rings,
+        "zones_for_export": zones_for_export,
+        "coverage": current_coverage,
+        "set_visible": set_zones_visible,
     }
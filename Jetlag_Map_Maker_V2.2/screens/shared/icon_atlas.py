@@ -0,0 +1,142 @@
+# screens/shared/icon_atlas.py
+# Map marker icons, shared by every screen. start_prerender() resizes every
+# transport and POI icon on a worker thread at startup, keeping the resized
+# PNGs in ICON_CACHE_DIR so later launches skip the resampling; the
+# PhotoImages are made once on the Tk thread and handed out to everyone.
+import threading
+import tkinter as tk
+from pathlib import Path
+
+from PIL import Image, ImageTk
+
+import config
+from image_loader import ASSETS_DIR
+from screens.shared.background import run_in_background
+
+# Size markers are drawn at
+MARKER_ICON_SIZE = (28, 28)
+
+TRANSPORT_ICON_FILES = {
+    "Train": "train.png",
+    "Tram": "tram.png",
+    "Bus": "bus.png",
+    "Subway": "subway.png",
+}
+
+POI_ICON_DIR = ASSETS_DIR / "poi icons"
+
+POI_ICON_FILES = {
+    "Commercial airport": "Airport.png",
+    "Mountain": "Mountain.png",
+    "Park": "Park.png",
+    "Amusement park": "Theme Park.png",
+    "Aquarium": "Aquarium.png",
+    "Golf course": "icon_042.png",
+    "Museum": "Museum.png",
+    "Hospital": "Hospital.png",
+    "Library": "Library.png",
+    "Foreign mission": "icon_042.png",
+    "Cinema": "Cinema.png",
+    "Body of water": "Body of Water.png",
+    "Coastline": "Coastline.png",
+    "Zoo": "Zoo.png",
+}
+
+_lock = threading.Lock()
+_resized = {}   # (path, size) -> PIL image, or None if the file is missing
+_photos = {}    # (path, size) -> PhotoImage (Tk thread only)
+_transparent = {"icon": None}
+
+
+def cache_dir() -> Path:
+    p = getattr(config, "ICON_CACHE_DIR", None)
+    return Path(p) if p else Path.home() / ".jetlag_map_maker" / "icons"
+
+
+def poi_icon_path(type_name) -> Path:
+    return POI_ICON_DIR / POI_ICON_FILES.get(type_name, f"{type_name}.png")
+
+
+def _all_icons():
+    paths = [ASSETS_DIR / f for f in TRANSPORT_ICON_FILES.values()]
+    paths += sorted({poi_icon_path(t) for t in POI_ICON_FILES})
+    return [(p, MARKER_ICON_SIZE) for p in paths]
+
+
+def _resize(path: Path, size):
+    """Resized RGBA copy of path, from the disk cache when it is up to date."""
+    if not path.exists():
+        return None
+    cached = cache_dir() / f"{path.stem}_{size[0]}x{size[1]}.png"
+    try:
+        if cached.exists() and cached.stat().st_mtime >= path.stat().st_mtime:
+            with Image.open(cached) as img:
+                return img.convert("RGBA")
+    except OSError:
+        pass
+
+    with Image.open(path) as img:
+        out = img.convert("RGBA").resize(size, Image.LANCZOS)
+    try:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        out.save(cached)
+    except OSError:
+        pass
+    return out
+
+
+def _resized_image(path: Path, size):
+    key = (path, size)
+    with _lock:
+        if key in _resized:
+            return _resized[key]
+    try:
+        img = _resize(path, size)
+    except Exception as e:
+        print(f"[ICON] Failed to load {path}: {e}")
+        img = None
+    with _lock:
+        _resized.setdefault(key, img)
+        return _resized[key]
+
+
+def start_prerender(root):
+    """Resize every marker icon on a worker thread; PhotoImages follow on the Tk thread."""
+    def work():
+        for path, size in _all_icons():
+            _resized_image(path, size)
+        return None
+
+    def done(_result):
+        for path, size in _all_icons():
+            icon(path, size)
+
+    run_in_background(root, work_fn=work, on_success=done, on_error=lambda e, tb: None)
+
+
+def icon(path, size=MARKER_ICON_SIZE):
+    """Shared PhotoImage of path at size (resized here if the prerender has not got to it)."""
+    key = (Path(path), tuple(size))
+    photo = _photos.get(key)
+    if photo is None and key not in _photos:
+        img = _resized_image(*key)
+        if img is None:
+            print(f"[ICON] Missing: {key[0]}")
+        photo = ImageTk.PhotoImage(img) if img is not None else None
+        _photos[key] = photo
+    return photo
+
+
+def transport_icons() -> dict:
+    return {t: icon(ASSETS_DIR / f) for t, f in TRANSPORT_ICON_FILES.items()}
+
+
+def poi_icon(type_name):
+    return icon(poi_icon_path(type_name))
+
+
+def transparent_icon(root):
+    """1x1 blank icon used for floating labels."""
+    if _transparent["icon"] is None:
+        _transparent["icon"] = tk.PhotoImage(master=root, width=1, height=1)
+    return _transparent["icon"]
@@ -1,11 +1,16 @@
 # screens/shared/kml_export.py
+import math
+
 import simplekml
 
-def export_game_area_kml(*, path, config, hide_zone_data, circle_points):
+from screens.shared.zone_union import polygons_of
+
+def export_game_area_kml(*, path, config, hide_zone_data, circle_points, zone_rings=None,
+                         zone_union=None, export_single_zones=True):
     kml = simplekml.Kml()
 
     game_folder = kml.newfolder(name="Game area")
-    zones_folder = kml.newfolder(name="Hiding zones")
+    zones_folder = kml.newfolder(name="Hiding zones") if export_single_zones else None
 
     ICON_URLS = {
         "Train":  "https://raw.githubusercontent.com/JetLagUK/Jetlag_Map_Maker_V2.2/91abe3f21ac49551a2346a55bd3d956a3b1cf3e5/Jetlag_Map_Maker_V2.2/assets/train.png",
@@ -36,9 +41,29 @@ def export_game_area_kml(*, path, config, hide_zone_data, circle_points):
             if t in styles:
                 p.style = styles[t]
 
-    # Zones
-    for i, (lat, lon, radius_m) in enumerate(hide_zone_data, start=1):
-        pts = circle_points(lat, lon, radius_m, segments=36)
+    # Merged zones: one MultiGeometry of polygons with holes
+    merged = polygons_of(zone_union)
+    if merged:
+        merged_folder = kml.newfolder(name="Hiding zones (merged)")
+        mg = merged_folder.newmultigeometry(name="Hiding zone coverage")
+        for poly in merged:
+            pol = mg.newpolygon()
+            pol.outerboundaryis = list(poly.exterior.coords)
+            pol.innerboundaryis = [list(r.coords) for r in poly.interiors]
+            pol.tessellate = 1
+        mg.style.linestyle.width = 1
+        mg.style.linestyle.color = simplekml.Color.red
+        mg.style.polystyle.fill = 1
+        mg.style.polystyle.color = simplekml.Color.changealphaint(60, simplekml.Color.red)
+        mg.extendeddata.newdata(name="Zones", value=str(len(hide_zone_data)))
+
+    # Zones (rings come from the zones UI cache when available)
+    rings = zone_rings(36) if (zone_rings is not None and zones_folder is not None) else None
+    for i, (lat, lon, radius_m) in enumerate(hide_zone_data if zones_folder is not None else [], start=1):
+        if rings is not None:
+            pts = [] if math.isnan(rings[i - 1, 0, 0]) else rings[i - 1].tolist()
+        else:
+            pts = circle_points(lat, lon, radius_m, segments=36)
         if not pts:
             continue
 
@@ -0,0 +1,98 @@
+# screens/shared/legend.py
+# Legend over the map's top-right corner: one row per layer with its icon or
+# colour and a checkbox that hides/shows the layer through its toggle
+# callback. A layer's checkbox state survives removing and re-adding it, so
+# a refetched layer comes back hidden if it was hidden. suspend()/resume()
+# hide and restore every layer at once when the screen is left/re-entered
+# (the map widget is shared between screens).
+import tkinter as tk
+
+import config
+
+
+class MapLegend:
+    def __init__(self, map_widget):
+        self.map_widget = map_widget
+        self.frame = tk.Frame(map_widget.master, bg=config.BG, bd=1, relief="solid", padx=6, pady=4)
+        self.entries = {}   # key -> {"row", "var", "check", "toggle"}
+        self.visible = {}   # key -> last checkbox state
+        self.suspended = False
+
+    def add(self, key, label, toggle, icon=None, color=None):
+        """
+        Add (or relabel) a layer. toggle(visible) hides/shows it; a layer
+        that is unchecked, or added while suspended, is hidden right away.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry["check"].config(text=label)
+            entry["toggle"] = toggle
+            if self.suspended or not entry["var"].get():
+                toggle(False)
+            return
+
+        var = tk.BooleanVar(master=self.frame, value=self.visible.get(key, True))
+        row = tk.Frame(self.frame, bg=config.BG)
+        if icon is not None:
+            tk.Label(row, image=icon, bg=config.BG).pack(side="left")
+        elif color is not None:
+            tk.Frame(row, bg=color, width=14, height=14).pack(side="left", padx=(2, 2))
+        check = tk.Checkbutton(
+            row,
+            text=label,
+            variable=var,
+            command=lambda k=key: self._changed(k),
+            bg=config.BG,
+            fg=config.FG,
+            font=config.BODY_FONT,
+            selectcolor=config.BG,
+            activebackground=config.BG,
+            activeforeground=config.FG,
+            anchor="w",
+        )
+        check.pack(side="left", fill="x")
+        self.entries[key] = {"row": row, "var": var, "check": check, "toggle": toggle}
+        self._layout()
+
+        if self.suspended or not var.get():
+            toggle(False)
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            entry["row"].destroy()
+            self._layout()
+
+    def is_visible(self, key) -> bool:
+        return self.visible.get(key, True)
+
+    def suspend(self):
+        """Hide every layer (checkbox states are kept)."""
+        self.suspended = True
+        for entry in self.entries.values():
+            entry["toggle"](False)
+        self._layout()
+
+    def resume(self):
+        """Show the layers that are checked again."""
+        self.suspended = False
+        for entry in self.entries.values():
+            if entry["var"].get():
+                entry["toggle"](True)
+        self._layout()
+
+    def _changed(self, key):
+        entry = self.entries[key]
+        shown = bool(entry["var"].get())
+        self.visible[key] = shown
+        if not self.suspended:
+            entry["toggle"](shown)
+
+    def _layout(self):
+        for i, entry in enumerate(self.entries.values()):
+            entry["row"].grid(row=i, column=0, sticky="w")
+        if self.entries and not self.suspended:
+            self.frame.place(in_=self.map_widget, relx=1.0, x=-8, y=8, anchor="ne")
+            self.frame.lift()
+        else:
+            self.frame.place_forget()
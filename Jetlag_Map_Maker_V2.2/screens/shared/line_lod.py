@@ -0,0 +1,162 @@
+# screens/shared/line_lod.py
+# Multi-resolution polylines for the map. Every path is simplified once per
+# zoom step (Douglas-Peucker to under a pixel at that zoom); LodPaths shows
+# the version for the current zoom and swaps it when the zoom changes. At
+# close zooms the paths are also clipped to the area around the view, so
+# national coastlines and boundaries are never drawn at full OSM resolution.
+import math
+
+import numpy as np
+import shapely
+
+from screens.shared.plot_scheduler import scheduler_for
+from screens.shared.viewport import current_view, padded_bounds, watcher_for
+from screens.shared.visibility import set_objects_visible
+
+# Zooms that get their own simplified copy; from the last one up paths are
+# drawn at full resolution
+LOD_ZOOMS = (5, 7, 9, 11, 13, 15)
+
+# Allowed simplification error on screen
+TOLERANCE_PX = 0.75
+
+# From this zoom paths are clipped to the view plus CLIP_MARGIN (fraction of
+# its size on each side) and re-clipped once the view leaves that box
+CLIP_FROM_ZOOM = 11
+CLIP_MARGIN = 1.0
+
+
+def tolerance_deg(zoom, lat=0.0) -> float:
+    """Degrees spanned by TOLERANCE_PX at zoom (lon pixels, scaled for lat)."""
+    deg_per_px = 360.0 / (256 * 2 ** zoom)
+    return TOLERANCE_PX * deg_per_px * math.cos(math.radians(min(abs(lat), 85.0)))
+
+
+def _to_paths(geoms):
+    """Shapely lines (lon/lat, possibly multi-part) -> lists of (lat, lon)."""
+    parts = shapely.get_parts(geoms)
+    if len(parts) == 0:
+        return []
+    xy, idx = shapely.get_coordinates(parts, return_index=True)
+    cuts = np.flatnonzero(np.diff(idx)) + 1
+    return [p[:, ::-1].tolist() for p in np.split(xy, cuts) if len(p) >= 2]
+
+
+class LinePyramid:
+    """paths: lists of (lat, lon). Simplified copies per LOD_ZOOMS step."""
+
+    def __init__(self, paths):
+        paths = [p for p in paths if p is not None and len(p) >= 2]
+        self.levels = {}
+        self.full = np.array([], dtype=object)
+        if not paths:
+            return
+
+        lengths = np.array([len(p) for p in paths])
+        coords = np.array([(lon, lat) for p in paths for (lat, lon) in p], dtype=float)
+        self.full = shapely.linestrings(coords, indices=np.repeat(np.arange(len(paths)), lengths))
+        mid_lat = float(np.nanmean(coords[:, 1]))
+
+        # Finest step first, each coarser one simplified from the previous;
+        # paths are only drawn, so topology is not preserved
+        prev = self.full
+        for z in sorted(LOD_ZOOMS[:-1], reverse=True):
+            prev = shapely.simplify(prev, tolerance_deg(z, mid_lat), preserve_topology=False)
+            self.levels[z] = prev
+
+    def level_key(self, zoom):
+        """LOD_ZOOMS step used at zoom, or None for full resolution."""
+        if zoom >= LOD_ZOOMS[-1]:
+            return None
+        return max([s for s in LOD_ZOOMS if s <= zoom] or [LOD_ZOOMS[0]])
+
+    def paths_at(self, zoom, bounds=None):
+        """Paths for zoom, clipped to bounds (south, west, north, east) if given."""
+        key = self.level_key(zoom)
+        geoms = self.full if key is None or not self.levels else self.levels[key]
+        if bounds is not None and len(geoms):
+            south, west, north, east = bounds
+            geoms = shapely.clip_by_rect(geoms, west, south, east, north)
+        return _to_paths(geoms)
+
+
+class LodPaths:
+    """
+    A set of map paths drawn from a LinePyramid. Has .delete() like a single
+    path, so it can sit in the same object lists callers already clear.
+    """
+
+    def __init__(self, map_widget, paths, root=None, **path_kwargs):
+        self.map_widget = map_widget
+        self.pyramid = paths if isinstance(paths, LinePyramid) else LinePyramid(paths)
+        self.path_kwargs = path_kwargs
+        self._objs = []
+        self._level = "unset"
+        self._clip = None
+        self.visible = True
+        self.deleted = False
+        self._root = root or map_widget
+        self._scheduler = scheduler_for(self._root)
+        self._unsubscribe = watcher_for(self._root, map_widget).subscribe(self._on_view, call_now=False)
+
+        view = current_view(map_widget)
+        if view is not None:
+            self._on_view(view)
+        else:
+            self._redraw(LOD_ZOOMS[-1], None)
+
+    def _on_view(self, view):
+        zoom = view["zoom"]
+        level = self.pyramid.level_key(zoom)
+        if zoom < CLIP_FROM_ZOOM:
+            if level != self._level or self._clip is not None:
+                self._redraw(zoom, None)
+            return
+
+        s, w, n, e = view["bounds"]
+        inside = self._clip is not None and \
+            self._clip[0] <= s and self._clip[1] <= w and self._clip[2] >= n and self._clip[3] >= e
+        if level != self._level or not inside:
+            self._redraw(zoom, padded_bounds(view["bounds"], CLIP_MARGIN))
+
+    def _redraw(self, zoom, clip):
+        self._level = self.pyramid.level_key(zoom)
+        self._clip = clip
+        self._clear_objs()
+        self._scheduler.submit(
+            self, self.pyramid.paths_at(zoom, clip),
+            lambda path: self._objs.append(self.map_widget.set_path(path, **self.path_kwargs)),
+        )
+
+    def set_visible(self, visible):
+        """Hide or show the drawn paths; a hidden set skips pan/zoom updates."""
+        visible = bool(visible)
+        if visible == self.visible or self.deleted:
+            return
+        self.visible = visible
+        set_objects_visible(self.map_widget, self._objs, visible)
+        if not visible:
+            if self._scheduler.pending(self):
+                self._scheduler.cancel(self)
+                self._level = "unset"  # half drawn: redraw when shown
+            if self._unsubscribe is not None:
+                self._unsubscribe()
+                self._unsubscribe = None
+        else:
+            self._unsubscribe = watcher_for(self._root, self.map_widget).subscribe(self._on_view)
+
+    def _clear_objs(self):
+        self._scheduler.cancel(self)
+        for obj in self._objs:
+            try:
+                obj.delete()
+            except Exception:
+                pass
+        self._objs = []
+
+    def delete(self):
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        self._clear_objs()
+        self.deleted = True
@@ -1,5 +1,25 @@
 import tkinter as tk
 
+import pandas as pd
+
+from screens.shared.raster_layer import make_point_layer, point_layer_class
+
+
+def row_ids(df) -> list:
+    """
+    A stable key per row, so replots can keep unchanged markers: the OSM id
+    where the frame has one, else name and position. Repeats are numbered.
+    """
+    if "OsmId" in df.columns and df["OsmId"].notna().all():
+        keys = df["OsmId"].astype(str)
+    else:
+        names = df["Name"].astype(str) if "Name" in df.columns else pd.Series("", index=df.index)
+        keys = (names + "@" + df["Latitude"].astype(float).round(7).astype(str)
+                + "," + df["Longitude"].astype(float).round(7).astype(str))
+    nth = keys.groupby(keys).cumcount()
+    return [k if n == 0 else f"{k}#{n}" for k, n in zip(keys.tolist(), nth.tolist())]
+
+
 class MapMarkers:
     def __init__(self, *, root, map_widget, icons, transparent_icon: tk.PhotoImage):
         self.root = root
@@ -7,11 +27,18 @@ class MapMarkers:
         self.icons = icons
         self.transparent_icon = transparent_icon
 
-        self.markers_by_type = {"Train": [], "Tram": [], "Bus": [], "Subway": []}
+        # One clustered (or, for dense layers, raster) layer per transport type,
+        # with the lat/lon/name arrays its click handler reads
+        self.layers = {}
+        self.rows = {}
+        self.hidden = set()  # types toggled off; new layers of these start hidden
         self.label_marker = {"obj": None}
         self._label_after_id = {"id": None}
 
-        # Clicking empty map clears label
+        self.bind_click()
+
+    def bind_click(self):
+        """Clicking empty map clears label (re-run when the shared map comes back to this screen)."""
         if hasattr(self.map_widget, "add_left_click_map_command"):
             self.map_widget.add_left_click_map_command(lambda _coords: self.schedule_clear_label())
 
@@ -54,46 +81,53 @@ class MapMarkers:
         self._label_after_id["id"] = self.root.after(0, _apply)
 
     def clear_markers(self, type_name: str):
-        for m in self.markers_by_type.get(type_name, []):
-            try:
-                m.delete()
-            except Exception:
-                pass
-        self.markers_by_type[type_name] = []
-
-    def _make_marker_click(self, lat, lon, name):
-        def _handler(*_args, **_kwargs):
-            self.schedule_show_label(lat, lon, name)
-        return _handler
-
-    def plot_points(self, type_name, df, limit=500):
-        self.clear_markers(type_name)
+        self.rows.pop(type_name, None)
+        layer = self.layers.pop(type_name, None)
+        if layer is not None:
+            layer.clear()
 
+    def plot_points(self, type_name, df, on_progress=None):
+        """
+        Every row of df, clustered by zoom (no cap on the row count). Markers
+        are created in slices; on_progress(done, total) follows them.
+        Replotting a type only swaps the markers whose rows changed.
+        """
         if df is None or df.empty:
+            self.clear_markers(type_name)
             return
 
-        icon = self.icons.get(type_name)
+        lat = df["Latitude"].to_numpy(dtype=float)
+        lon = df["Longitude"].to_numpy(dtype=float)
+        names = df["Name"].tolist() if "Name" in df.columns else [""] * len(df)
 
-        count = 0
-        for row in df.itertuples(index=False):
-            on_click = self._make_marker_click(row.Latitude, row.Longitude, row.Name)
-            try:
-                marker = self.map_widget.set_marker(
-                    row.Latitude,
-                    row.Longitude,
-                    icon=icon,
-                    icon_anchor="center",
-                    command=on_click
-                )
-            except TypeError:
-                marker = self.map_widget.set_marker(
-                    row.Latitude,
-                    row.Longitude,
-                    icon=icon,
-                    command=on_click
-                )
-
-            self.markers_by_type[type_name].append(marker)
-            count += 1
-            if count >= limit:
-                break
+        layer = self.layers.get(type_name)
+        if layer is None or type(layer) is not point_layer_class(len(df)):
+            self.clear_markers(type_name)
+            layer = make_point_layer(
+                len(df),
+                root=self.root,
+                map_widget=self.map_widget,
+                icon=self.icons.get(type_name),
+                on_click=lambda i, _marker, t=type_name: self._show_row_label(t, i),
+                on_progress=on_progress,
+            )
+            layer.set_visible(type_name not in self.hidden)
+            self.layers[type_name] = layer
+        self.rows[type_name] = (lat, lon, names)
+        layer.set_points(lat, lon, row_ids(df))
+
+    def set_visible(self, type_name, visible):
+        if visible:
+            self.hidden.discard(type_name)
+        else:
+            self.hidden.add(type_name)
+            self.schedule_clear_label()
+        layer = self.layers.get(type_name)
+        if layer is not None:
+            layer.set_visible(visible)
+
+    def _show_row_label(self, type_name, i):
+        rows = self.rows.get(type_name)
+        if rows is not None:
+            lat, lon, names = rows
+            self.schedule_show_label(lat[i], lon[i], names[i])
@@ -0,0 +1,252 @@
+# screens/shared/marker_layer.py
+# Point layer with zoom-dependent clustering. A grid cluster index is built
+# once per layer for every zoom level; at low zoom each occupied cell is one
+# marker showing its point count, at high zoom every point is its own marker.
+# Clicking a cluster zooms in on it, so every point stays reachable.
+#
+# Only markers inside the viewport (plus a margin) exist on the canvas;
+# pan and zoom add and remove the difference. New markers are created in
+# frame-sized slices through the shared PlotScheduler.
+#
+# Markers are keyed by stable row ids, so setting new points on a live
+# layer (a refetch, a dedup pass) only replaces the markers that changed.
+import numpy as np
+import shapely
+from PIL import Image, ImageDraw, ImageTk
+
+from screens.shared.plot_scheduler import scheduler_for
+from screens.shared.viewport import current_view, padded_bounds, watcher_for
+from screens.shared.visibility import delete_objects, set_objects_visible
+
+# Cluster cell size on screen, in pixels
+CLUSTER_CELL_PX = 64
+
+# From this zoom up every point is drawn on its own
+CLUSTER_MAX_ZOOM = 15
+
+# Markers are kept this far outside the view (fraction of its size)
+CULL_MARGIN = 0.25
+
+_TILE_PX = 256
+
+
+def mercator_xy(lat, lon):
+    """Web-mercator position in [0, 1] (x east, y south), vectorised."""
+    lat = np.clip(np.asarray(lat, dtype=float), -85.0511, 85.0511)
+    x = (np.asarray(lon, dtype=float) + 180.0) / 360.0
+    y = (1.0 - np.arcsinh(np.tan(np.radians(lat))) / np.pi) / 2.0
+    return x, y
+
+
+class ClusterIndex:
+    """
+    Per zoom below max_zoom: the occupied grid cells (cell_px wide on
+    screen) with their cell id, point count, mean position and one member.
+    Cells nest, so a cluster at zoom z splits into clusters at z + 1.
+    """
+
+    def __init__(self, lat, lon, max_zoom=CLUSTER_MAX_ZOOM, cell_px=CLUSTER_CELL_PX):
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        # Rows without a position are left out; members are original row numbers
+        self.pos = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        self.lat = lat[self.pos]
+        self.lon = lon[self.pos]
+        self.max_zoom = int(max_zoom)
+        self.levels = {}
+        self._trees = {}
+
+        mx, my = mercator_xy(self.lat, self.lon)
+        for z in range(self.max_zoom):
+            cells = max(1, (2 ** z * _TILE_PX) // cell_px)
+            kx = np.minimum((mx * cells).astype(np.int64), cells - 1)
+            ky = np.minimum((my * cells).astype(np.int64), cells - 1)
+            keys, first, group, counts = np.unique(ky * cells + kx, return_index=True,
+                                                   return_inverse=True, return_counts=True)
+            self.levels[z] = {
+                "lat": np.bincount(group, weights=self.lat) / counts,
+                "lon": np.bincount(group, weights=self.lon) / counts,
+                "count": counts,
+                "member": self.pos[first],
+                "cell": keys,
+            }
+
+    def __len__(self):
+        return len(self.lat)
+
+    def level(self, zoom):
+        """lat, lon, count, member arrays for zoom (single points past max_zoom)."""
+        z = int(zoom)
+        if z >= self.max_zoom or len(self.lat) == 0:
+            return {"lat": self.lat, "lon": self.lon, "count": np.ones(len(self.lat), dtype=np.int64),
+                    "member": self.pos}
+        return self.levels[max(z, 0)]
+
+    def query(self, zoom, bounds) -> np.ndarray:
+        """Positions in level(zoom) inside bounds (south, west, north, east)."""
+        z = min(max(int(zoom), 0), self.max_zoom)
+        tree = self._trees.get(z)
+        if tree is None:
+            lvl = self.level(z)
+            tree = shapely.STRtree(shapely.points(lvl["lon"], lvl["lat"]))
+            self._trees[z] = tree
+        south, west, north, east = bounds
+        return np.sort(tree.query(shapely.box(west, south, east, north)))
+
+
+# (colour, diameter) -> PhotoImage, kept alive for the canvas
+_cluster_icons = {}
+
+
+def cluster_icon(root, count, color="#3E69CB"):
+    """Filled circle that grows with log(count)."""
+    size = int(min(36, 16 + 4 * np.log10(max(count, 1))))
+    key = (color, size)
+    icon = _cluster_icons.get(key)
+    if icon is None:
+        img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+        ImageDraw.Draw(img).ellipse((1, 1, size - 2, size - 2), fill=color, outline="white", width=2)
+        icon = ImageTk.PhotoImage(img, master=root)
+        _cluster_icons[key] = icon
+    return icon
+
+
+class MarkerLayer:
+    def __init__(self, *, root, map_widget, icon=None, on_click=None, text=None, color="#3E69CB",
+                 on_progress=None):
+        """
+        on_click(i, marker) is called with the row index when a single point
+        is clicked; text(i) gives a point marker's text when it is created.
+        on_progress(done, total) follows the first view's markers being created.
+        """
+        self.root = root
+        self.map_widget = map_widget
+        self.icon = icon
+        self.on_click = on_click
+        self.text = text
+        self.color = color
+        self.on_progress = on_progress
+
+        self.index = None
+        self.ids = []
+        self._row_of = {}
+        self._markers = {}  # ("p", id, lat, lon) or ("c", zoom, cell, count, lat, lon) -> map marker
+        self._unsubscribe = None
+        self.visible = True
+        self._loading = False
+        self._scheduler = scheduler_for(root)
+
+    def __len__(self):
+        return len(self._markers)
+
+    def set_points(self, lat, lon, ids=None):
+        """
+        ids: a stable key per row (default: the row number). On a layer
+        that is already showing, markers whose key is unchanged are kept.
+        """
+        self._scheduler.cancel(self)
+        self.index = ClusterIndex(lat, lon)
+        self.ids = list(ids) if ids is not None else list(range(len(lat)))
+        self._row_of = {k: i for i, k in enumerate(self.ids)}
+
+        if not self.visible:
+            return  # caught up when shown
+        if self._unsubscribe is None:
+            self._loading = True
+            self._unsubscribe = watcher_for(self.root, self.map_widget).subscribe(self._on_view)
+            return
+        view = current_view(self.map_widget)
+        if view is not None:
+            self._on_view(view)
+
+    def set_visible(self, visible):
+        """Hide or show the markers as they are; a hidden layer skips pan/zoom updates."""
+        visible = bool(visible)
+        if visible == self.visible:
+            return
+        self.visible = visible
+        set_objects_visible(self.map_widget, list(self._markers.values()), visible)
+        if not visible:
+            self._scheduler.cancel(self)
+            if self._unsubscribe is not None:
+                self._unsubscribe()
+                self._unsubscribe = None
+        elif self.index is not None:
+            self._unsubscribe = watcher_for(self.root, self.map_widget).subscribe(self._on_view)
+
+    def clear(self):
+        self._scheduler.cancel(self)
+        self._loading = False
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        delete_objects(self.map_widget, list(self._markers.values()))
+        self._markers = {}
+        self.index = None
+        self.ids = []
+        self._row_of = {}
+
+    def _on_view(self, view):
+        if self.index is None:
+            return
+        zoom = min(view["zoom"], self.index.max_zoom)
+        lvl = self.index.level(zoom)
+        hits = self.index.query(zoom, padded_bounds(view["bounds"], CULL_MARGIN))
+
+        # Single points keep their key across zooms and replots, so they are
+        # not redrawn; clusters are keyed by their grid cell and what they show
+        cells = lvl["cell"][hits].tolist() if "cell" in lvl else [None] * len(hits)
+        wanted = {}
+        for k, cell, count, member, lat, lon in zip(hits.tolist(), cells, lvl["count"][hits].tolist(),
+                                                    lvl["member"][hits].tolist(),
+                                                    lvl["lat"][hits].tolist(), lvl["lon"][hits].tolist()):
+            if count == 1:
+                wanted[("p", self.ids[member], lat, lon)] = k
+            else:
+                wanted[("c", zoom, cell, count, lat, lon)] = k
+
+        delete_objects(self.map_widget, [self._markers.pop(key) for key in list(self._markers)
+                                         if key not in wanted])
+
+        def add(item):
+            key, k = item
+            if key in self._markers:
+                return
+            lat, lon, count = float(lvl["lat"][k]), float(lvl["lon"][k]), int(lvl["count"][k])
+            if key[0] == "p":
+                marker = self._point_marker(lat, lon, key[1])
+            else:
+                marker = self._cluster_marker(lat, lon, count, zoom)
+            if marker is not None:
+                self._markers[key] = marker
+
+        # Progress is only reported while the layer first loads, not on every pan
+        on_progress = self.on_progress if self._loading else None
+        self._scheduler.submit(
+            self, [(key, k) for key, k in wanted.items() if key not in self._markers], add,
+            on_progress=on_progress, on_done=self._loaded,
+        )
+
+    def _loaded(self):
+        self._loading = False
+
+    def _point_marker(self, lat, lon, key):
+        # Rows move between replots; the handler looks up the id's current row
+        def _handler(marker=None, *_args, **_kwargs):
+            i = self._row_of.get(key)
+            if self.on_click is not None and i is not None:
+                self.on_click(i, marker)
+        text = self.text(self._row_of[key]) if self.text is not None else None
+        try:
+            return self.map_widget.set_marker(lat, lon, text=text, icon=self.icon, icon_anchor="center", command=_handler)
+        except TypeError:
+            return self.map_widget.set_marker(lat, lon, text=text, icon=self.icon, command=_handler)
+
+    def _cluster_marker(self, lat, lon, count, zoom):
+        def _zoom_in(*_args, **_kwargs):
+            self.map_widget.set_position(lat, lon)
+            self.map_widget.set_zoom(min(zoom + 2, self.index.max_zoom if self.index else zoom + 2))
+        return self.map_widget.set_marker(
+            lat, lon, text=str(count), text_color=self.color,
+            icon=cluster_icon(self.root, count, self.color), icon_anchor="center", command=_zoom_in,
+        )
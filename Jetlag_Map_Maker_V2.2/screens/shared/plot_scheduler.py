@@ -0,0 +1,122 @@
+# screens/shared/plot_scheduler.py
+# Time-sliced map drawing. Layers hand over a list of items to draw; the
+# scheduler works through every pending list on the Tk loop in slices of at
+# most FRAME_BUDGET_MS, giving events and redraws a turn between slices.
+# Each slice is shared between the pending lists, starting from a different
+# one every time, so one big layer cannot hold up the others.
+# Submitting again for the same owner (a refetch, a new view) or clearing it
+# cancels whatever of its previous list was not drawn yet.
+import time
+
+# Time spent drawing per slice before handing control back to Tk, ms
+FRAME_BUDGET_MS = 12
+
+
+class PlotTask:
+    def __init__(self, items, fn, on_progress=None, on_done=None):
+        self.items = items
+        self.fn = fn
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.done = 0
+        self.cancelled = False
+
+    @property
+    def total(self):
+        return len(self.items)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class PlotScheduler:
+    def __init__(self, root, budget_ms=FRAME_BUDGET_MS):
+        self.root = root
+        self.budget_s = budget_ms / 1000.0
+        self._tasks = {}  # owner -> PlotTask, in submission order
+        self._after_id = None
+        self._turn = 0    # which owner goes first in the next slice
+
+    def submit(self, owner, items, fn, on_progress=None, on_done=None) -> PlotTask:
+        """
+        Call fn(item) for every item over the next slices. on_progress(done,
+        total) follows each slice; on_done() runs once everything is drawn.
+        Replaces (cancels) the owner's previous task.
+        """
+        self.cancel(owner)
+        task = PlotTask(list(items), fn, on_progress, on_done)
+        if not task.items:
+            self._finish(task)
+            return task
+        self._tasks[owner] = task
+        if self._after_id is None:
+            # First slice once the current event is handled
+            self._after_id = self.root.after_idle(self._run)
+        return task
+
+    def cancel(self, owner):
+        task = self._tasks.pop(owner, None)
+        if task is not None:
+            task.cancel()
+
+    def pending(self, owner) -> bool:
+        return owner in self._tasks
+
+    def _run(self):
+        self._after_id = None
+        deadline = time.perf_counter() + self.budget_s
+
+        # Round-robin: rotate the starting owner, and give each owner an
+        # equal share of what is left of the slice (time an owner does not
+        # use passes on to the ones after it). Every owner draws at least
+        # one item, even when an earlier one overran the slice
+        owners = list(self._tasks.items())
+        if owners:
+            k = self._turn % len(owners)
+            owners = owners[k:] + owners[:k]
+            self._turn += 1
+        for n, (owner, task) in enumerate(owners):
+            now = time.perf_counter()
+            share_end = now + max(0.0, deadline - now) / (len(owners) - n)
+            while task.done < task.total and not task.cancelled:
+                item = task.items[task.done]
+                task.done += 1
+                try:
+                    task.fn(item)
+                except Exception as e:
+                    print(f"[PLOT] {e}")
+                if time.perf_counter() >= share_end:
+                    break
+            if task.cancelled:
+                continue
+
+            if task.done >= task.total:
+                self._tasks.pop(owner, None)
+                self._finish(task)
+            elif task.on_progress is not None:
+                task.on_progress(task.done, task.total)
+
+        if self._tasks and self._after_id is None:
+            # A real timer rather than after_idle, so input and redraws run first
+            self._after_id = self.root.after(1, self._run)
+
+    @staticmethod
+    def _finish(task):
+        if task.on_progress is not None:
+            task.on_progress(task.total, task.total)
+        if task.on_done is not None:
+            task.on_done()
+
+
+_schedulers = {}
+
+
+def scheduler_for(root) -> PlotScheduler:
+    """The shared PlotScheduler for root's window (created on first use)."""
+    if hasattr(root, "winfo_toplevel"):
+        root = root.winfo_toplevel()  # one frame budget per window, whichever widget asks
+    s = _schedulers.get(id(root))
+    if s is None or s.root is not root:
+        s = PlotScheduler(root)
+        _schedulers[id(root)] = s
+    return s
@@ -0,0 +1,313 @@
+# screens/shared/raster_layer.py
+# Dense point layers drawn as one image per view. A worker thread pastes
+# the layer's icon at every on-screen point into a PIL image, which is shown
+# as a single canvas item. Clicks are hit-tested against an STRtree of the
+# points in web-mercator space instead of per-marker callbacks.
+import numpy as np
+import shapely
+from PIL import Image, ImageDraw, ImageTk
+
+import config
+from screens.shared.background import run_in_background
+from screens.shared.marker_layer import MarkerLayer, mercator_xy
+from screens.shared.viewport import current_view, watcher_for
+
+# Extra image drawn around the view (fraction of its size), so short pans
+# are covered while the next image renders
+_RENDER_MARGIN = 0.25
+
+# How close to a point a click must land, in pixels
+_HIT_PX = 10
+
+_CANVAS_TAG = "raster_layer"
+
+
+def icon_sprite(icon, size=16, color="#3E69CB"):
+    """PIL copy of a Tk icon (main thread only), or a plain dot without one."""
+    if icon is not None:
+        try:
+            return ImageTk.getimage(icon).convert("RGBA")
+        except Exception:
+            pass
+    img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    ImageDraw.Draw(img).ellipse((1, 1, size - 2, size - 2), fill=color, outline="white")
+    return img
+
+
+def render_points(px, py, sprite, size) -> Image.Image:
+    """
+    sprite pasted (centred) at every pixel position inside size. Points
+    are binned by half a sprite first: icons that close overlap anyway,
+    so the paste count is bounded by the image area, not the point count.
+    """
+    w, h = size
+    img = Image.new("RGBA", (w, h), (0, 0, 0, 0))
+    sw, sh = sprite.size
+
+    inside = (px > -sw) & (px < w + sw) & (py > -sh) & (py < h + sh)
+    if not inside.any():
+        return img
+    x = px[inside].astype(np.int64)
+    y = py[inside].astype(np.int64)
+
+    bin_px = max(1, min(sw, sh) // 2)
+    _, first = np.unique((y // bin_px) * (w // bin_px + 4) + (x // bin_px), return_index=True)
+    for cx, cy in zip(x[first].tolist(), y[first].tolist()):
+        img.paste(sprite, (cx - sw // 2, cy - sh // 2), sprite)
+    return img
+
+
+class RasterLayer:
+    def __init__(self, *, root, map_widget, icon=None, on_click=None, color="#3E69CB", on_progress=None):
+        """
+        on_click(i, None) is called with the row index of a clicked point;
+        on_progress(done, total) reports the first image being rendered.
+        """
+        self.root = root
+        self.map_widget = map_widget
+        self.on_click = on_click
+        self.on_progress = on_progress
+        self.sprite = icon_sprite(icon, color=color)
+
+        self.mx = self.my = np.zeros(0)
+        self.pos = np.zeros(0, dtype=np.int64)
+        self._tree = None
+
+        self._photo = None
+        self._item = None
+        self._shown = None     # (scale key, origin_x, origin_y) of the image on the canvas
+        self._job = 0
+        self._busy = False
+        self._pending = None
+        self._loading = False
+        self._unsubscribe = None
+        self.visible = True
+
+    def __len__(self):
+        return len(self.pos)
+
+    def set_points(self, lat, lon, ids=None):
+        """
+        ids is accepted for parity with MarkerLayer: the image is always
+        redrawn whole, but on a live layer the old one stays up until then.
+        """
+        live = self._unsubscribe is not None
+        if not live:
+            self.clear()
+        self._job += 1  # a render in flight is for the old points
+
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        self.pos = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        self.mx, self.my = mercator_xy(lat[self.pos], lon[self.pos])
+        self._tree = shapely.STRtree(shapely.points(self.mx, self.my))
+
+        if not self.visible:
+            self._loading = True
+            return  # rendered when shown
+        if live:
+            view = current_view(self.map_widget)
+            if view is not None:
+                self._on_view(view)
+            return
+        self._loading = True
+        _register_click(self)
+        self._unsubscribe = watcher_for(self.root, self.map_widget).subscribe(self._on_view)
+
+    def set_visible(self, visible):
+        """Hide or show the cached image; a hidden layer renders nothing and ignores clicks."""
+        visible = bool(visible)
+        if visible == self.visible:
+            return
+        self.visible = visible
+        if self._item is not None:
+            self.map_widget.canvas.itemconfigure(self._item, state="normal" if visible else "hidden")
+        if not visible:
+            self._job += 1
+            self._pending = None
+            if self._unsubscribe is not None:
+                self._unsubscribe()
+                self._unsubscribe = None
+            _unregister_click(self)
+        elif self._tree is not None:
+            _register_click(self)
+            self._unsubscribe = watcher_for(self.root, self.map_widget).subscribe(self._on_view)
+
+    def clear(self):
+        self._job += 1
+        self._pending = None
+        self._loading = False
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        _unregister_click(self)
+        if self._item is not None:
+            try:
+                self.map_widget.canvas.delete(self._item)
+            except Exception:
+                pass
+        self._item = None
+        self._photo = None
+        self._shown = None
+        self._tree = None
+        self.pos = np.zeros(0, dtype=np.int64)
+
+    # ---------------------------
+    # Rendering
+    # ---------------------------
+    @staticmethod
+    def _scale_key(view):
+        return view["zoom"], round(view["px_per_tile"], 4)
+
+    def _origin(self, view):
+        """Image top-left in world pixels at the view's zoom (margin included)."""
+        w, h = view["size"]
+        scale = view["px_per_tile"]
+        ox = view["tile_origin"][0] * scale - w * _RENDER_MARGIN
+        oy = view["tile_origin"][1] * scale - h * _RENDER_MARGIN
+        return ox, oy
+
+    def _on_view(self, view):
+        # Same zoom: slide the current image along until the new one is ready
+        if self._item is not None and self._shown is not None:
+            if self._shown[0] == self._scale_key(view):
+                ox, oy = self._origin(view)
+                self.map_widget.canvas.coords(
+                    self._item,
+                    self._shown[1] - ox - view["size"][0] * _RENDER_MARGIN,
+                    self._shown[2] - oy - view["size"][1] * _RENDER_MARGIN,
+                )
+            else:
+                self.map_widget.canvas.itemconfigure(self._item, state="hidden")
+            self._raise()
+
+        # One render at a time; only the latest view is rendered next
+        self._pending = view
+        if not self._busy:
+            self._render_next()
+
+    def _render_next(self):
+        view, self._pending = self._pending, None
+        if view is None or self._tree is None:
+            return
+        self._busy = True
+        job = self._job
+        if self._loading and self.on_progress is not None:
+            self.on_progress(0, len(self.pos))
+
+        w, h = view["size"]
+        size = (int(w * (1 + 2 * _RENDER_MARGIN)), int(h * (1 + 2 * _RENDER_MARGIN)))
+        world_px = (2 ** view["zoom"]) * view["px_per_tile"]
+        ox, oy = self._origin(view)
+        mx, my, sprite = self.mx, self.my, self.sprite
+
+        def work():
+            return render_points(mx * world_px - ox, my * world_px - oy, sprite, size)
+
+        def done(img):
+            if job == self._job:
+                self._show(img, view, ox, oy)
+
+        def finished():
+            self._busy = False
+            self._render_next()
+
+        run_in_background(self.root, work_fn=work, on_success=done, on_error=lambda e, tb: None,
+                          on_finally=finished)
+
+    def _show(self, img, view, ox, oy):
+        self._photo = ImageTk.PhotoImage(img, master=self.root)
+        canvas = self.map_widget.canvas
+        x = -view["size"][0] * _RENDER_MARGIN
+        y = -view["size"][1] * _RENDER_MARGIN
+
+        # The widget may have moved on while rendering: place by the current layout
+        now = current_view(self.map_widget)
+        if now is not None and self._scale_key(now) == self._scale_key(view):
+            nx, ny = self._origin(now)
+            x += ox - nx
+            y += oy - ny
+
+        if self._item is None:
+            self._item = canvas.create_image(x, y, anchor="nw", image=self._photo, tags=_CANVAS_TAG)
+        else:
+            canvas.coords(self._item, x, y)
+            canvas.itemconfigure(self._item, image=self._photo, state="normal")
+        self._shown = (self._scale_key(view), ox, oy)
+        self._raise()
+        if self._loading:
+            self._loading = False
+            if self.on_progress is not None:
+                self.on_progress(len(self.pos), len(self.pos))
+
+    def _raise(self):
+        # New tiles are created on top; keep the image above them and below paths/markers
+        try:
+            self.map_widget.canvas.tag_raise(_CANVAS_TAG, "tile")
+        except Exception:
+            pass
+
+    # ---------------------------
+    # Hit testing
+    # ---------------------------
+    def hit(self, lat, lon):
+        """Row index of the point under (lat, lon) at the current zoom, or None."""
+        view = current_view(self.map_widget)
+        if self._tree is None or view is None:
+            return None
+        mx, my = mercator_xy([lat], [lon])
+        reach = _HIT_PX / ((2 ** view["zoom"]) * view["px_per_tile"])
+        k = self._tree.query_nearest(shapely.points(mx[0], my[0]), max_distance=reach)
+        return int(self.pos[k[0]]) if len(k) else None
+
+
+# ---------------------------
+# Click routing: tkintermapview keeps one map-click callback per widget, so
+# raster layers share one that falls through to whatever was there before
+# ---------------------------
+_routers = {}
+
+
+def _register_click(layer):
+    current = getattr(layer.map_widget, "map_click_callback", None)
+    r = _routers.get(id(layer.map_widget))
+    if r is None or r["widget"] is not layer.map_widget or r["handler"] is not current:
+        # New map, or another screen set its own click command on the shared
+        # map since: route in front of whatever is there now
+        layers = r["layers"] if r is not None and r["widget"] is layer.map_widget else []
+        r = {"widget": layer.map_widget, "layers": layers, "fallback": current}
+
+        def on_click(coords):
+            for lyr in reversed(r["layers"]):
+                i = lyr.hit(*coords)
+                if i is not None:
+                    if lyr.on_click is not None:
+                        lyr.on_click(i, None)
+                    return
+            if r["fallback"] is not None:
+                r["fallback"](coords)
+
+        r["handler"] = on_click
+        layer.map_widget.add_left_click_map_command(on_click)
+        _routers[id(layer.map_widget)] = r
+    if layer not in r["layers"]:
+        r["layers"].append(layer)
+
+
+def _unregister_click(layer):
+    r = _routers.get(id(layer.map_widget))
+    if r is not None and layer in r["layers"]:
+        r["layers"].remove(layer)
+
+
+def point_layer_class(n_points):
+    """RasterLayer for layers of config.MARKER_RASTER_MIN_POINTS or more rows, else MarkerLayer."""
+    limit = getattr(config, "MARKER_RASTER_MIN_POINTS", None)
+    return RasterLayer if limit is not None and n_points >= limit else MarkerLayer
+
+
+def make_point_layer(n_points, **kwargs):
+    cls = point_layer_class(n_points)
+    if cls is RasterLayer:
+        kwargs.pop("text", None)
+    return cls(**kwargs)
@@ -0,0 +1,127 @@
+# screens/shared/viewport.py
+# What part of the map is on screen, and a poller that reports when it changes.
+# tkintermapview has no pan/zoom callback, so the widget's tile layout is
+# polled with after() and subscribers are told about new views.
+import math
+
+from tkintermapview.utility_functions import osm_to_decimal
+
+# Equatorial circumference used by the web-mercator tile scheme
+_MERCATOR_CIRCUMFERENCE_M = 40_075_016.686
+
+
+def current_view(map_widget):
+    """
+    The visible part of the map as a dict, or None before the first layout:
+      - bounds    (south, west, north, east) in degrees
+      - zoom      integer tile zoom the widget is drawing
+      - m_per_px  metres per screen pixel at the view centre
+      - size      (width, height) in pixels
+      - tile_origin, px_per_tile   the widget's tile layout, for placing pixels
+    """
+    try:
+        zoom = round(map_widget.zoom)
+        ul_x, ul_y = map_widget.upper_left_tile_pos
+        lr_x, lr_y = map_widget.lower_right_tile_pos
+        width, height = int(map_widget.width), int(map_widget.height)
+    except Exception:
+        return None
+    if lr_x <= ul_x or lr_y <= ul_y or width <= 0:
+        return None
+
+    north, west = osm_to_decimal(ul_x, ul_y, zoom)
+    south, east = osm_to_decimal(lr_x, lr_y, zoom)
+    centre_lat = (north + south) / 2
+
+    # Pixels per tile from the actual layout, so fractional zooms come out right
+    px_per_tile = width / (lr_x - ul_x)
+    m_per_tile = _MERCATOR_CIRCUMFERENCE_M * math.cos(math.radians(centre_lat)) / (2 ** zoom)
+
+    return {
+        "bounds": (south, west, north, east),
+        "zoom": zoom,
+        "m_per_px": m_per_tile / px_per_tile,
+        "size": (width, height),
+        "tile_origin": (ul_x, ul_y),
+        "px_per_tile": px_per_tile,
+    }
+
+
+def padded_bounds(bounds, frac=0.25):
+    """Bounds grown by frac of their size on every side (draw a little off-screen)."""
+    south, west, north, east = bounds
+    dy = (north - south) * frac
+    dx = (east - west) * frac
+    return south - dy, west - dx, north + dy, east + dx
+
+
+def _layout_key(map_widget):
+    # Tile layout at pixel precision, so sub-pixel jitter is not a change
+    ts = getattr(map_widget, "tile_size", 256)
+    ul_x, ul_y = map_widget.upper_left_tile_pos
+    lr_x, lr_y = map_widget.lower_right_tile_pos
+    return (round(map_widget.zoom, 3), round(ul_x * ts), round(ul_y * ts),
+            round(lr_x * ts), round(lr_y * ts))
+
+
+class ViewportWatcher:
+    """
+    Polls one map widget and calls every subscriber with current_view()
+    whenever the view changes. Use watcher_for() to share one per widget.
+    """
+
+    def __init__(self, root, map_widget, poll_ms=120):
+        self.root = root
+        self.map_widget = map_widget
+        self.poll_ms = poll_ms
+        self._subscribers = {}
+        self._next_id = 0
+        self._last_key = None
+        self._after_id = None
+
+    def subscribe(self, fn, call_now=True):
+        """Register fn(view); returns an unsubscribe function."""
+        sid = self._next_id
+        self._next_id += 1
+        self._subscribers[sid] = fn
+        if self._after_id is None:
+            self._after_id = self.root.after(self.poll_ms, self._poll)
+        if call_now:
+            view = current_view(self.map_widget)
+            if view is not None:
+                fn(view)
+        return lambda: self._subscribers.pop(sid, None)
+
+    def _poll(self):
+        self._after_id = None
+        if not self._subscribers:
+            return
+        try:
+            if not self.map_widget.winfo_exists():
+                return
+        except Exception:
+            return
+
+        key = _layout_key(self.map_widget)
+        view = current_view(self.map_widget) if key != self._last_key else None
+        if view is not None:
+            self._last_key = key
+            for fn in list(self._subscribers.values()):
+                try:
+                    fn(view)
+                except Exception:
+                    pass
+
+        self._after_id = self.root.after(self.poll_ms, self._poll)
+
+
+_watchers = {}
+
+
+def watcher_for(root, map_widget) -> ViewportWatcher:
+    """The shared ViewportWatcher for map_widget (created on first use)."""
+    w = _watchers.get(id(map_widget))
+    if w is None or w.map_widget is not map_widget:
+        w = ViewportWatcher(root, map_widget)
+        _watchers[id(map_widget)] = w
+    return w
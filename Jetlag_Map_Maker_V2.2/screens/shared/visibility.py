@@ -0,0 +1,106 @@
+# screens/shared/visibility.py
+# Hiding map objects without deleting them. tkintermapview redraws every
+# object in its marker/path/polygon lists on each pan, so a hidden object is
+# taken out of its list and its canvas items are set to state="hidden";
+# showing it puts it back and redraws it once. Nothing is rebuilt.
+#
+# delete_objects removes many objects the same way, for layers that drop
+# hundreds of markers on one pan.
+
+# Canvas item attributes of CanvasPositionMarker, CanvasPath and CanvasPolygon
+_ITEM_ATTRS = ("polygon", "big_circle", "canvas_text", "canvas_icon", "canvas_image", "canvas_line", "canvas_polygon")
+
+
+def _list_name(obj):
+    if hasattr(obj, "canvas_line"):
+        return "canvas_path_list"
+    if hasattr(obj, "canvas_polygon"):
+        return "canvas_polygon_list"
+    return "canvas_marker_list"
+
+
+def set_objects_visible(map_widget, objs, visible):
+    """
+    Hide or show map objects. Objects with their own set_visible (LodPaths
+    and the layer classes) are passed through; deleted ones are skipped.
+    """
+    plain = {}
+    for obj in objs:
+        if obj is None or getattr(obj, "deleted", False):
+            continue
+        if hasattr(obj, "set_visible"):
+            obj.set_visible(visible)
+        else:
+            plain.setdefault(_list_name(obj), []).append(obj)
+
+    canvas = getattr(map_widget, "canvas", None)
+    state = "normal" if visible else "hidden"
+    for name, group in plain.items():
+        lst = getattr(map_widget, name, None)
+        if lst is None:
+            continue
+        ids = {id(o) for o in group}
+        if visible:
+            listed = {id(o) for o in lst}
+            lst.extend(o for o in group if id(o) not in listed)
+        else:
+            lst[:] = [o for o in lst if id(o) not in ids]
+
+        for obj in group:
+            if canvas is not None:
+                for attr in _ITEM_ATTRS:
+                    item = getattr(obj, attr, None)
+                    if item is not None:
+                        canvas.itemconfigure(item, state=state)
+            if visible:
+                try:
+                    obj.draw()  # catch up with pans made while hidden
+                except Exception:
+                    pass
+
+
+def delete_objects(map_widget, objs):
+    """
+    Delete map objects in one pass: one filter of each object list and one
+    canvas.delete for all their items, instead of obj.delete() per object
+    (a list.remove and a canvas.update() each). Objects with their own
+    set_visible get their own delete().
+    """
+    plain = {}
+    for obj in objs:
+        if obj is None or getattr(obj, "deleted", False):
+            continue
+        if hasattr(obj, "set_visible"):
+            obj.delete()
+        else:
+            plain.setdefault(_list_name(obj), []).append(obj)
+
+    canvas = getattr(map_widget, "canvas", None)
+    for name, group in plain.items():
+        lst = getattr(map_widget, name, None)
+        if lst is not None:
+            ids = {id(o) for o in group}
+            lst[:] = [o for o in lst if id(o) not in ids]
+
+        items = []
+        for obj in group:
+            for attr in _ITEM_ATTRS:
+                item = getattr(obj, attr, None)
+                if item is not None:
+                    items.append(item)
+                    setattr(obj, attr, None)
+            obj.deleted = True
+        if canvas is not None and items:
+            canvas.delete(*items)
+
+
+def set_group_visible(map_widget, group, visible):
+    """group: a screen's {"objs": [...], "visible": bool} dict of map shapes."""
+    group["visible"] = bool(visible)
+    set_objects_visible(map_widget, group["objs"], visible)
+
+
+def apply_group_visibility(map_widget, group, objs):
+    """Objects just added to group start hidden if the group is hidden."""
+    if not group.get("visible", True):
+        set_objects_visible(map_widget, objs, False)
@@ -0,0 +1,180 @@
+# screens/shared/zone_coverage.py
+# How much of the game area the hiding zones cover, where the gaps are and
+# which zones overlap heavily. Everything runs in a local metric projection,
+# so areas come out in square metres and disks are true circles.
+import numpy as np
+import shapely
+
+from geodesy import LocalProjection
+from screens.shared.zone_union import polygons_of
+
+# Gaps smaller than this are dropped from the report (slivers between disks)
+MIN_GAP_M2 = 10_000
+
+# A zone counts as heavily overlapping if the lenses it shares with other
+# zones add up to this much of its own area, or it lies inside another zone
+HEAVY_OVERLAP_RATIO = 2.0
+
+
+def _lens_areas(d, r1, r2) -> np.ndarray:
+    """Area shared by two circles with centre distance d (vectorised)."""
+    d = np.asarray(d, dtype=float)
+    r1 = np.asarray(r1, dtype=float)
+    r2 = np.asarray(r2, dtype=float)
+    out = np.zeros(np.broadcast(d, r1, r2).shape)
+
+    small = np.minimum(r1, r2)
+    inside = d <= np.abs(r1 - r2)
+    out[inside] = (np.pi * small ** 2)[inside]
+
+    part = (d < r1 + r2) & ~inside
+    if part.any():
+        d, r1, r2 = d[part], r1[part], r2[part]
+        a1 = np.arccos(np.clip((d ** 2 + r1 ** 2 - r2 ** 2) / (2 * d * r1), -1, 1))
+        a2 = np.arccos(np.clip((d ** 2 + r2 ** 2 - r1 ** 2) / (2 * d * r2), -1, 1))
+        tri = 0.5 * np.sqrt(np.maximum((-d + r1 + r2) * (d + r1 - r2) * (d - r1 + r2) * (d + r1 + r2), 0))
+        out[part] = r1 ** 2 * a1 + r2 ** 2 * a2 - tri
+    return out
+
+
+def _to_metres(geom, proj):
+    def fwd(c):
+        x, y = proj.to_xy(c[:, 1], c[:, 0])
+        return np.column_stack([x, y])
+    return shapely.transform(geom, fwd)
+
+
+def _to_lonlat(geom, proj):
+    def back(c):
+        lat, lon = proj.to_latlon(c[:, 0], c[:, 1])
+        return np.column_stack([lon, lat])
+    return shapely.transform(geom, back)
+
+
+def zone_overlaps(x, y, radii):
+    """
+    Per zone: how many other zones touch it, the summed lens area shared
+    with them as a fraction of its own area, and whether another zone
+    contains it. Neighbour pairs come from an STRtree over the centres.
+    """
+    n = len(x)
+    neighbours = np.zeros(n, dtype=np.int64)
+    ratio = np.zeros(n)
+    contained = np.zeros(n, dtype=bool)
+    if n < 2:
+        return neighbours, ratio, contained
+
+    tree = shapely.STRtree(shapely.points(x, y))
+    i, j = tree.query(shapely.points(x, y), predicate="dwithin", distance=2 * float(radii.max()))
+    upper = i < j
+    i, j = i[upper], j[upper]
+    d = np.hypot(x[i] - x[j], y[i] - y[j])
+    touch = d < radii[i] + radii[j]
+    i, j, d = i[touch], j[touch], d[touch]
+
+    lens = _lens_areas(d, radii[i], radii[j])
+    np.add.at(neighbours, i, 1)
+    np.add.at(neighbours, j, 1)
+    np.add.at(ratio, i, lens)
+    np.add.at(ratio, j, lens)
+    ratio /= np.pi * radii ** 2
+
+    i_in_j = d + radii[i] <= radii[j]
+    j_in_i = d + radii[j] <= radii[i]
+    # Identical zones contain each other: only the later one (j > i) is dropped
+    contained[i[i_in_j & ~j_in_i]] = True
+    contained[j[j_in_i]] = True
+    return neighbours, ratio, contained
+
+
+def coverage_report(hide_zone_data, area=None, segments=36):
+    """
+    hide_zone_data: [(lat, lon, radius_m), ...]; area: lon/lat shapely
+    geometry of the game area (or None for overlap stats only).
+
+    Returns a dict:
+      - zones           number of zones with a radius
+      - area_m2         game area (None without an area)
+      - covered_m2      part of the area inside any zone
+      - coverage_pct    covered_m2 / area_m2 * 100
+      - regions         per area polygon: area_m2, covered_m2, coverage_pct, gaps
+      - gaps            uncovered polygons >= MIN_GAP_M2, lon/lat
+      - neighbours, overlap_ratio, contained   per zone (hide_zone_data order)
+      - heavy           indices of heavily overlapping zones
+    """
+    if hide_zone_data:
+        lats, lons, radii = (np.asarray(c, dtype=float) for c in zip(*hide_zone_data))
+    else:
+        lats = lons = radii = np.zeros(0)
+
+    n = len(radii)
+    report = {
+        "zones": 0, "area_m2": None, "covered_m2": None, "coverage_pct": None,
+        "regions": [], "gaps": [],
+        "neighbours": np.zeros(n, dtype=np.int64), "overlap_ratio": np.zeros(n),
+        "contained": np.zeros(n, dtype=bool), "heavy": np.zeros(0, dtype=np.int64),
+    }
+
+    ok = (radii > 0) & ~(np.isnan(lats) | np.isnan(lons))
+    pos = np.flatnonzero(ok)
+    if len(pos) == 0 and area is None:
+        return report
+
+    proj = LocalProjection.around(lats[pos], lons[pos]) if len(pos) else \
+        LocalProjection(area.centroid.y, area.centroid.x)
+    x, y = proj.to_xy(lats[pos], lons[pos])
+    report["zones"] = len(pos)
+
+    if len(pos):
+        neighbours, ratio, contained = zone_overlaps(x, y, radii[pos])
+        report["neighbours"][pos] = neighbours
+        report["overlap_ratio"][pos] = ratio
+        report["contained"][pos] = contained
+        report["heavy"] = pos[(ratio >= HEAVY_OVERLAP_RATIO) | contained]
+
+    if area is None:
+        return report
+
+    area_m = _to_metres(area, proj)
+    covered = None
+    if len(pos):
+        # Zones inside another zone add nothing to the union, nor do zones
+        # off the area's bounds
+        keep = ~report["contained"][pos]
+        disks = shapely.buffer(shapely.points(x[keep], y[keep]), radii[pos][keep], quad_segs=max(1, segments // 4))
+        disks = disks[shapely.intersects(disks, shapely.box(*area_m.bounds))]
+        if len(disks):
+            covered = shapely.union_all(disks)
+
+    total_area = total_covered = 0.0
+    for region in polygons_of(area_m):
+        inside = region.intersection(covered) if covered is not None else None
+        gap = region.difference(covered) if covered is not None else region
+        gaps = [g for g in polygons_of(gap) if g.area >= MIN_GAP_M2]
+        covered_m2 = inside.area if inside is not None else 0.0
+        report["regions"].append({
+            "area_m2": region.area,
+            "covered_m2": covered_m2,
+            "coverage_pct": 100.0 * covered_m2 / region.area if region.area else 0.0,
+            "gaps": [_to_lonlat(g, proj) for g in gaps],
+        })
+        report["gaps"].extend(report["regions"][-1]["gaps"])
+        total_area += region.area
+        total_covered += covered_m2
+
+    report["area_m2"] = total_area
+    report["covered_m2"] = total_covered
+    report["coverage_pct"] = 100.0 * total_covered / total_area if total_area else 0.0
+    return report
+
+
+def coverage_summary(report) -> str:
+    """One or two lines for the UI."""
+    if report["coverage_pct"] is None:
+        text = f"{report['zones']} zones"
+    else:
+        text = f"Coverage {report['coverage_pct']:.1f}% of {report['area_m2'] / 1e6:.1f} km²"
+        if len(report["regions"]) > 1:
+            text += f" ({len(report['regions'])} regions)"
+        text += f", {len(report['gaps'])} gaps"
+    return text + f"\n{len(report['heavy'])} heavily overlapping zones"
@@ -0,0 +1,137 @@
+# screens/shared/zone_layer.py
+# Level-of-detail renderer for hiding-zone circles. Zones are held in an
+# STRtree of their bounding boxes; only those near the viewport are on the
+# map, each with a segment count picked from its radius on screen. Pan/zoom
+# only adds, removes or re-segments the zones that changed, drawing through
+# the shared PlotScheduler so a big pan does not freeze the UI.
+import numpy as np
+import shapely
+
+from geodesy import M_PER_DEG_LAT
+from screens.shared.plot_scheduler import scheduler_for
+from screens.shared.viewport import padded_bounds, watcher_for
+from screens.shared.visibility import set_objects_visible
+
+# Segment counts a zone can be drawn with (rings are cached per count)
+SEGMENT_STEPS = (8, 12, 18, 24, 32, 48, 64)
+
+# Largest gap between the true circle and a polygon edge, in pixels
+_MAX_SAGITTA_PX = 0.5
+
+# Zones smaller than this on screen are not drawn
+MIN_ZONE_PX = 1.0
+
+
+def segments_for_px(radius_px) -> np.ndarray:
+    """Fewest SEGMENT_STEPS whose edges stay within _MAX_SAGITTA_PX of the circle."""
+    r = np.maximum(np.asarray(radius_px, dtype=float), 1e-9)
+    need = np.pi / np.arccos(np.clip(1 - _MAX_SAGITTA_PX / r, -1.0, 1.0))
+    steps = np.asarray(SEGMENT_STEPS)
+    return steps[np.minimum(np.searchsorted(steps, need), len(steps) - 1)]
+
+
+class ZoneLayer:
+    def __init__(self, *, root, map_widget, rings_for, draw_ring):
+        """
+        rings_for(segments) -> (n, segments + 1, 2) lat/lon rings for every zone
+        draw_ring(pts) -> map object with .delete()
+        """
+        self.root = root
+        self.map_widget = map_widget
+        self.rings_for = rings_for
+        self.draw_ring = draw_ring
+
+        self._radii = np.zeros(0)
+        self._tree = None
+        self._tree_pos = np.zeros(0, dtype=np.int64)
+
+        self._drawn = {}  # zone index -> (segments, map object)
+        self._unsubscribe = None
+        self._scheduler = scheduler_for(root)
+        self.visible = True
+
+    def __len__(self):
+        return len(self._drawn)
+
+    def set_zones(self, lats, lons, radii_m):
+        self.clear()
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        self._radii = np.asarray(radii_m, dtype=float)
+
+        ok = (self._radii > 0) & ~(np.isnan(lats) | np.isnan(lons))
+        pos = np.flatnonzero(ok)
+        if len(pos):
+            dlat = self._radii[pos] / M_PER_DEG_LAT
+            dlon = self._radii[pos] / (M_PER_DEG_LAT * np.maximum(np.cos(np.radians(lats[pos])), 1e-6))
+            boxes = shapely.box(lons[pos] - dlon, lats[pos] - dlat, lons[pos] + dlon, lats[pos] + dlat)
+            self._tree = shapely.STRtree(boxes)
+            self._tree_pos = pos
+
+        if self.visible:
+            self._unsubscribe = watcher_for(self.root, self.map_widget).subscribe(self._on_view)
+
+    def set_visible(self, visible):
+        """Hide or show the drawn rings as they are; a hidden layer skips pan/zoom updates."""
+        visible = bool(visible)
+        if visible == self.visible:
+            return
+        self.visible = visible
+        set_objects_visible(self.map_widget, [obj for _seg, obj in self._drawn.values()], visible)
+        if not visible:
+            self._scheduler.cancel(self)
+            if self._unsubscribe is not None:
+                self._unsubscribe()
+                self._unsubscribe = None
+        elif self._tree is not None:
+            self._unsubscribe = watcher_for(self.root, self.map_widget).subscribe(self._on_view)
+
+    def clear(self):
+        self._scheduler.cancel(self)  # rings still queued are now stale
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        for _seg, obj in self._drawn.values():
+            self._delete(obj)
+        self._drawn.clear()
+        self._tree = None
+        self._tree_pos = np.zeros(0, dtype=np.int64)
+
+    def _delete(self, obj):
+        try:
+            obj.delete()
+        except Exception:
+            pass
+
+    # ---------------------------
+    # Viewport updates
+    # ---------------------------
+    def _wanted(self, view):
+        """{zone index: segments} for the zones that belong on screen in view."""
+        if self._tree is None:
+            return {}
+        south, west, north, east = padded_bounds(view["bounds"])
+        hits = self._tree_pos[self._tree.query(shapely.box(west, south, east, north))]
+        radius_px = self._radii[hits] / view["m_per_px"]
+        big = radius_px >= MIN_ZONE_PX
+        hits = hits[big]
+        return dict(zip(hits.tolist(), segments_for_px(radius_px[big]).tolist()))
+
+    def _on_view(self, view):
+        wanted = self._wanted(view)
+
+        for k in [k for k, (seg, _obj) in self._drawn.items() if wanted.get(k) != seg]:
+            self._delete(self._drawn.pop(k)[1])
+
+        todo = sorted((seg, k) for k, seg in wanted.items() if k not in self._drawn)
+        rings = {}
+
+        def draw(item):
+            seg, k = item
+            if seg not in rings:
+                rings[seg] = self.rings_for(seg)
+            obj = self.draw_ring([tuple(p) for p in rings[seg][k].tolist()])
+            if obj is not None:
+                self._drawn[k] = (seg, obj)
+
+        self._scheduler.submit(self, todo, draw)
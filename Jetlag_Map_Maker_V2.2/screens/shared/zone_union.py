@@ -0,0 +1,49 @@
+# screens/shared/zone_union.py
+# Union of all hiding-zone disks, clipped to the game area.
+import numpy as np
+import shapely
+from shapely.geometry import MultiPolygon, Polygon
+
+
+def union_zone_rings(rings: np.ndarray, area=None, chunk: int = 2000):
+    """
+    rings: (n, k, 2) closed (lat, lon) rings from circle_rings().
+    Returns a shapely (Multi)Polygon in lon/lat, or None if there are no zones.
+    Chunks are unioned first, then the partial results (a two-level tree),
+    which keeps each union_all call small for very large zone sets.
+    """
+    if rings is None or len(rings) == 0:
+        return None
+
+    rings = rings[~np.isnan(rings[:, 0, 0])]
+    if len(rings) == 0:
+        return None
+
+    polys = shapely.polygons(rings[:, :, ::-1])  # -> (lon, lat)
+
+    parts = [shapely.union_all(polys[s:s + chunk]) for s in range(0, len(polys), chunk)]
+    merged = shapely.union_all(parts) if len(parts) > 1 else parts[0]
+
+    if area is not None:
+        merged = merged.intersection(area)
+    if merged.is_empty:
+        return None
+    return merged
+
+
+def polygons_of(geom):
+    """Polygons in a union result (ignores stray lines/points from clipping)."""
+    if geom is None or geom.is_empty:
+        return []
+    if isinstance(geom, Polygon):
+        return [geom]
+    if isinstance(geom, MultiPolygon):
+        return list(geom.geoms)
+    return [g for g in getattr(geom, "geoms", []) if isinstance(g, Polygon)]
+
+
+def latlon_rings(poly: Polygon):
+    """(outer, [holes]) as lists of (lat, lon), for map paths."""
+    outer = [(lat, lon) for lon, lat in poly.exterior.coords]
+    holes = [[(lat, lon) for lon, lat in r.coords] for r in poly.interiors]
+    return outer, holes
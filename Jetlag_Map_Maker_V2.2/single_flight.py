@@ -0,0 +1,64 @@
+"""
+Single-flight coalescing for Overpass fetches.
+
+If a fetch for the same layer + area is already running, later callers
+wait on its Future instead of sending a duplicate query.
+"""
+import threading
+from concurrent.futures import Future
+
+import snapshot
+
+
+def fetch_key(kind: str, layer: str, osm_filter, area=None):
+    """Key for one layer fetch: kind, layer, filter set, area geometry and snapshot date."""
+    filters = osm_filter if isinstance(osm_filter, (list, tuple)) else [osm_filter]
+    area_id = area.wkb_hex if area is not None else None
+    return (kind, layer, tuple(sorted(str(f) for f in filters)), area_id, snapshot.snapshot_date())
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Future
+
+    def is_running(self, key) -> bool:
+        with self._lock:
+            return key in self._inflight
+
+    def do(self, key, fn, on_join=None):
+        """
+        Run fn() for key, or wait for the call already running for key.
+        Blocks the calling (worker) thread; everyone gets the same result,
+        or the same exception. on_join() is called when attaching.
+        """
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._inflight[key] = fut
+
+        if not leader:
+            if on_join:
+                try:
+                    on_join()
+                except Exception:
+                    pass
+            return fut.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+# Shared by every screen, so POI and transport fetches coalesce app-wide
+fetches = SingleFlight()
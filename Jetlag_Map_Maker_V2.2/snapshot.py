@@ -0,0 +1,131 @@
+"""
+Optional OSM data snapshot date.
+
+With config.snapshot_date set, every Overpass query carries a
+[date:"..."] pin, so its answer can never change. Those answers are kept
+on disk with no expiry (config.SNAPSHOT_CACHE_DIR, which can be a shared
+folder), and rebuilding a game map for the same date reads them back
+instead of querying Overpass.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+import config
+
+_lock = threading.Lock()
+
+
+def parse_snapshot_date(text) -> Optional[str]:
+    """
+    "2024-06-01" or "2024-06-01T12:00:00Z" -> "2024-06-01T00:00:00Z" style string.
+    Empty -> None. Raises ValueError for anything else.
+    """
+    s = str(text or "").strip()
+    if not s:
+        return None
+
+    for fmt in ("%Y-%m-%d", "%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%dT%H:%M:%S"):
+        try:
+            dt = datetime.strptime(s, fmt)
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError("Expected a date like 2024-06-01")
+
+    if dt > datetime.now(timezone.utc).replace(tzinfo=None):
+        raise ValueError("Snapshot date is in the future")
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def snapshot_date() -> Optional[str]:
+    """The pinned date from config, normalised, or None (live data)."""
+    try:
+        return parse_snapshot_date(getattr(config, "snapshot_date", None))
+    except ValueError:
+        return None
+
+
+def query_settings(timeout: int, maxsize: Optional[int] = None) -> str:
+    """Overpass settings line, e.g. [out:json][timeout:50][date:"..."];"""
+    parts = ["[out:json]", f"[timeout:{timeout}]"]
+    if maxsize:
+        parts.append(f"[maxsize:{maxsize}]")
+    date = snapshot_date()
+    if date:
+        parts.append(f'[date:"{date}"]')
+    return "".join(parts) + ";"
+
+
+# ------------------------------------------------------------
+# Immutable on-disk results (only used when a date is pinned)
+# ------------------------------------------------------------
+def _cache_dir() -> Path:
+    d = getattr(config, "SNAPSHOT_CACHE_DIR", None)
+    return Path(d) if d else Path.home() / ".jetlag_map_maker" / "snapshots"
+
+
+def result_key(kind: str, layer: str, osm_filter, area_clause: str) -> Optional[str]:
+    """Stable file key for a pinned fetch, or None when no date is pinned."""
+    date = snapshot_date()
+    if not date or not area_clause:
+        return None
+
+    filters = osm_filter if isinstance(osm_filter, (list, tuple)) else [osm_filter]
+    raw = json.dumps([date, kind, str(layer).lower(), sorted(str(f) for f in filters), area_clause])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def load_result(key: Optional[str]) -> Optional[pd.DataFrame]:
+    if not key:
+        return None
+
+    path = _cache_dir() / f"{key}.json"
+    if not path.exists():
+        return None
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        df = pd.DataFrame(payload["data"], columns=payload["columns"])
+    except Exception as e:
+        print(f"[SNAPSHOT] Unreadable cache file {path.name}: {e}")
+        return None
+
+    if "Geometry" in df.columns:
+        df["Geometry"] = df["Geometry"].map(
+            lambda g: [tuple(p) for p in g] if isinstance(g, list) else g
+        )
+    return df
+
+
+def store_result(key: Optional[str], df: Optional[pd.DataFrame]) -> None:
+    """Write once; the same key always describes the same data."""
+    if not key or df is None:
+        return
+
+    path = _cache_dir() / f"{key}.json"
+    payload = {
+        "date": snapshot_date(),
+        "columns": [str(c) for c in df.columns],
+        "data": json.loads(df.to_json(orient="values", double_precision=10)),
+    }
+
+    with _lock:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.exists():
+                return
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(payload, f, separators=(",", ":"), sort_keys=True)
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"[SNAPSHOT] Could not write cache file {path.name}: {e}")
@@ -0,0 +1,205 @@
+"""
+Grid neighbour index for lat/lon points, and a greedy radius merge built
+on it.
+
+Points are hashed into square-ish cells at least `cell_m` metres wide, so
+everything within cell_m of a point sits in the 3x3 block of cells around
+it. Candidates from those cells are checked with a vectorised distance:
+equirectangular for radii up to _EQUIRECT_MAX_M, haversine beyond.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from geodesy import M_PER_DEG_LAT, equirect_m, haversine_many_m
+
+# Radii at which the equirectangular check is still exact to ~0.01%
+_EQUIRECT_MAX_M = 20_000.0
+
+
+def _distance_fn(radius_m: float):
+    return equirect_m if radius_m <= _EQUIRECT_MAX_M else haversine_many_m
+
+
+class GridIndex:
+    def __init__(self, lat, lon, cell_m: float, cell_fn=None):
+        """
+        cell_fn(lat, lon) -> (iy, ix) integer arrays replaces the default
+        grid, for callers that must keep their own cells.
+        """
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self.cell_m = float(cell_m)
+
+        # Size lon cells for the most poleward point, so no cell is narrower than cell_m
+        max_abs_lat = float(np.abs(self.lat).max()) if len(self.lat) else 0.0
+        cos_lat = max(math.cos(math.radians(min(max_abs_lat, 89.0))), 1e-6)
+        self.cell_lat = self.cell_m / M_PER_DEG_LAT
+        self.cell_lon = self.cell_m / (M_PER_DEG_LAT * cos_lat)
+
+        self._cell_fn = cell_fn
+        iy, ix = self._cells(self.lat, self.lon)
+        self._iy = iy
+        self._ix = ix
+        self._order = np.lexsort((ix, iy))
+        self._cells_map = None
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _cells(self, lat, lon):
+        if self._cell_fn is not None:
+            iy, ix = self._cell_fn(np.asarray(lat, dtype=float), np.asarray(lon, dtype=float))
+            return np.asarray(iy, dtype=np.int64), np.asarray(ix, dtype=np.int64)
+        iy = np.floor(np.asarray(lat, dtype=float) / self.cell_lat).astype(np.int64)
+        ix = np.floor(np.asarray(lon, dtype=float) / self.cell_lon).astype(np.int64)
+        return iy, ix
+
+    def candidates(self, lat: float, lon: float, radius_m: float = None) -> np.ndarray:
+        """Indices in the cells that can hold points within radius_m (default cell_m)."""
+        reach = 1 if radius_m is None else max(1, int(math.ceil(radius_m / self.cell_m)))
+        if self._cells_map is None:
+            order = self._order
+            keys = np.stack([self._iy[order], self._ix[order]], axis=1)
+            uniq, starts = np.unique(keys, axis=0, return_index=True)
+            ends = np.append(starts[1:], len(order))
+            self._cells_map = {
+                (int(y), int(x)): (s, e) for (y, x), s, e in zip(uniq, starts, ends)
+            }
+
+        iy, ix = self._cells(lat, lon)
+        iy, ix = int(iy), int(ix)
+        chunks = []
+        for y in range(iy - reach, iy + reach + 1):
+            for x in range(ix - reach, ix + reach + 1):
+                span = self._cells_map.get((y, x))
+                if span is not None:
+                    chunks.append(self._order[span[0]:span[1]])
+        if not chunks:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(chunks)
+
+    def query_radius(self, lat: float, lon: float, radius_m: float = None, return_distance=False):
+        """Indices of points within radius_m (default cell_m) of (lat, lon)."""
+        r = self.cell_m if radius_m is None else float(radius_m)
+        idx = self.candidates(lat, lon, r)
+        d = _distance_fn(r)(lat, lon, self.lat[idx], self.lon[idx])
+        hit = d <= r
+        if return_distance:
+            return idx[hit], d[hit]
+        return idx[hit]
+
+
+    def pairs(self, radius_m: float = None, chunk: int = 250_000):
+        """
+        Every pair within radius_m, as arrays (i, j, dist) with i < j.
+        Neighbour cells are matched per offset with searchsorted over the
+        occupied cells, and candidate pairs are checked in chunks, so
+        memory stays bounded for dense layers.
+        """
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0))
+        n = len(self.lat)
+        if n < 2:
+            return empty
+
+        r = self.cell_m if radius_m is None else float(radius_m)
+        reach = max(1, int(math.ceil(r / self.cell_m)))
+        dist = _distance_fn(r)
+
+        # One int64 key per cell, row-major with padding for the offsets
+        ix0 = self._ix.min() - reach
+        iy0 = self._iy.min() - reach
+        width = int(self._ix.max() - ix0 + reach + 1)
+        order = self._order
+        sorted_keys = ((self._iy - iy0) * width + (self._ix - ix0))[order]
+        cells, cell_start, cell_of = np.unique(sorted_keys, return_index=True, return_inverse=True)
+        cell_count = np.diff(np.append(cell_start, n))
+
+        out_i, out_j, out_d = [], [], []
+        for dy in range(-reach, reach + 1):
+            for dx in range(-reach, reach + 1):
+                # Neighbour cell (or none) for every occupied cell
+                target = cells + dy * width + dx
+                hit_cell = np.minimum(np.searchsorted(cells, target), len(cells) - 1)
+                found = cells[hit_cell] == target
+
+                # Per point (sorted order): start and size of its neighbour run
+                has = found[cell_of]
+                lo = cell_start[hit_cell][cell_of]
+                counts = np.where(has, cell_count[hit_cell][cell_of], 0)
+                src = np.flatnonzero(counts)
+                if len(src) == 0:
+                    continue
+
+                # Split sources so each chunk holds about `chunk` candidate pairs
+                csum = np.cumsum(counts[src])
+                bounds = np.searchsorted(csum, np.arange(chunk, csum[-1], chunk))
+                for part in np.split(src, bounds):
+                    if len(part) == 0:
+                        continue
+                    c = counts[part]
+                    i = order[np.repeat(part, c)]
+                    within = np.arange(len(i)) - np.repeat(np.cumsum(c) - c, c)
+                    j = order[np.repeat(lo[part], c) + within]
+                    upper = i < j
+                    i, j = i[upper], j[upper]
+                    d = dist(self.lat[i], self.lon[i], self.lat[j], self.lon[j])
+                    hit = d <= r
+                    out_i.append(i[hit])
+                    out_j.append(j[hit])
+                    out_d.append(d[hit])
+
+        if not out_i:
+            return empty
+        return np.concatenate(out_i), np.concatenate(out_j), np.concatenate(out_d)
+
+
+def radius_merge(df: pd.DataFrame, radius_m: float, rank_col: str = None,
+                 ascending: bool = False, tie_col: str = "Name", pair_filter=None) -> pd.DataFrame:
+    """
+    Greedy merge of points within radius_m: rows are ranked by rank_col
+    (then tie_col), each surviving row is kept and every lower-ranked row
+    within radius_m of it is dropped.
+
+    pair_filter(work, i, j) -> bool mask can veto pairs (e.g. different
+    names); work is the ranked frame and i, j index its rows.
+    """
+    if df is None or df.empty:
+        return df
+
+    by = [(c, asc) for c, asc in ((rank_col, ascending), (tie_col, True)) if c and c in df.columns]
+    work = df
+    if by:
+        work = df.sort_values(by=[c for c, _ in by], ascending=[a for _, a in by])
+    work = work.reset_index(drop=True)
+
+    lat = pd.to_numeric(work["Latitude"], errors="coerce").to_numpy(dtype=float)
+    lon = pd.to_numeric(work["Longitude"], errors="coerce").to_numpy(dtype=float)
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    if radius_m <= 0 or not valid.any():
+        return work
+
+    pos = np.flatnonzero(valid)
+    i, j, _ = GridIndex(lat[pos], lon[pos], radius_m).pairs()
+    if len(i) == 0:
+        return work
+
+    # Rows are in rank order, so in each pair i (< j) outranks j
+    i, j = pos[i], pos[j]
+    if pair_filter is not None:
+        ok = np.asarray(pair_filter(work, i, j), dtype=bool)
+        i, j = i[ok], j[ok]
+        if len(i) == 0:
+            return work
+    order = np.lexsort((j, i))
+    i, j = i[order], j[order]
+    heads, starts = np.unique(i, return_index=True)
+    ends = np.append(starts[1:], len(i))
+
+    removed = np.zeros(len(work), dtype=bool)
+    for h, s, e in zip(heads, starts, ends):
+        if not removed[h]:
+            removed[j[s:e]] = True
+
+    return work[~removed].reset_index(drop=True)
@@ -0,0 +1,7 @@
+# tests/conftest.py
+# Modules import each other as top-level packages (config, geodesy, poi,
+# screens), so the app folder goes on the path.
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
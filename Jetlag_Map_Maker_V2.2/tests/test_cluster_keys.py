@@ -0,0 +1,40 @@
+# tests/test_cluster_keys.py
+# MarkerLayer keeps a cluster marker across replots while its key is
+# unchanged, so clusters must be keyed by their grid cell, not by their
+# position in the list of occupied cells.
+import numpy as np
+import pytest
+
+pytest.importorskip("tkintermapview")
+
+from screens.shared.marker_layer import ClusterIndex  # noqa: E402
+
+
+def _clusters(index, zoom):
+    lvl = index.level(zoom)
+    return {
+        int(cell): (int(count), float(lat), float(lon))
+        for cell, count, lat, lon in zip(lvl["cell"], lvl["count"], lvl["lat"], lvl["lon"])
+    }
+
+
+def test_cells_survive_removing_points_elsewhere():
+    rng = np.random.default_rng(3)
+    lat = 55.86 + rng.normal(0, 0.3, 400)
+    lon = -4.25 + rng.normal(0, 0.5, 400)
+    before = ClusterIndex(lat, lon)
+    # Drop the eastern points; western cells keep exactly the same members
+    keep = lon < -4.0
+    after = ClusterIndex(lat[keep], lon[keep])
+
+    for zoom in range(8, 12):
+        old, new = _clusters(before, zoom), _clusters(after, zoom)
+        west = {cell: c for cell, c in old.items() if c[2] < -4.6}
+        assert west
+        for cell, cluster in west.items():
+            assert new[cell] == cluster
+
+        # The list positions shift, which is why they cannot be the key
+        old_order = before.level(zoom)["cell"].tolist()
+        new_order = after.level(zoom)["cell"].tolist()
+        assert any(old_order.index(c) != new_order.index(c) for c in west)
@@ -0,0 +1,121 @@
+# tests/test_dedup.py
+# The vectorised dedup (and the precomputed slider curve) against the
+# original row-by-row implementation.
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from geodesy import haversine_m
+from screens.shared.dedup import (
+    DEDUP_STEPS_M,
+    apply_dedup_curve,
+    build_dedup_curve,
+    curve_matches,
+    deduplicate_all_by_priority,
+)
+
+ORDER = ["Train", "Subway", "Tram", "Bus"]
+
+
+def _reference_dedup(all_data, threshold_m):
+    """The pre-vectorisation implementation, kept as the oracle."""
+    dfs = [all_data.get(t) for t in ORDER]
+    dfs = [d for d in dfs if d is not None and not d.empty]
+    all_concat = pd.concat(dfs, ignore_index=True)
+    mean_lat = float(all_concat["Latitude"].mean())
+    m_per_deg_lat = 111_320.0
+    m_per_deg_lon = 111_320.0 * math.cos(math.radians(mean_lat))
+    cell = float(threshold_m)
+
+    def cell_key(lat, lon):
+        return (int(lon * m_per_deg_lon // cell), int(lat * m_per_deg_lat // cell))
+
+    kept_points, grid = [], {}
+    removed = {t: 0 for t in ORDER}
+    out = {}
+    for t in ORDER:
+        df = all_data.get(t)
+        if df is None or df.empty:
+            continue
+        df2 = df.reset_index(drop=True)
+        keep_rows = []
+        for i, row in df2.iterrows():
+            lat, lon = float(row["Latitude"]), float(row["Longitude"])
+            cx, cy = cell_key(lat, lon)
+            close = any(
+                haversine_m(lat, lon, *kept_points[k]) <= threshold_m
+                for nx in (cx - 1, cx, cx + 1)
+                for ny in (cy - 1, cy, cy + 1)
+                for k in grid.get((nx, ny), [])
+            )
+            if close:
+                removed[t] += 1
+                continue
+            keep_rows.append(i)
+            kept_points.append((lat, lon))
+            grid.setdefault((cx, cy), []).append(len(kept_points) - 1)
+        out[t] = df2.iloc[keep_rows].reset_index(drop=True)
+    return out, removed
+
+
+def _stops(seed):
+    rng = np.random.default_rng(seed)
+    data = {}
+    for t, n in zip(ORDER, (60, 40, 80, 400)):
+        data[t] = pd.DataFrame({
+            "Name": [f"{t} {k}" for k in range(n)],
+            "Latitude": 55.86 + rng.normal(0, 0.03, n),
+            "Longitude": -4.25 + rng.normal(0, 0.05, n),
+        })
+    data["Tram"] = data["Tram"].iloc[0:0]  # an empty layer is skipped
+    return data
+
+
+@pytest.mark.parametrize("threshold_m", [100, 300, 700])
+def test_matches_reference(threshold_m):
+    raw = _stops(threshold_m)
+    want, want_removed = _reference_dedup({t: df.copy() for t, df in raw.items()}, threshold_m)
+
+    data = {t: df.copy() for t, df in raw.items()}
+    removed, total = deduplicate_all_by_priority(data, threshold_m)
+
+    assert removed == want_removed
+    assert total == sum(want_removed.values())
+    for t in want:
+        pd.testing.assert_frame_equal(data[t], want[t])
+
+
+def test_curve_matches_reference_at_every_step():
+    raw = _stops(5)
+    curve = build_dedup_curve(raw)
+    for step in DEDUP_STEPS_M:
+        want, want_removed = _reference_dedup({t: df.copy() for t, df in raw.items()}, step)
+        kept, removed, total = apply_dedup_curve(curve, step)
+        assert removed == want_removed
+        assert total == sum(want_removed.values())
+        for t in want:
+            pd.testing.assert_frame_equal(kept[t], want[t])
+
+    assert apply_dedup_curve(curve, 150) is None
+    kept, _, total = apply_dedup_curve(curve, 0)
+    assert total == 0 and len(kept["Bus"]) == len(raw["Bus"])
+
+
+def test_refetch_rebuilds_curve(monkeypatch):
+    import screens.shared.dedup as dedup
+
+    # Worst case of a freed frame's id going to the next fetch's frame:
+    # every object gets the same id
+    monkeypatch.setattr(dedup, "id", lambda _obj: 0, raising=False)
+
+    raw = _stops(6)
+    curve = build_dedup_curve(raw)
+    assert curve_matches(curve, raw)
+    assert curve_matches(curve, dict(raw))  # same frames, another dict
+
+    raw["Bus"] = _stops(7)["Bus"]  # refetch
+    assert not curve_matches(curve, raw)
+    curve = build_dedup_curve(raw)
+    assert curve_matches(curve, raw)
@@ -0,0 +1,211 @@
+# tests/test_filters.py
+import random
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from poi.filters import _TYPE_RULES, _similar_names, merge_element_duplicates, rules_for
+from poi.tag_rules import (
+    AllOf, AnyOf, IntTagBetween, NameContains, NameIs, Not, RuleSet, TagIn, TagSet,
+    build_tag_table,
+)
+
+
+def test_similar_names_containment_needs_a_specific_name():
+    assert _similar_names("riverside museum", "riverside museum")
+    assert _similar_names("kelvingrove art gallery", "kelvingrove art gallery and museum")
+    assert _similar_names("glasgow green", "glasgow green park")
+    assert not _similar_names("museum", "riverside museum")
+    assert not _similar_names("park", "victoria park")
+    assert not _similar_names("", "park")
+
+
+def _rows(*rows):
+    return pd.DataFrame(rows, columns=["Name", "OsmId", "Latitude", "Longitude"])
+
+
+def test_merge_element_duplicates_keeps_the_area():
+    df = _rows(
+        ("Riverside Museum", "node/1", 55.8650, -4.3060),
+        ("Riverside Museum", "way/2", 55.8652, -4.3065),
+        ("Museum", "node/3", 55.8651, -4.3062),  # generic name: a separate place
+    )
+    out = merge_element_duplicates(df, "museum")
+    assert sorted(out["OsmId"]) == ["node/3", "way/2"]
+
+
+def test_merge_element_duplicates_without_osm_id(capsys):
+    df = _rows(("Riverside Museum", "node/1", 55.8650, -4.3060)).drop(columns=["OsmId"])
+    assert merge_element_duplicates(df, "museum") is df
+    assert "no OsmId" in capsys.readouterr().out
+
+
+# ------------------------------------------------------------
+# Vectorised rules vs per-row matching
+# ------------------------------------------------------------
+def _atoms(rule):
+    if isinstance(rule, (AnyOf, AllOf)):
+        for r in rule.rules:
+            yield from _atoms(r)
+    elif isinstance(rule, Not):
+        yield from _atoms(rule.rule)
+    else:
+        yield rule
+
+
+def _fragments(rule):
+    """(tags, name) pieces that hit, miss and edge-case every atom of rule."""
+    for a in _atoms(rule):
+        if isinstance(a, TagIn):
+            for v in a.values:
+                yield {a.key: v}, ""
+                yield {a.key: f"  {v.upper()} "}, ""
+            yield {a.key: "other"}, ""
+        elif isinstance(a, TagSet):
+            for v in a.ignore + ("yes", "", " "):
+                yield {a.key: v}, ""
+        elif isinstance(a, NameContains):
+            for p in a.parts:
+                yield {}, f"The {p.title()}"
+                yield {}, p.strip()
+        elif isinstance(a, NameIs):
+            for v in a.values:
+                yield {}, v.upper()
+                yield {}, f"{v} annexe"
+        elif isinstance(a, IntTagBetween):
+            for k in a.tag_keys:
+                for v in ("9", "18", "9;18", "0", "nine", ""):
+                    yield {k: v}, ""
+
+
+def _sample_rows(ruleset, n=400, seed=7):
+    frags = [f for r in ruleset.require + ruleset.exclude for f in _fragments(r)]
+    rows = list(frags)
+    rng = random.Random(seed)
+    for _ in range(n):
+        tags, names = {}, []
+        for t, nm in rng.sample(frags, k=min(3, len(frags))):
+            tags.update(t)
+            names.append(nm)
+        rows.append((tags, " ".join(x for x in names if x)))
+    return [t for t, _ in rows], [nm for _, nm in rows]
+
+
+def _row_keep(ruleset, tags, name):
+    return (all(r.matches(tags, name) for r in ruleset.require)
+            and not any(r.matches(tags, name) for r in ruleset.exclude))
+
+
+@pytest.mark.parametrize("type_key", sorted(_TYPE_RULES) + ["cinema"])
+def test_vectorised_rules_match_per_row(type_key):
+    rules = rules_for(type_key)
+    tag_dicts, names = _sample_rows(rules)
+    table = build_tag_table(tag_dicts, names, rules.keys())
+
+    for rule in rules.require + rules.exclude:
+        expected = np.array([rule.matches(t, nm) for t, nm in zip(tag_dicts, names)])
+        assert expected.any() and not expected.all()
+        np.testing.assert_array_equal(rule.mask(table), expected)
+
+    expected = np.array([_row_keep(rules, t, nm) for t, nm in zip(tag_dicts, names)])
+    np.testing.assert_array_equal(rules.keep_mask(table), expected)
+
+
+# ------------------------------------------------------------
+# Overpass pushdown rendering
+# ------------------------------------------------------------
+_QSTR = r'"(?:[^"\\]|\\.)*"'
+_FILTER = re.compile(rf"\[({_QSTR})(!?~)({_QSTR})(,i)?\]")
+_HINT_TOKEN = re.compile(rf"{_QSTR}|[()]|[^()\"]+")
+_POSIX = {"[[:space:]]": r"\s", "[^[:space:]]": r"\S"}
+
+
+def _unquote(q):
+    assert q[0] == q[-1] == '"'
+    return re.sub(r"\\(.)", r"\1", q[1:-1])
+
+
+def _hint_end(text, pos):
+    # End of a balanced "(if: ...)" starting at pos; quoted strings may hold parens
+    depth = 0
+    for m in _HINT_TOKEN.finditer(text, pos):
+        depth += {"(": 1, ")": -1}.get(m.group(0), 0)
+        if depth == 0:
+            return m.end()
+    raise AssertionError(f"unbalanced hint at {text[pos:]!r}")
+
+
+def _parse_filters(text):
+    """Split an alternative into (key, negated, compiled regex) filters and (if:) hints."""
+    filters, hints, pos = [], [], 0
+    while pos < len(text):
+        if text.startswith("(if: ", pos):
+            end = _hint_end(text, pos)
+            hints.append(text[pos:end])
+            pos = end
+            continue
+        m = _FILTER.match(text, pos)
+        assert m, f"unparsable filter at {text[pos:]!r}"
+        rx = _unquote(m.group(3))
+        for posix, py in _POSIX.items():
+            rx = rx.replace(posix, py)
+        flags = re.I if m.group(4) else 0
+        filters.append((_unquote(m.group(1)), m.group(2) == "!~", re.compile(rx, flags)))
+        pos = m.end()
+    return filters, hints
+
+
+def _overpass_keeps(filters, tags):
+    # [k~rx] needs the key; [k!~rx] also keeps elements without it
+    for key, negated, rx in filters:
+        v = tags.get(key)
+        hit = v is not None and rx.search(v) is not None
+        if hit == negated:
+            return False
+    return True
+
+
+@pytest.mark.parametrize("names", [True, False])
+@pytest.mark.parametrize("type_key", sorted(_TYPE_RULES) + ["cinema"])
+def test_pushdown_plus_residual_keeps_the_same_rows(type_key, names):
+    rules = rules_for(type_key)
+    alternatives, residual = rules.pushdown(names=names)
+    parsed = [_parse_filters(a) for a in alternatives]
+    for filters, _ in parsed:
+        for key, negated, rx in filters:
+            # Values are lower-cased client side, so every value regex needs ,i
+            assert rx.pattern == r"\S" or rx.flags & re.I, f"{key} regex without ,i"
+
+    tag_dicts, names_ = _sample_rows(rules)
+    tag_dicts = [dict(t, name=nm) if nm else t for t, nm in zip(tag_dicts, names_)]
+    table = build_tag_table(tag_dicts, names_, rules.keys() | residual.keys())
+    remote = np.array([any(_overpass_keeps(f, t) for f, _ in parsed) for t in tag_dicts])
+    np.testing.assert_array_equal(remote & residual.keep_mask(table), rules.keep_mask(table))
+
+
+def test_pushdown_renders_quotes_and_hole_hint():
+    golf, _ = rules_for("golf course").pushdown()
+    assert '(if: !(is_number(t["holes"]) && number(t["holes"]) >= 1 && number(t["holes"]) < 18))' in golf[0]
+    assert '"(pitch and putt|pitch & putt|par 3|par-3|mini golf|minigolf)",i]' in golf[0]
+
+    mission, _ = rules_for("foreign mission").pushdown()
+    assert "|ambassador's residence|" in mission[0]
+    assert "|science & technology|" in mission[0]
+
+
+def test_pushdown_escapes_regex_specials_and_quotes():
+    parts = ('st. mary (east)', 'the "old" mill', "back\\slash", "[a]*+?^$|{}")
+    rules = RuleSet(exclude=[NameContains(*parts)], require=[TagIn('odd"key', "a.b")])
+    (alt,), residual = rules.pushdown()
+    assert not residual.exclude and not residual.require
+
+    filters, _ = _parse_filters(alt)
+    (key, negated, rx), (name_key, name_negated, name_rx) = filters
+    assert (key, negated) == ('odd"key', False)
+    assert rx.search(" A.B ") and not rx.search("axb")
+    assert (name_key, name_negated) == ("name", True)
+    for p in parts:
+        assert name_rx.search(f"x {p.upper()} x")
+    assert not name_rx.search("st mary (east)") and not name_rx.search("the old mill")
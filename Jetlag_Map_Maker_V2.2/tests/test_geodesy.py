@@ -0,0 +1,96 @@
+# tests/test_geodesy.py
+import math
+import time
+
+import numpy as np
+import pytest
+
+import geodesy
+from geodesy import (
+    EARTH_R_M, LocalProjection, equirect_m, haversine_m, haversine_many_m, pairwise_m,
+)
+
+ONE_DEGREE_M = 2 * math.pi * EARTH_R_M / 360
+
+
+def test_haversine_known_distances():
+    assert haversine_m(0.0, 0.0, 1.0, 0.0) == pytest.approx(ONE_DEGREE_M)
+    assert haversine_m(0.0, 0.0, 0.0, 1.0) == pytest.approx(ONE_DEGREE_M)
+    assert haversine_m(55.86, -4.25, 55.86, -4.25) == 0.0
+    # London - Paris, about 343.6 km on the 6371 km sphere
+    assert haversine_m(51.5074, -0.1278, 48.8566, 2.3522) == pytest.approx(343_556, rel=1e-3)
+    # Antipodes
+    assert haversine_m(10.0, 20.0, -10.0, -160.0) == pytest.approx(math.pi * EARTH_R_M)
+
+
+def _random_points(n, seed):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(49.9, 58.7, n), rng.uniform(-8.0, 1.8, n)
+
+
+def test_haversine_many_matches_scalar():
+    lats, lons = _random_points(200, 1)
+    got = haversine_many_m(lats[0], lons[0], lats, lons)
+    want = [haversine_m(lats[0], lons[0], la, lo) for la, lo in zip(lats, lons)]
+    np.testing.assert_allclose(got, want, rtol=1e-12, atol=1e-6)
+
+
+def test_pairwise_matches_scalar_across_chunks(monkeypatch):
+    # Tiny chunks so the matrix is built over several row blocks
+    monkeypatch.setattr(geodesy, "_CHUNK_CELLS", 50)
+    lats_a, lons_a = _random_points(37, 2)
+    lats_b, lons_b = _random_points(11, 3)
+
+    got = pairwise_m(lats_a, lons_a, lats_b, lons_b)
+    want = np.array([[haversine_m(a, b, c, d) for c, d in zip(lats_b, lons_b)] for a, b in zip(lats_a, lons_a)])
+    assert got.shape == (37, 11)
+    np.testing.assert_allclose(got, want, rtol=1e-12, atol=1e-6)
+
+
+def test_pairwise_float32():
+    lats, lons = _random_points(20, 4)
+    got = pairwise_m(lats, lons, lats, lons, dtype=np.float32)
+    assert got.dtype == np.float32
+    np.testing.assert_allclose(got, pairwise_m(lats, lons, lats, lons), rtol=1e-6, atol=0.5)
+
+
+def _short_hops(n, seed, max_m=20_000):
+    # Random points and a partner up to max_m away in a random direction
+    lats, lons = _random_points(n, seed)
+    rng = np.random.default_rng(seed + 100)
+    bearing = rng.uniform(0, 2 * math.pi, n)
+    dist = rng.uniform(1, max_m, n)
+    lats2 = lats + dist * np.cos(bearing) / geodesy.M_PER_DEG_LAT
+    lons2 = lons + dist * np.sin(bearing) / (geodesy.M_PER_DEG_LAT * np.cos(np.radians(lats)))
+    return lats, lons, lats2, lons2
+
+
+def test_equirect_within_a_hundredth_of_a_percent_below_20km():
+    hops = _short_hops(100_000, 6)
+    np.testing.assert_allclose(equirect_m(*hops), haversine_many_m(*hops), rtol=1e-4)
+
+
+def _best_of(fn, args, runs=5):
+    best = math.inf
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def test_equirect_faster_than_haversine():
+    hops = _short_hops(1_000_000, 7)
+    assert _best_of(equirect_m, hops) < _best_of(haversine_many_m, hops)
+
+
+def test_local_projection_round_trip_and_scale():
+    proj = LocalProjection(55.86, -4.25)
+    lats, lons = _random_points(50, 5)
+    back_lat, back_lon = proj.to_latlon(*proj.to_xy(lats, lons))
+    np.testing.assert_allclose(back_lat, lats)
+    np.testing.assert_allclose(back_lon, lons)
+
+    # Within 0.5% of haversine over a few km
+    x, y = proj.to_xy(55.88, -4.20)
+    assert math.hypot(x, y) == pytest.approx(haversine_m(55.86, -4.25, 55.88, -4.20), rel=5e-3)
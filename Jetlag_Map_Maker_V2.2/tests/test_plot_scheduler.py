@@ -0,0 +1,70 @@
+# tests/test_plot_scheduler.py
+import time
+
+from screens.shared.plot_scheduler import PlotScheduler
+
+
+class FakeRoot:
+    """Runs scheduled callbacks only when the test calls step()."""
+
+    def __init__(self):
+        self.queue = []
+
+    def after_idle(self, fn):
+        self.queue.append(fn)
+        return len(self.queue)
+
+    def after(self, _ms, fn):
+        return self.after_idle(fn)
+
+    def step(self):
+        fn = self.queue.pop(0)
+        fn()
+
+
+def _slow(out, seconds=0.001):
+    def draw(item):
+        out.append(item)
+        time.sleep(seconds)
+    return draw
+
+
+def test_every_owner_progresses_each_slice():
+    root = FakeRoot()
+    sched = PlotScheduler(root, budget_ms=12)
+    big, small = [], []
+    sched.submit("big", range(1000), _slow(big))
+    sched.submit("small", range(50), _slow(small))
+
+    # Both lists are drawn from in every slice, whichever was submitted first
+    for slices in range(1, 5):
+        root.step()
+        assert len(big) >= slices and len(small) >= slices
+    assert len(big) < 1000
+
+
+def test_owners_progress_when_an_item_overruns_the_slice():
+    root = FakeRoot()
+    sched = PlotScheduler(root, budget_ms=5)
+    first, second = [], []
+    sched.submit("first", range(10), _slow(first, 0.01))
+    sched.submit("second", range(10), _slow(second, 0.01))
+
+    root.step()
+    assert len(first) == 1 and len(second) == 1
+
+
+def test_done_and_cancel():
+    root = FakeRoot()
+    sched = PlotScheduler(root)
+    drawn, progress, finished = [], [], []
+    sched.submit("a", range(5), drawn.append, on_progress=lambda d, t: progress.append((d, t)),
+                 on_done=lambda: finished.append(True))
+    sched.submit("b", range(5), drawn.append)
+    sched.cancel("b")
+
+    while root.queue:
+        root.step()
+    assert drawn == list(range(5))
+    assert progress[-1] == (5, 5) and finished == [True]
+    assert not sched.pending("a") and not sched.pending("b")
@@ -0,0 +1,79 @@
+# tests/test_spatial_index.py
+# GridIndex and radius_merge against brute force over every pair (with the
+# same equirectangular distance the index uses at these radii).
+import numpy as np
+import pandas as pd
+import pytest
+
+from geodesy import equirect_m, haversine_m, haversine_many_m
+from spatial_index import GridIndex, radius_merge
+
+
+def _points(n, seed, spread=0.05):
+    # Clustered around Glasgow so plenty of pairs fall inside the radius
+    rng = np.random.default_rng(seed)
+    return 55.86 + rng.normal(0, spread, n), -4.25 + rng.normal(0, spread * 1.7, n)
+
+
+def _brute_pairs(lat, lon, r):
+    d = equirect_m(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+    i, j = np.nonzero(np.triu(d <= r, k=1))
+    return set(zip(i.tolist(), j.tolist()))
+
+
+@pytest.mark.parametrize("radius_m, cell_m", [(300, 300), (800, 300), (150, 500)])
+def test_pairs_match_brute_force(radius_m, cell_m):
+    lat, lon = _points(600, radius_m)
+    i, j, d = GridIndex(lat, lon, cell_m).pairs(radius_m, chunk=1000)
+
+    assert set(zip(i.tolist(), j.tolist())) == _brute_pairs(lat, lon, radius_m)
+    assert np.all(i < j)
+    want = [haversine_m(lat[a], lon[a], lat[b], lon[b]) for a, b in zip(i[:50], j[:50])]
+    np.testing.assert_allclose(d[:50], want, rtol=1e-4)
+
+
+def test_query_radius_matches_brute_force():
+    lat, lon = _points(400, 7)
+    index = GridIndex(lat, lon, 250)
+    for q in range(0, 400, 37):
+        for r in (100, 250, 700):
+            got = set(index.query_radius(lat[q], lon[q], r).tolist())
+            want = set(np.flatnonzero(equirect_m(lat[q], lon[q], lat, lon) <= r).tolist())
+            assert got == want
+
+
+def test_long_radii_use_haversine():
+    lat, lon = _points(50, 8, spread=0.5)
+    _, d = GridIndex(lat, lon, 30_000).query_radius(lat[0], lon[0], return_distance=True)
+    assert len(d) > 1
+    want = np.sort(haversine_many_m(lat[0], lon[0], lat, lon))[:len(d)]
+    np.testing.assert_allclose(np.sort(d), want, rtol=1e-12)
+
+
+def test_pairs_small_inputs():
+    assert len(GridIndex([], [], 100).pairs()[0]) == 0
+    assert len(GridIndex([55.0], [-4.0], 100).pairs()[0]) == 0
+
+
+def _brute_merge(df, radius_m, rank_col):
+    work = df.sort_values(by=[rank_col, "Name"], ascending=[False, True]).reset_index(drop=True)
+    kept = []
+    for k, row in work.iterrows():
+        if all(equirect_m(row["Latitude"], row["Longitude"], work.at[p, "Latitude"], work.at[p, "Longitude"]) > radius_m
+               for p in kept):
+            kept.append(k)
+    return work.loc[kept].reset_index(drop=True)
+
+
+def test_radius_merge_matches_greedy_brute_force():
+    lat, lon = _points(300, 11, spread=0.02)
+    rng = np.random.default_rng(12)
+    df = pd.DataFrame({
+        "Name": [f"H{k:03d}" for k in range(300)],
+        "Latitude": lat,
+        "Longitude": lon,
+        "Beds": rng.integers(0, 500, 300),
+    })
+    got = radius_merge(df, 400, rank_col="Beds")
+    want = _brute_merge(df, 400, "Beds")
+    pd.testing.assert_frame_equal(got, want)
@@ -0,0 +1,50 @@
+# tests/test_tile_cache.py
+import pytest
+
+import config
+import tile_cache
+
+SERVER = "https://tiles.example.com/{z}/{x}/{y}.png"
+
+
+@pytest.fixture(autouse=True)
+def tile_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "TILE_CACHE_PATH", str(tmp_path / "tiles.db"), raising=False)
+
+
+def test_has_tiles_returns_only_requested_keys():
+    tile_cache.put_tiles(SERVER, [(10, x, y, b"png") for x in range(5) for y in range(5)])
+    tile_cache.put_tile("https://other.example.com/{z}/{x}/{y}.png", 10, 1, 1, b"png")
+
+    keys = [(10, 1, 1), (10, 2, 3), (10, 7, 7), (11, 1, 1)]
+    assert tile_cache.has_tiles(SERVER, keys) == {(10, 1, 1), (10, 2, 3)}
+    assert tile_cache.get_tile(SERVER, 10, 4, 4) == b"png"
+
+
+def test_seed_refuses_public_osm():
+    assert not tile_cache.seeding_allowed(tile_cache.DEFAULT_TILE_SERVER)
+    assert not tile_cache.seeding_allowed("https://tile.openstreetmap.org/{z}/{x}/{y}.png")
+    assert tile_cache.seeding_allowed(SERVER)
+    with pytest.raises(ValueError):
+        tile_cache.seed_tiles((55.8, -4.3, 55.9, -4.2), [10], server=tile_cache.DEFAULT_TILE_SERVER)
+
+
+def test_seed_writes_in_batches(monkeypatch):
+    monkeypatch.setattr(config, "TILE_SEED_COMMIT_EVERY", 4, raising=False)
+    monkeypatch.setattr(tile_cache, "fetch_tile", lambda server, z, x, y: None if x % 5 == 0 else b"png")
+    writes = []
+    put_tiles = tile_cache.put_tiles
+    monkeypatch.setattr(tile_cache, "put_tiles", lambda server, tiles: (writes.append(len(tiles)), put_tiles(server, tiles)))
+
+    bounds = (55.80, -4.35, 55.90, -4.15)
+    stats = tile_cache.seed_tiles(bounds, [12, 13], server=SERVER)
+    keys = tile_cache.tiles_for_bounds(bounds, [12, 13])
+
+    assert stats["total"] == len(keys)
+    assert stats["downloaded"] + stats["failed"] == len(keys)
+    assert max(writes) <= 4 and sum(writes) == stats["downloaded"]
+    assert len(tile_cache.has_tiles(SERVER, keys)) == stats["downloaded"]
+
+    # A second run finds everything it stored
+    again = tile_cache.seed_tiles(bounds, [12, 13], server=SERVER)
+    assert again["cached"] == stats["downloaded"]
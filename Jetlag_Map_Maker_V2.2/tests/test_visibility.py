@@ -0,0 +1,58 @@
+# tests/test_visibility.py
+# Batch deletion against a stand-in map widget that records canvas calls.
+from screens.shared.visibility import delete_objects
+
+
+class _Canvas:
+    def __init__(self):
+        self.items = set()
+        self.next_item = 0
+        self.delete_calls = 0
+        self.updates = 0
+
+    def new_item(self):
+        self.next_item += 1
+        self.items.add(self.next_item)
+        return self.next_item
+
+    def delete(self, *items):
+        self.delete_calls += 1
+        self.items.difference_update(items)
+
+    def update(self):
+        self.updates += 1
+
+
+class _Marker:
+    def __init__(self, widget):
+        self.deleted = False
+        self.polygon = None
+        self.big_circle = widget.canvas.new_item()
+        self.canvas_text = widget.canvas.new_item()
+        self.canvas_icon = None
+        self.canvas_image = None
+        widget.canvas_marker_list.append(self)
+
+
+class _Widget:
+    def __init__(self):
+        self.canvas = _Canvas()
+        self.canvas_marker_list = []
+
+
+def test_delete_objects_in_one_pass():
+    widget = _Widget()
+    markers = [_Marker(widget) for _ in range(50)]
+    gone, kept = markers[::2], markers[1::2]
+
+    delete_objects(widget, gone + [None])
+
+    assert widget.canvas_marker_list == kept
+    assert widget.canvas.delete_calls == 1 and widget.canvas.updates == 0
+    assert widget.canvas.items == {m.big_circle for m in kept} | {m.canvas_text for m in kept}
+    assert all(m.deleted and m.big_circle is None and m.canvas_text is None for m in gone)
+    assert not any(m.deleted for m in kept)
+
+    # Already deleted objects are skipped
+    delete_objects(widget, gone)
+    assert widget.canvas.delete_calls == 1
@@ -0,0 +1,33 @@
+# tests/test_zone_coverage.py
+import numpy as np
+import pytest
+from shapely.geometry import box
+
+from screens.shared.zone_coverage import coverage_report, zone_overlaps
+
+# About 3.5 km x 4.4 km around central Glasgow
+AREA = box(-4.30, 55.84, -4.23, 55.88)
+
+
+def test_duplicate_zones_keep_one():
+    one = coverage_report([(55.86, -4.25, 1000)], AREA)
+    two = coverage_report([(55.86, -4.25, 1000), (55.86, -4.25, 1000)], AREA)
+
+    assert one["coverage_pct"] > 0
+    assert two["coverage_pct"] == pytest.approx(one["coverage_pct"])
+    assert two["contained"].tolist() == [False, True]
+
+
+def test_three_identical_zones():
+    x = np.zeros(3)
+    y = np.zeros(3)
+    _, _, contained = zone_overlaps(x, y, np.full(3, 500.0))
+    assert contained.tolist() == [False, True, True]
+
+
+def test_nested_zone_is_contained():
+    x = np.array([0.0, 100.0, 5000.0])
+    y = np.zeros(3)
+    neighbours, _, contained = zone_overlaps(x, y, np.array([1000.0, 300.0, 400.0]))
+    assert contained.tolist() == [False, True, False]
+    assert neighbours.tolist() == [1, 1, 0]
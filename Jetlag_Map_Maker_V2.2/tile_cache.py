@@ -0,0 +1,253 @@
+"""
+Disk cache for map tiles, shared by every map in the app.
+
+Tiles live in one SQLite file (config.TILE_CACHE_PATH, default
+~/.jetlag_map_maker/tiles.db) using tkintermapview's offline-database
+layout, so the file also works as a TkinterMapView database_path.
+Tiles the map downloads are written through to it, seed_tiles() fills it
+for an area ahead of time, and with config.tiles_offline set the map
+reads only from it (missing tiles stay blank).
+"""
+import math
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+
+import config
+
+DEFAULT_TILE_SERVER = "https://a.tile.openstreetmap.org/{z}/{x}/{y}.png"
+
+_HEADERS = {"User-Agent": "JetlagMapMaker/1.0 (contact: ryancomet@gmail.com)"}
+
+# Hosts whose usage policy forbids bulk downloading (seeding)
+_NO_SEED_HOSTS = ("tile.openstreetmap.org",)
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+
+def db_path() -> Path:
+    p = getattr(config, "TILE_CACHE_PATH", None)
+    return Path(p) if p else Path.home() / ".jetlag_map_maker" / "tiles.db"
+
+
+def is_offline() -> bool:
+    return bool(getattr(config, "tiles_offline", False))
+
+
+def tile_server() -> str:
+    """The configured map tile URL (config.TILE_SERVER), else the public OSM one."""
+    return getattr(config, "TILE_SERVER", None) or DEFAULT_TILE_SERVER
+
+
+def seeding_allowed(server: str) -> bool:
+    """False for servers that must not be bulk-downloaded (the public OSM tiles)."""
+    host = (urlparse(server).hostname or "").lower()
+    return not any(host == h or host.endswith("." + h) for h in _NO_SEED_HOSTS)
+
+
+def _connect() -> sqlite3.Connection:
+    """One connection per thread (sqlite3 connections are not shareable)."""
+    path = str(db_path())
+    conn = getattr(_local, "conns", {}).get(path)
+    if conn is not None:
+        return conn
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    with _schema_lock:
+        if path not in _schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("""CREATE TABLE IF NOT EXISTS server (
+                                url VARCHAR(300) PRIMARY KEY NOT NULL,
+                                max_zoom INTEGER NOT NULL);""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS tiles (
+                                zoom INTEGER NOT NULL,
+                                x INTEGER NOT NULL,
+                                y INTEGER NOT NULL,
+                                server VARCHAR(300) NOT NULL,
+                                tile_image BLOB NOT NULL,
+                                CONSTRAINT fk_server FOREIGN KEY (server) REFERENCES server (url),
+                                CONSTRAINT pk_tiles PRIMARY KEY (zoom, x, y, server));""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS sections (
+                                position_a VARCHAR(100) NOT NULL,
+                                position_b VARCHAR(100) NOT NULL,
+                                zoom_a INTEGER NOT NULL,
+                                zoom_b INTEGER NOT NULL,
+                                server VARCHAR(300) NOT NULL,
+                                CONSTRAINT fk_server FOREIGN KEY (server) REFERENCES server (url),
+                                CONSTRAINT pk_tiles PRIMARY KEY (position_a, position_b, zoom_a, zoom_b, server));""")
+            conn.commit()
+            _schema_ready.add(path)
+
+    if not hasattr(_local, "conns"):
+        _local.conns = {}
+    _local.conns[path] = conn
+    return conn
+
+
+def get_tile(server: str, zoom: int, x: int, y: int):
+    """Cached tile bytes, or None."""
+    try:
+        row = _connect().execute(
+            "SELECT tile_image FROM tiles WHERE zoom=? AND x=? AND y=? AND server=?;",
+            (zoom, x, y, server),
+        ).fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+def has_tiles(server: str, keys) -> set:
+    """The (zoom, x, y) keys already cached for server."""
+    conn = _connect()
+    found = set()
+    by_zoom = {}
+    for z, x, y in keys:
+        by_zoom.setdefault(z, []).append((x, y))
+    for zoom, xy in by_zoom.items():
+        # Only the requested block of tiles, through the (zoom, x, y, server) key
+        xs = [x for x, _ in xy]
+        ys = [y for _, y in xy]
+        rows = conn.execute(
+            "SELECT x, y FROM tiles WHERE zoom=? AND x BETWEEN ? AND ? AND y BETWEEN ? AND ? AND server=?;",
+            (zoom, min(xs), max(xs), min(ys), max(ys), server),
+        ).fetchall()
+        found.update((zoom, x, y) for x, y in rows)
+    return found & set(keys)
+
+
+def put_tiles(server: str, tiles):
+    """Store [(zoom, x, y, data), ...] in one transaction."""
+    if not tiles:
+        return
+    conn = _connect()
+    try:
+        conn.execute("INSERT OR IGNORE INTO server (url, max_zoom) VALUES (?, ?);", (server, 19))
+        conn.executemany(
+            "INSERT OR REPLACE INTO tiles (zoom, x, y, server, tile_image) VALUES (?, ?, ?, ?, ?);",
+            [(zoom, x, y, server, sqlite3.Binary(data)) for zoom, x, y, data in tiles],
+        )
+        conn.commit()
+    except sqlite3.Error:
+        pass
+
+
+def put_tile(server: str, zoom: int, x: int, y: int, data: bytes):
+    put_tiles(server, [(zoom, x, y, data)])
+
+
+def fetch_tile(server: str, zoom: int, x: int, y: int, timeout=15):
+    """Download one tile without storing it. Returns the bytes, or None on failure."""
+    url = server.replace("{x}", str(x)).replace("{y}", str(y)).replace("{z}", str(zoom))
+    try:
+        r = requests.get(url, headers=_HEADERS, timeout=timeout)
+    except requests.RequestException:
+        return None
+    if r.status_code != 200 or not r.content:
+        return None
+    return r.content
+
+
+def download_tile(server: str, zoom: int, x: int, y: int, timeout=15):
+    """Fetch one tile and store it. Returns the bytes, or None on failure."""
+    data = fetch_tile(server, zoom, x, y, timeout)
+    if data is not None:
+        put_tile(server, zoom, x, y, data)
+    return data
+
+
+def load_tile(server: str, zoom: int, x: int, y: int):
+    """Cached bytes, else (unless offline) downloaded and cached; None if unavailable."""
+    data = get_tile(server, zoom, x, y)
+    if data is None and not is_offline():
+        data = download_tile(server, zoom, x, y)
+    return data
+
+
+# ---------------------------
+# Seeding
+# ---------------------------
+def _tile_xy(lat, lon, zoom):
+    n = 2 ** zoom
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_for_bounds(bounds, zooms):
+    """(zoom, x, y) for every tile touching bounds (south, west, north, east)."""
+    south, west, north, east = bounds
+    keys = []
+    for z in zooms:
+        x0, y0 = _tile_xy(north, west, z)
+        x1, y1 = _tile_xy(south, east, z)
+        keys.extend((z, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1))
+    return keys
+
+
+def plan_seed(bounds, zooms, max_tiles=None):
+    """
+    Zoom levels to seed, dropping the deepest ones until the tile count
+    fits max_tiles (config.TILE_SEED_MAX_TILES). Returns (zooms, keys).
+    """
+    if max_tiles is None:
+        max_tiles = getattr(config, "TILE_SEED_MAX_TILES", 10_000)
+    zooms = sorted(zooms)
+    while zooms:
+        keys = tiles_for_bounds(bounds, zooms)
+        if len(keys) <= max_tiles:
+            return zooms, keys
+        zooms = zooms[:-1]
+    return [], []
+
+
+def seed_tiles(bounds, zooms, server=None, progress=None, cancelled=None, workers=2):
+    """
+    Download every missing tile for bounds at zooms (run on a worker thread).
+    progress(done, total) is called as tiles finish; cancelled() -> True stops
+    early. Workers only download; this thread writes the tiles in batches of
+    config.TILE_SEED_COMMIT_EVERY. Refuses servers that forbid bulk
+    downloads (ValueError), see seeding_allowed().
+    Returns {"zooms", "total", "cached", "downloaded", "failed"}.
+    """
+    if server is None:
+        server = tile_server()
+    if not seeding_allowed(server):
+        raise ValueError(
+            f"{urlparse(server).hostname} does not allow bulk downloads; "
+            "set config.TILE_SERVER to a tile server that does"
+        )
+
+    zooms, keys = plan_seed(bounds, zooms)
+    have = has_tiles(server, keys) if keys else set()
+    todo = [k for k in keys if k not in have]
+    stats = {"zooms": zooms, "total": len(keys), "cached": len(have), "downloaded": 0, "failed": 0}
+    batch_size = max(1, int(getattr(config, "TILE_SEED_COMMIT_EVERY", 200)))
+
+    def one(key):
+        if cancelled is not None and cancelled():
+            return key, None
+        return key, fetch_tile(server, *key)
+
+    batch = []
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        for (zoom, x, y), data in ex.map(one, todo):
+            if data is None:
+                stats["failed"] += 1
+            else:
+                stats["downloaded"] += 1
+                batch.append((zoom, x, y, data))
+                if len(batch) >= batch_size:
+                    put_tiles(server, batch)
+                    batch = []
+            if progress is not None:
+                progress(stats["cached"] + stats["downloaded"] + stats["failed"], stats["total"])
+    put_tiles(server, batch)
+    return stats